@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+from .charts import chart_path
+from .models import Dataset
+
+# Validators for conditional GETs. They share one small query per request, so
+# a matching If-None-Match is answered with 304 before any summary is read or
+# PDF rendered.
+
+
+def _memoized(request, key, compute):
+    cache = request.__dict__.setdefault('_validator_cache', {})
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def _ready_dataset(request, dataset_id):
+    return _memoized(request, ('dataset', dataset_id), lambda: (
+        Dataset.objects.filter(id=dataset_id, status=Dataset.READY)
+        .values('id', 'uploaded_at', 'revision', 'appended_at')
+        .first()
+    ))
+
+
+def dataset_etag(request, dataset_id, **kwargs):
+    # No validator while ingesting: the 409 answer must not be cached
+    dataset = _ready_dataset(request, dataset_id)
+    if dataset is None:
+        return None
+    stamp = dataset['uploaded_at'].timestamp()
+    return f"dataset-{dataset['id']}-{stamp:.6f}-r{dataset['revision']}"
+
+
+def dataset_last_modified(request, dataset_id, **kwargs):
+    dataset = _ready_dataset(request, dataset_id)
+    if dataset is None:
+        return None
+    return dataset['appended_at'] or dataset['uploaded_at']
+
+
+def dataset_cache_key(dataset, name, *parts):
+    # uploaded_at and the append revision pin the key to this version of the
+    # dataset's rows
+    stamp = f'{dataset.uploaded_at.timestamp():.6f}'
+    version = f'r{dataset.revision}'
+    return ':'.join(str(part) for part in (name, dataset.id, stamp, version, *parts))
+
+
+def _chart_cached(request, dataset_id, kind, fmt):
+    dataset = _ready_dataset(request, dataset_id)
+    if dataset is None:
+        return False
+    size = request.GET.get('size', 'medium')
+    return os.path.exists(chart_path(dataset_id, dataset['revision'], kind, size, fmt))
+
+
+def chart_etag(request, dataset_id, kind, fmt, **kwargs):
+    # Only charts already on disk get validators, so a 202 "still rendering"
+    # answer is never revalidated into a 304
+    if not _chart_cached(request, dataset_id, kind, fmt):
+        return None
+    return dataset_etag(request, dataset_id)
+
+
+def chart_last_modified(request, dataset_id, kind, fmt, **kwargs):
+    if not _chart_cached(request, dataset_id, kind, fmt):
+        return None
+    return dataset_last_modified(request, dataset_id)
+
+
+def compare_etag(request, base_id, other_id, **kwargs):
+    etags = [dataset_etag(request, base_id), dataset_etag(request, other_id)]
+    if None in etags:
+        return None
+    return 'compare-' + '-'.join(etag.removeprefix('dataset-') for etag in etags)
+
+
+def compare_last_modified(request, base_id, other_id, **kwargs):
+    stamps = [dataset_last_modified(request, base_id), dataset_last_modified(request, other_id)]
+    return None if None in stamps else max(stamps)
+
+
+def _history_entries(request):
+    return _memoized(request, 'history', lambda: list(
+        Dataset.objects.order_by('-uploaded_at')
+        .values_list('id', 'uploaded_at', 'status', 'revision')[:5]
+    ))
+
+
+def history_etag(request, **kwargs):
+    # Covers new uploads, appends, retention deletes and status changes alike.
+    # No Last-Modified: no single timestamp moves on an append or a delete
+    entries = _history_entries(request)
+    fingerprint = ';'.join(f'{i}:{at.timestamp():.6f}:{s}:{r}' for i, at, s, r in entries)
+    return 'history-' + hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
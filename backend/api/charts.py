@@ -0,0 +1,157 @@
+import glob
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Bump whenever the drawing code changes so cached charts are re-rendered
+CHART_VERSION = 1
+
+CHART_KINDS = ('types', 'parameters')
+CHART_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+# Pixel sizes at CHART_DPI; SVGs use the same physical size
+CHART_SIZES = {
+    'thumb': (320, 240),
+    'medium': (640, 480),
+    'large': (1280, 960),
+}
+CHART_DPI = 100
+# Types drawn as their own pie slice; the rest are grouped into "Other"
+MAX_PIE_SLICES = 8
+COLORS = ['#334155', '#64748b', '#94a3b8']
+
+_executor = None
+_executor_guard = threading.Lock()
+_pending = {}
+
+
+def chart_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'charts')
+
+
+def chart_path(dataset_id, revision, kind, size, fmt):
+    # The revision changes whenever rows are appended, so a render still in
+    # flight for the old rows never lands under the new rows' name
+    name = f'chart_{dataset_id}_r{revision}_v{CHART_VERSION}_{kind}_{size}.{fmt}'
+    return os.path.join(chart_dir(), name)
+
+
+def get_executor():
+    # matplotlib is not thread-safe, so charts are drawn by a dedicated pool
+    # (one worker by default) rather than on the request threads
+    global _executor
+    with _executor_guard:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CHART_WORKERS, thread_name_prefix='charts'
+            )
+        return _executor
+
+
+def _draw_types(fig, summary):
+    ax = fig.add_subplot()
+    ranked = sorted(summary.type_counts.items(), key=lambda item: -item[1])
+    slices, rest = ranked[:MAX_PIE_SLICES], ranked[MAX_PIE_SLICES:]
+    if rest:
+        slices.append(('Other', sum(count for _, count in rest)))
+    ax.pie(
+        [count for _, count in slices],
+        labels=[label for label, _ in slices],
+        autopct='%1.1f%%',
+        startangle=90,
+    )
+    ax.set_title('Equipment Types')
+
+
+def _draw_parameters(fig, summary):
+    ax = fig.add_subplot()
+    labels = [field.capitalize() for field in summary.parameters]
+    stats = list(summary.parameters.values())
+    means = [s['mean'] for s in stats]
+    # Whiskers span each parameter's min..max around its mean
+    spread = [
+        [s['mean'] - s['min'] for s in stats],
+        [s['max'] - s['mean'] for s in stats],
+    ]
+    ax.bar(labels, means, yerr=spread, capsize=6, color=COLORS)
+    ax.set_title('Average Parameters (min-max)')
+
+
+DRAWERS = {
+    'types': _draw_types,
+    'parameters': _draw_parameters,
+}
+
+
+def render_chart(summary, kind, size, fmt, path):
+    """Draw one chart from a stored summary and write it to ``path``."""
+    # Drawn on the non-interactive Agg canvas directly; pyplot and its
+    # global figure state are never touched
+    width, height = CHART_SIZES[size]
+    fig = Figure(figsize=(width / CHART_DPI, height / CHART_DPI), dpi=CHART_DPI)
+    FigureCanvasAgg(fig)
+    DRAWERS[kind](fig, summary)
+    fig.tight_layout()
+
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    fig.savefig(tmp_path, format=fmt)
+    os.replace(tmp_path, path)
+    return path
+
+
+def request_chart(dataset, summary, kind, size='medium', fmt='png'):
+    """Return a future resolving to the chart's file path.
+
+    Cached charts resolve immediately. Otherwise the chart is rendered on the
+    chart pool; concurrent requests for the same chart share one render.
+    Renders from other worker processes may race, but each writes a
+    temporary file and moves it into place, so the result is the same.
+    """
+    path = chart_path(dataset.id, dataset.revision, kind, size, fmt)
+    with _executor_guard:
+        future = _pending.get(path)
+    if future is not None:
+        return future
+    if os.path.exists(path):
+        future = Future()
+        future.set_result(path)
+        return future
+
+    os.makedirs(chart_dir(), exist_ok=True)
+    executor = get_executor()
+    with _executor_guard:
+        future = _pending.get(path)
+        if future is not None:
+            return future
+        future = executor.submit(render_chart, summary, kind, size, fmt, path)
+        _pending[path] = future
+    future.add_done_callback(lambda _: _forget(path))
+    return future
+
+
+def _forget(path):
+    with _executor_guard:
+        _pending.pop(path, None)
+
+
+def get_chart(dataset, summary, kind, size='medium', fmt='png'):
+    """Return the chart's file path, waiting for it to be rendered if needed."""
+    path = chart_path(dataset.id, dataset.revision, kind, size, fmt)
+    if os.path.exists(path):
+        return path
+    return request_chart(dataset, summary, kind, size, fmt).result()
+
+
+def invalidate_charts(dataset_id):
+    """Remove every cached chart of a dataset."""
+    for path in glob.glob(os.path.join(chart_dir(), f'chart_{dataset_id}_*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,148 @@
+import numpy as np
+from django.core.cache import cache
+
+from .caching import dataset_cache_key
+from .frames import NUMERIC_FIELDS, dataset_frame
+
+COMPARE_FIELDS = ('equipment_name', 'equipment_type') + NUMERIC_FIELDS
+DEFAULT_LIMIT = 100
+# Longest change/added/removed list kept per pair; counts are always exact
+MAX_LIMIT = 10000
+
+
+def _value(value):
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _type_shifts(base, other):
+    """Per-type row counts and parameter means of both sides, with deltas."""
+    fields = list(NUMERIC_FIELDS)
+    base_means = base.groupby('equipment_type', observed=True)[fields].mean()
+    other_means = other.groupby('equipment_type', observed=True)[fields].mean()
+    base_counts = base['equipment_type'].value_counts()
+    other_counts = other['equipment_type'].value_counts()
+    types = sorted(set(base_means.index) | set(other_means.index))
+    base_means = base_means.reindex(types)
+    other_means = other_means.reindex(types)
+    deltas = other_means - base_means
+
+    shifts = {}
+    for eq_type in types:
+        shifts[eq_type] = {
+            'count': {
+                'base': int(base_counts.get(eq_type, 0)),
+                'other': int(other_counts.get(eq_type, 0)),
+            },
+            'means': {
+                field: {
+                    'base': _value(base_means.at[eq_type, field]),
+                    'other': _value(other_means.at[eq_type, field]),
+                    'delta': _value(deltas.at[eq_type, field]),
+                }
+                for field in fields
+            },
+        }
+    return shifts
+
+
+def _equipment_list(frame, limit):
+    head = frame.head(limit)
+    return [
+        {'equipment_name': name, 'equipment_type': eq_type}
+        for name, eq_type in zip(head['equipment_name'].tolist(), head['equipment_type'].tolist())
+    ]
+
+
+def compare_frames(base, other, limit=MAX_LIMIT):
+    """Diff two dataset frames joined on ``equipment_name``.
+
+    The join is a pandas hash merge over both frames at once, and every
+    delta is a column operation on the joined frame. Names repeated within
+    a dataset keep their last row. Changed equipment is ranked by drift:
+    the sum of its absolute deltas, each in units of the base dataset's
+    standard deviation for that parameter, so one noisy parameter doesn't
+    drown out the others.
+    """
+    fields = list(NUMERIC_FIELDS)
+    type_shifts = _type_shifts(base, other)
+    counts = {'base_rows': len(base), 'other_rows': len(other)}
+    duplicates = {
+        'base': int(base['equipment_name'].duplicated().sum()),
+        'other': int(other['equipment_name'].duplicated().sum()),
+    }
+    base, other = (
+        frame.drop_duplicates('equipment_name', keep='last')
+        .assign(equipment_type=lambda f: f['equipment_type'].astype(str))
+        for frame in (base, other)
+    )
+
+    merged = base.merge(
+        other, on='equipment_name', how='outer', suffixes=('_base', '_other'),
+        indicator=True, sort=False,
+    )
+    side = merged['_merge']
+    matched = merged[side == 'both']
+
+    deltas = {field: matched[f'{field}_other'] - matched[f'{field}_base'] for field in fields}
+    retyped = (matched['equipment_type_base'] != matched['equipment_type_other']).to_numpy()
+    # A new type alone is a change too; with no parameter drift it ranks last
+    changed_mask = retyped.copy()
+    drift = np.zeros(len(matched))
+    for field in fields:
+        delta = deltas[field].to_numpy()
+        changed_mask |= delta != 0
+        scale = base[field].std()
+        drift += np.abs(delta) / (scale if scale and not np.isnan(scale) else 1.0)
+
+    order = np.argsort(-drift[changed_mask], kind='stable')[:limit]
+    top = matched[changed_mask].iloc[order]
+    top_drift = drift[changed_mask][order]
+    changes = []
+    for position, row in enumerate(top.itertuples(index=False)):
+        row = row._asdict()
+        change = {
+            'equipment_name': row['equipment_name'],
+            'equipment_type': row['equipment_type_other'],
+            'drift': float(top_drift[position]),
+        }
+        if row['equipment_type_base'] != row['equipment_type_other']:
+            change['base_equipment_type'] = row['equipment_type_base']
+        for field in fields:
+            before, after = row[f'{field}_base'], row[f'{field}_other']
+            change[field] = {'base': before, 'other': after, 'delta': after - before}
+        changes.append(change)
+
+    removed = merged[side == 'left_only'].rename(columns={'equipment_type_base': 'equipment_type'})
+    added = merged[side == 'right_only'].rename(columns={'equipment_type_other': 'equipment_type'})
+    return {
+        'counts': {
+            **counts,
+            'matched': len(matched),
+            'changed': int(changed_mask.sum()),
+            'unchanged': int(len(matched) - changed_mask.sum()),
+            'retyped': int(retyped.sum()),
+            'added': len(added),
+            'removed': len(removed),
+            'duplicate_names': duplicates,
+        },
+        'type_shifts': type_shifts,
+        'changes': changes,
+        'added': _equipment_list(added, limit),
+        'removed': _equipment_list(removed, limit),
+    }
+
+
+def get_comparison(base_dataset, other_dataset):
+    """Return the cached comparison of two datasets, computing it on first use."""
+    key = dataset_cache_key(base_dataset, 'compare', dataset_cache_key(other_dataset, 'with'))
+    result = cache.get(key)
+    if result is None:
+        result = compare_frames(
+            dataset_frame(base_dataset, fields=COMPARE_FIELDS),
+            dataset_frame(other_dataset, fields=COMPARE_FIELDS),
+        )
+        cache.set(key, result)
+    return result
@@ -0,0 +1,116 @@
+import numpy as np
+from django.core.cache import cache
+
+from .caching import dataset_cache_key
+from .frames import NUMERIC_FIELDS, dataset_frame
+
+# 'index' plots against row order; any parameter can be used as either axis
+X_AXES = ('index',) + NUMERIC_FIELDS
+DEFAULT_WIDTH = 800
+MIN_WIDTH = 10
+MAX_WIDTH = 4000
+
+
+def _bucket_edges(n, buckets):
+    # Start offsets of ``buckets`` near-equal runs over n points, plus n
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def minmax_decimate(x, y, width):
+    """Keep the lowest and highest ``y`` of each of ``width - 1`` buckets.
+
+    ``x`` must be sorted. Returns the kept indices in ``x`` order, at most
+    ``2 * width`` of them. Every local extreme survives, so spikes and
+    outliers stay visible at any zoom level the width allows, and the first
+    and last points are kept as well, so the series spans the full x range.
+    """
+    n = len(y)
+    if n <= 2 * width:
+        return np.arange(n)
+    # One bucket fewer leaves room for both ends within 2 * width
+    buckets = width - 1
+    edges = _bucket_edges(n, buckets)
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(buckets), sizes)
+    keep = [np.array([0, n - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extreme = np.repeat(reduce.reduceat(y, edges[:-1]), sizes)
+        hits = np.flatnonzero(y == extreme)
+        # First hit per bucket, should a bucket's extreme repeat
+        _, first = np.unique(bucket[hits], return_index=True)
+        keep.append(hits[first])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb(x, y, width):
+    """Largest-Triangle-Three-Buckets downsampling to ``width`` points.
+
+    ``x`` must be sorted and ``width`` at least 3. The first and last
+    points are always kept; every bucket in between keeps the point forming
+    the largest triangle with the previously kept point and the next
+    bucket's mean. The walk over buckets
+    is inherently sequential, but each bucket is scored in one vectorized
+    step, so the Python loop runs ``width`` times whatever the row count.
+    """
+    n = len(y)
+    if n <= width:
+        return np.arange(n)
+
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+    # Buckets cover the points strictly between the first and the last
+    edges = 1 + _bucket_edges(n - 2, width - 2)
+    sums_x = np.add.reduceat(x[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:-1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    means_x = np.append(sums_x / sizes, x[-1])
+    means_y = np.append(sums_y / sizes, y[-1])
+
+    keep = np.empty(width, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(width - 2):
+        start, end = edges[i], edges[i + 1]
+        cx, cy = means_x[i + 1], means_y[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+METHODS = {
+    'lttb': lttb,
+    'minmax': minmax_decimate,
+}
+
+
+def downsample(x, y, width, method='lttb'):
+    """Downsample the series ``(x, y)`` for a plot ``width`` pixels wide.
+
+    The points are sorted by ``x`` first, so any parameter pair works, not
+    just row order. Returns the kept ``(x, y)`` arrays.
+    """
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+    keep = METHODS[method](x, y, width)
+    return x[keep], y[keep]
+
+
+def get_plot_series(dataset, x_field, y_field, width=DEFAULT_WIDTH, method='lttb'):
+    """Return the downsampled ``{'x': [...], 'y': [...]}`` series of a dataset.
+
+    At most ``2 * width`` points whatever the dataset size; cached per
+    dataset, axes, width and method.
+    """
+    key = dataset_cache_key(dataset, 'plot', x_field, y_field, width, method)
+    series = cache.get(key)
+    if series is None:
+        fields = [f for f in NUMERIC_FIELDS if f in (x_field, y_field)]
+        frame = dataset_frame(dataset, fields=fields)
+        y = frame[y_field].to_numpy()
+        x = np.arange(len(frame)) if x_field == 'index' else frame[x_field].to_numpy()
+        x, y = downsample(x, y, width, method)
+        series = {'x': x.tolist(), 'y': y.tolist()}
+        cache.set(key, series)
+    return series
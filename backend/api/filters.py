@@ -0,0 +1,70 @@
+import math
+
+from rest_framework.exceptions import ValidationError
+
+from .models import EquipmentData
+
+NUMERIC_FIELDS = EquipmentData.PARAMETER_FIELDS
+
+
+def _prefix_upper_bound(prefix):
+    # Smallest string greater than every string starting with ``prefix``
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+
+def _float_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValidationError({name: 'Must be a number.'})
+    # float() also accepts nan and inf, which no bound should be
+    if not math.isfinite(value):
+        raise ValidationError({name: 'Must be a finite number.'})
+    return value
+
+
+def filter_equipment(queryset, params):
+    """Apply the query endpoint's filters to an EquipmentData queryset.
+
+    Supported query parameters:
+
+    - ``type``: exact equipment type; comma-separate several to match any
+    - ``name``: equipment name prefix (case-sensitive)
+    - ``<parameter>_min`` / ``<parameter>_max``: inclusive bounds on
+      flowrate, pressure or temperature
+
+    Each filter is written so it can seek one of the ``(dataset, ...)``
+    indexes on EquipmentData: the name prefix becomes a ``>= prefix AND
+    < next-prefix`` range instead of a LIKE, which SQLite can't serve from
+    an index once Django adds its ESCAPE clause.
+    """
+    types = [t.strip() for t in params.get('type', '').split(',') if t.strip()]
+    if len(types) == 1:
+        queryset = queryset.filter(equipment_type=types[0])
+    elif types:
+        queryset = queryset.filter(equipment_type__in=types)
+
+    prefix = params.get('name')
+    if prefix:
+        upper = _prefix_upper_bound(prefix)
+        if upper is None:
+            queryset = queryset.filter(equipment_name__startswith=prefix)
+        else:
+            queryset = queryset.filter(equipment_name__gte=prefix, equipment_name__lt=upper)
+
+    for field in NUMERIC_FIELDS:
+        low = _float_param(params, f'{field}_min')
+        high = _float_param(params, f'{field}_max')
+        if low is not None and high is not None and low > high:
+            raise ValidationError({f'{field}_min': f'Must not exceed {field}_max.'})
+        if low is not None:
+            queryset = queryset.filter(**{f'{field}__gte': low})
+        if high is not None:
+            queryset = queryset.filter(**{f'{field}__lte': high})
+    return queryset
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from .models import EquipmentData
+
+NUMERIC_FIELDS = EquipmentData.PARAMETER_FIELDS
+FRAME_FIELDS = ('equipment_type',) + NUMERIC_FIELDS
+
+
+def dataset_frame(dataset, fields=FRAME_FIELDS, chunk_size=50000):
+    """Load a dataset's rows as a DataFrame with one column per field.
+
+    One streamed query, no model instances. Numeric columns come back as
+    float64 and ``equipment_type`` as a categorical, so group-bys and
+    reductions over the frame run vectorized.
+    """
+    rows = (
+        EquipmentData.objects.of_dataset(dataset)
+        .order_by('id')
+        .values_list(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+    frame = pd.DataFrame.from_records(rows, columns=list(fields))
+    for field in fields:
+        if field in NUMERIC_FIELDS:
+            frame[field] = frame[field].astype('float64')
+        elif field == 'equipment_type':
+            frame[field] = frame[field].astype('category')
+    return frame
@@ -0,0 +1,178 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Dataset, EquipmentData
+from .summaries import SummaryAccumulator, get_summary
+
+# Accepted CSV headers for each EquipmentData field, in lookup order.
+COLUMN_ALIASES = {
+    'equipment_name': ('Equipment Name', 'equipment_name'),
+    'equipment_type': ('Type', 'type'),
+    'flowrate': ('Flowrate', 'flowrate'),
+    'pressure': ('Pressure', 'pressure'),
+    'temperature': ('Temperature', 'temperature'),
+}
+
+TEXT_FIELDS = ('equipment_name', 'equipment_type')
+NUMERIC_FIELDS = EquipmentData.PARAMETER_FIELDS
+
+
+def resolve_columns(columns):
+    """Map every EquipmentData field to the headers present in this file."""
+    present = set(columns)
+    return {
+        field: [alias for alias in aliases if alias in present]
+        for field, aliases in COLUMN_ALIASES.items()
+    }
+
+
+def _text_column(df, headers, length):
+    result = None
+    for header in headers:
+        col = df[header]
+        # Same precedence as `row.get(a) or row.get(b)`: fall through on blanks
+        col = col.where(col.notna() & (col.astype(str) != ''))
+        result = col if result is None else result.fillna(col)
+    if result is None:
+        return np.full(length, 'Unknown', dtype=object)
+    return result.fillna('Unknown').astype(str).to_numpy(dtype=object)
+
+
+def _numeric_column(df, headers, length):
+    result = None
+    for header in headers:
+        col = pd.to_numeric(df[header], errors='coerce')
+        # A zero reading falls through to the next alias, like the old `or` chain
+        col = col.where(col != 0)
+        result = col if result is None else result.fillna(col)
+    if result is None:
+        return np.zeros(length, dtype=np.float64)
+    return result.fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def normalize_frame(df, mapping=None):
+    """Return a DataFrame holding exactly the EquipmentData columns, cleaned.
+
+    Headers are stripped and aliases resolved once for the whole frame; the
+    numeric columns are coerced column-wise with unparseable values as 0.0.
+    ``mapping`` can be passed in to reuse a resolution across chunks.
+    """
+    df.columns = [str(c).strip() for c in df.columns]
+    if mapping is None:
+        mapping = resolve_columns(df.columns)
+    length = len(df)
+    columns = {}
+    for field in TEXT_FIELDS:
+        columns[field] = _text_column(df, mapping[field], length)
+    for field in NUMERIC_FIELDS:
+        columns[field] = _numeric_column(df, mapping[field], length)
+    return pd.DataFrame(columns)
+
+
+def build_equipment_rows(dataset, frame):
+    """Build unsaved EquipmentData objects straight from the frame's columns.
+
+    Values are passed positionally in model field order, which skips the
+    per-keyword lookups of ``Model.__init__`` on every row.
+    """
+    columns = {'id': repeat(None), 'dataset_id': repeat(dataset.id)}
+    columns.update((field, frame[field].tolist()) for field in frame.columns)
+    ordered = [columns[f.attname] for f in EquipmentData._meta.concrete_fields]
+    return [EquipmentData(*values) for values in zip(*ordered)]
+
+
+def ingest_csv(dataset, file_path, chunk_size=None, on_chunk=None):
+    """Stream a CSV into EquipmentData rows for ``dataset``.
+
+    The file is read ``chunk_size`` rows at a time (``INGEST_CHUNK_SIZE`` by
+    default) and each chunk is written with its own ``bulk_create``, so peak
+    memory is bounded by the chunk, not the file. Every chunk commits on its
+    own, so SQLite's write lock is released between chunks for other
+    uploads and appends, and progress is visible while the file is parsed.
+    Readers rely on ``Dataset.status`` to skip datasets that are still
+    ingesting. The caller is expected to delete the dataset if this raises;
+    if the process dies instead, the stale job is failed and the partial
+    dataset deleted by jobs.recover_jobs, which runs at server start.
+
+    The dataset's DatasetSummary is accumulated from the same chunks and
+    saved at the end. ``on_chunk(rows_so_far)`` is called inside each
+    chunk's transaction. Returns the number of rows inserted.
+    """
+    summary = SummaryAccumulator()
+    for frame in read_frames(file_path, chunk_size):
+        with transaction.atomic():
+            EquipmentData.objects.bulk_create(build_equipment_rows(dataset, frame))
+            summary.add_frame(frame)
+            if on_chunk is not None:
+                on_chunk(summary.count)
+    summary.save(dataset)
+    return summary.count
+
+
+def append_csv(dataset, file_path, chunk_size=None, on_chunk=None):
+    """Add the rows of another CSV to an existing, ready ``dataset``.
+
+    Rows are streamed and committed chunk by chunk as in ingest_csv, so the
+    database write lock is held for one chunk at a time, not the whole
+    file. Readers don't see the new rows yet: the first chunk commits with
+    the dataset's ``last_row_id`` set just below them, and it is only
+    cleared in the commit that updates the summary and bumps the revision
+    after the last chunk, so rows, summaries, ETags and cached renders all
+    move to the new revision at once. The stored summary is extended from
+    the new rows only (see SummaryAccumulator.from_summary).
+
+    ``on_chunk(rows_so_far, first_row_id)`` is called inside each chunk's
+    transaction; ``first_row_id`` is the id of the first appended row. If
+    this raises, the caller undoes the committed chunks with
+    discard_appended_rows. Returns the number of rows added.
+    """
+    summary = SummaryAccumulator.from_summary(get_summary(dataset))
+    before = summary.count
+    first_row_id = None
+    for frame in read_frames(file_path, chunk_size):
+        with transaction.atomic():
+            rows = EquipmentData.objects.bulk_create(build_equipment_rows(dataset, frame))
+            if first_row_id is None and rows:
+                first_row_id = rows[0].id
+                # Ids only grow, so this hides exactly the append's rows
+                Dataset.objects.filter(id=dataset.id).update(last_row_id=first_row_id - 1)
+            summary.add_frame(frame)
+            if on_chunk is not None:
+                on_chunk(summary.count - before, first_row_id)
+    with transaction.atomic():
+        summary.save(dataset)
+        Dataset.objects.filter(id=dataset.id).update(
+            revision=F('revision') + 1,
+            appended_at=timezone.now(),
+            last_row_id=None,
+        )
+    return summary.count - before
+
+
+def discard_appended_rows(dataset, first_row_id):
+    """Delete the rows a failed append committed, from ``first_row_id`` on.
+
+    The rows were never visible (see append_csv), but the revision is
+    bumped all the same so anything derived from it is recomputed.
+    """
+    with transaction.atomic():
+        EquipmentData.objects.filter(dataset_id=dataset.id, id__gte=first_row_id).delete()
+        Dataset.objects.filter(id=dataset.id).update(revision=F('revision') + 1, last_row_id=None)
+
+
+def read_frames(file_path, chunk_size=None):
+    """Yield the CSV ``chunk_size`` rows at a time as normalized frames."""
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    mapping = None
+    with pd.read_csv(file_path, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            if mapping is None:
+                mapping = resolve_columns(str(c).strip() for c in chunk.columns)
+            yield normalize_frame(chunk, mapping)
+
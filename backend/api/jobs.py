@@ -0,0 +1,263 @@
+import multiprocessing
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Exists
+from django.utils import timezone
+
+from . import worker
+from .charts import invalidate_charts
+from .ingest import append_csv, discard_appended_rows, ingest_csv
+from .models import Dataset, IngestJob
+from .reports import invalidate_reports
+from .retention import delete_datasets, prune_datasets
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared ingestion pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.INGEST_WORKERS
+            if settings.INGEST_WORKER_BACKEND == 'thread':
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest')
+            else:
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=worker.init,
+                )
+        return _executor
+
+
+def _discard_executor(executor):
+    """Forget a broken pool, so the next get_executor starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def submit_ingest(job):
+    """Queue ``job`` for parsing once the surrounding transaction commits."""
+    if settings.INGEST_WORKER_BACKEND == 'inline':
+        run_ingest_job(job.id)
+        return
+    transaction.on_commit(lambda: _submit(job.id))
+
+
+def _submit(job_id, retries=1):
+    # A pool worker that dies (an OOM kill, say) breaks the whole process
+    # pool; it is replaced and the job queued on the new one. A job that
+    # can't be queued at all fails at once instead of staying queued.
+    error = None
+    for _ in range(retries + 1):
+        executor = get_executor()
+        try:
+            future = executor.submit(worker.run_ingest_job, job_id)
+        except BrokenExecutor as e:
+            _discard_executor(executor)
+            error = e
+        except Exception as e:
+            error = e
+            break
+        else:
+            future.add_done_callback(partial(_job_done, job_id, executor, retries))
+            return
+    fail_job(job_id, f'Could not start the ingest worker: {error}')
+
+
+def _job_done(job_id, executor, retries, future):
+    # run_ingest_job records its own errors, so an exception here means the
+    # pool lost the job. Jobs that never started go to a new pool; the one
+    # that was running when its worker died is not retried.
+    if future.cancelled() or future.exception() is None:
+        return
+    error = future.exception()
+    if isinstance(error, BrokenExecutor):
+        _discard_executor(executor)
+    state = IngestJob.objects.filter(id=job_id).values_list('state', flat=True).first()
+    if state == IngestJob.QUEUED and retries > 0:
+        _submit(job_id, retries - 1)
+    else:
+        fail_job(job_id, f'The ingest worker stopped: {error or type(error).__name__}')
+
+
+def fail_job(job_id, error):
+    """Mark a queued or running job failed and undo what it wrote.
+
+    A create job's dataset is deleted with any rows already committed; an
+    append deletes the rows it added and its uploaded file. Jobs that have
+    already finished are left alone. Returns whether the job was failed.
+    """
+    failed = IngestJob.objects.filter(id=job_id, state__in=[IngestJob.QUEUED, IngestJob.RUNNING]).update(
+        state=IngestJob.FAILED, error=error, finished_at=timezone.now()
+    )
+    if not failed:
+        return False
+    job = IngestJob.objects.select_related('dataset').get(id=job_id)
+    if job.kind == IngestJob.CREATE:
+        if job.dataset_id is not None:
+            delete_datasets([job.dataset_id])
+        return True
+    if job.dataset is not None:
+        if job.first_row_id is not None:
+            discard_appended_rows(job.dataset, job.first_row_id)
+        invalidate_reports(job.dataset_id)
+        invalidate_charts(job.dataset_id)
+    job.file.delete(save=False)
+    IngestJob.objects.filter(id=job_id).update(file='')
+    return True
+
+
+def recover_jobs(stale_after=None):
+    """Requeue or fail jobs that no worker is looking after any more.
+
+    A job is stale once its heartbeat is older than ``stale_after``
+    (INGEST_JOB_STALE_MINUTES by default): a running job writes one per
+    chunk, so a stale one lost its worker to a crash or a restart and is
+    failed, rolling back what it wrote (see fail_job). A stale queued job
+    lost its place in a pool and is queued again; if another pool still
+    holds it, whichever worker claims it first runs it. Runs at server
+    start, before every new upload or append and from ``manage.py
+    recover_jobs``. Returns ``(requeued, failed)`` counts.
+    """
+    if stale_after is None:
+        stale_after = timedelta(minutes=settings.INGEST_JOB_STALE_MINUTES)
+    cutoff = timezone.now() - stale_after
+    stale = IngestJob.objects.filter(heartbeat_at__lt=cutoff)
+
+    failed = 0
+    for job_id in stale.filter(state=IngestJob.RUNNING).values_list('id', flat=True):
+        failed += fail_job(job_id, 'The ingest worker stopped before the job finished')
+
+    requeued = 0
+    for job in stale.filter(state=IngestJob.QUEUED):
+        # Claimed by the heartbeat, so concurrent sweeps queue it once
+        if IngestJob.objects.filter(id=job.id, state=IngestJob.QUEUED, heartbeat_at__lt=cutoff).update(
+            heartbeat_at=timezone.now()
+        ):
+            submit_ingest(job)
+            requeued += 1
+    return requeued, failed
+
+
+def recover_jobs_at_startup():
+    """recover_jobs for a starting server; skipped while the database is unmigrated."""
+    try:
+        recover_jobs()
+    except DatabaseError:
+        pass
+
+
+def run_ingest_job(job_id):
+    """Parse the job's uploaded CSV into EquipmentData rows.
+
+    Runs inside a pool worker (through worker.run_ingest_job, which manages
+    its connections) or inline in the request. Progress is written to the
+    job after every chunk; on failure the dataset is removed and the error
+    kept on the job.
+    """
+    job = IngestJob.objects.select_related('dataset').get(id=job_id)
+    dataset = job.dataset
+    if dataset is None:
+        fail_job(job_id, 'The dataset was deleted before the job started')
+        return
+    if job.kind == IngestJob.APPEND:
+        run_append_job(job)
+        return
+    # Claimed once: a requeued job may have been handed to two pools
+    claimed = IngestJob.objects.filter(id=job_id, state=IngestJob.QUEUED).update(
+        state=IngestJob.RUNNING, started_at=timezone.now(), heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        return
+    Dataset.objects.filter(id=dataset.id).update(status=Dataset.PROCESSING)
+
+    def report(rows):
+        IngestJob.objects.filter(id=job_id).update(rows_processed=rows, heartbeat_at=timezone.now())
+
+    try:
+        rows = ingest_csv(dataset, dataset.file.path, on_chunk=report)
+    except Exception as e:
+        delete_datasets([dataset.id])
+        IngestJob.objects.filter(id=job_id).update(
+            state=IngestJob.FAILED,
+            error=f'Error parsing CSV: {str(e)}',
+            finished_at=timezone.now(),
+        )
+        return
+
+    Dataset.objects.filter(id=dataset.id).update(status=Dataset.READY)
+    IngestJob.objects.filter(id=job_id).update(
+        state=IngestJob.SUCCEEDED,
+        rows_processed=rows,
+        finished_at=timezone.now(),
+    )
+
+    # Double check history limit (if multiple uploads finished together)
+    prune_datasets()
+
+
+def run_append_job(job):
+    """Add the job's CSV to its ready dataset.
+
+    Appends to one dataset run one at a time: the job only starts if no
+    other append of its dataset is running. Chunks commit as they are
+    written, with the rows so far and the first appended row id recorded
+    on the job; on failure the rows from that id on are deleted again, so
+    the dataset is left as it was. Either way the uploaded file is removed,
+    the rows now live in the table.
+    """
+    running = IngestJob.objects.filter(dataset_id=job.dataset_id, kind=IngestJob.APPEND, state=IngestJob.RUNNING)
+    queued = IngestJob.objects.filter(id=job.id, state=IngestJob.QUEUED)
+    claimed = queued.filter(~Exists(running)).update(
+        state=IngestJob.RUNNING, started_at=timezone.now(), heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        # Unless another worker claimed it already, or it failed meanwhile
+        if queued.update(
+            state=IngestJob.FAILED,
+            error='Another append to this dataset is still running',
+            finished_at=timezone.now(),
+        ):
+            job.file.delete(save=False)
+            IngestJob.objects.filter(id=job.id).update(file='')
+        return
+
+    def report(rows, first_row_id):
+        IngestJob.objects.filter(id=job.id).update(
+            rows_processed=rows, first_row_id=first_row_id, heartbeat_at=timezone.now()
+        )
+
+    try:
+        rows = append_csv(job.dataset, job.file.path, on_chunk=report)
+    except Exception as e:
+        first_row_id = IngestJob.objects.values_list('first_row_id', flat=True).get(id=job.id)
+        if first_row_id is not None:
+            discard_appended_rows(job.dataset, first_row_id)
+        IngestJob.objects.filter(id=job.id).update(
+            state=IngestJob.FAILED,
+            error=f'Error parsing CSV: {str(e)}',
+            finished_at=timezone.now(),
+        )
+    else:
+        IngestJob.objects.filter(id=job.id).update(
+            state=IngestJob.SUCCEEDED,
+            rows_processed=rows,
+            finished_at=timezone.now(),
+        )
+    finally:
+        # Renders of the previous revision are never served again
+        invalidate_reports(job.dataset_id)
+        invalidate_charts(job.dataset_id)
+        job.file.delete(save=False)
+        IngestJob.objects.filter(id=job.id).update(file='')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Dataset
+from api.summaries import build_summary
+
+
+class Command(BaseCommand):
+    help = "Compute the stored DatasetSummary for datasets that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Rebuild every summary, not only the missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.filter(status=Dataset.READY)
+        if not options['all']:
+            datasets = datasets.filter(summary__isnull=True)
+
+        built = 0
+        for dataset in datasets.iterator():
+            summary = build_summary(dataset)
+            built += 1
+            self.stdout.write(f"Dataset {dataset.id}: {summary.total_count} rows")
+        self.stdout.write(self.style.SUCCESS(f"Built {built} summaries."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.retention import expired_dataset_ids, prune_datasets
+
+
+class Command(BaseCommand):
+    help = "Delete datasets outside the retention policy, with their rows and files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int,
+            help="Keep this many newest datasets (default: RETENTION_KEEP_DATASETS).",
+        )
+        parser.add_argument(
+            '--max-age-days', type=float,
+            help="Also drop datasets older than this (default: RETENTION_MAX_AGE_DAYS).",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="List the datasets that would be deleted without deleting them.",
+        )
+
+    def handle(self, *args, **options):
+        keep, max_age_days = options['keep'], options['max_age_days']
+        if options['dry_run']:
+            ids = sorted(expired_dataset_ids(keep, max_age_days))
+            self.stdout.write(f"Would delete {len(ids)} datasets: {ids}")
+            return
+        deleted = prune_datasets(keep, max_age_days)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} datasets."))
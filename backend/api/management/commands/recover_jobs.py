@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import recover_jobs
+
+
+class Command(BaseCommand):
+    help = "Fail or requeue ingest jobs whose worker has stopped sending heartbeats."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes', type=float,
+            help="Heartbeat age after which a job counts as lost (default: INGEST_JOB_STALE_MINUTES).",
+        )
+
+    def handle(self, *args, **options):
+        minutes = options['stale_minutes']
+        stale_after = timedelta(minutes=minutes) if minutes is not None else None
+        requeued, failed = recover_jobs(stale_after)
+        self.stdout.write(self.style.SUCCESS(f"Requeued {requeued} jobs, failed {failed}."))
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:37
+
+import os
+
+from django.db import migrations, models
+
+
+def hash_existing_files(apps, schema_editor):
+    from api.uploadhandlers import file_sha256
+
+    Dataset = apps.get_model('api', 'Dataset')
+    for dataset in Dataset.objects.all():
+        if dataset.file and os.path.exists(dataset.file.path):
+            dataset.content_hash = file_sha256(dataset.file.path)
+            dataset.save(update_fields=['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_ingest_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.RunPython(hash_existing_files, migrations.RunPython.noop),
+    ]
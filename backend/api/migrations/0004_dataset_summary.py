@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_dataset_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetSummary',
+            fields=[
+                ('dataset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.dataset')),
+                ('total_count', models.PositiveBigIntegerField(default=0)),
+                ('parameters', models.JSONField(default=dict)),
+                ('type_counts', models.JSONField(default=dict)),
+            ],
+        ),
+    ]
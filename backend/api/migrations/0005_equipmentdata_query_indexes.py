@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_dataset_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['dataset', 'equipment_type'], name='equipdata_dataset_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['dataset', 'equipment_name'], name='equipdata_dataset_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['dataset', 'flowrate'], name='equipdata_dataset_flow_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['dataset', 'pressure'], name='equipdata_dataset_press_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdata',
+            index=models.Index(fields=['dataset', 'temperature'], name='equipdata_dataset_temp_idx'),
+        ),
+    ]
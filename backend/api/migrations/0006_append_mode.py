@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_equipmentdata_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='appended_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ingestjob',
+            name='file',
+            field=models.FileField(blank=True, upload_to='uploads/'),
+        ),
+        migrations.AddField(
+            model_name='ingestjob',
+            name='kind',
+            field=models.CharField(choices=[('create', 'Create'), ('append', 'Append')], default='create', max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='first_row_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_ingestjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='last_row_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
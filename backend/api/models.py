@@ -1,13 +1,45 @@
 from django.db import models
+from django.utils import timezone
 
 class Dataset(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    READY = 'ready'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+    ]
+
     file = models.FileField(upload_to='uploads/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=READY)
+    # SHA-256 of the uploaded file, used to spot re-uploads of the same CSV
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Bumped by every append; part of the cache keys and ETags of the dataset
+    revision = models.PositiveIntegerField(default=0)
+    appended_at = models.DateTimeField(null=True, blank=True)
+    # Set while an append is writing: the last row readers may see. The
+    # append's rows lie past it until it commits; None shows every row
+    last_row_id = models.PositiveBigIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"Dataset {self.id} - {self.uploaded_at}"
 
+class EquipmentDataQuerySet(models.QuerySet):
+    def of_dataset(self, dataset):
+        """Rows of ``dataset`` as of the revision ``dataset`` was read at."""
+        rows = self.filter(dataset_id=dataset.id)
+        if dataset.last_row_id is not None:
+            rows = rows.filter(id__lte=dataset.last_row_id)
+        return rows
+
 class EquipmentData(models.Model):
+    # Numeric readings summarised and charted per dataset
+    PARAMETER_FIELDS = ('flowrate', 'pressure', 'temperature')
+
+    objects = EquipmentDataQuerySet.as_manager()
+
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='data')
     equipment_name = models.CharField(max_length=255)
     equipment_type = models.CharField(max_length=255)
@@ -15,5 +47,91 @@ class EquipmentData(models.Model):
     pressure = models.FloatField()
     temperature = models.FloatField()
 
+    class Meta:
+        # Serve the filters of the dataset query endpoint. The plain dataset
+        # FK index stays: it is the only one in id order for a whole dataset,
+        # which the unfiltered rows endpoint pages through.
+        indexes = [
+            models.Index(fields=['dataset', 'equipment_type'], name='equipdata_dataset_type_idx'),
+            models.Index(fields=['dataset', 'equipment_name'], name='equipdata_dataset_name_idx'),
+            models.Index(fields=['dataset', 'flowrate'], name='equipdata_dataset_flow_idx'),
+            models.Index(fields=['dataset', 'pressure'], name='equipdata_dataset_press_idx'),
+            models.Index(fields=['dataset', 'temperature'], name='equipdata_dataset_temp_idx'),
+        ]
+
     def __str__(self):
         return self.equipment_name
+
+class DatasetSummary(models.Model):
+    # Filled in at ingest and updated from the new rows on every append
+    dataset = models.OneToOneField(Dataset, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    total_count = models.PositiveBigIntegerField(default=0)
+    # {'flowrate': {'mean': ..., 'min': ..., 'max': ..., 'm2': ...}, 'pressure': ..., 'temperature': ...}
+    # m2 is the sum of squared deviations from the mean (Welford), so the
+    # variance can be kept up to date without revisiting old rows
+    parameters = models.JSONField(default=dict)
+    # {'<equipment_type>': count}
+    type_counts = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Summary of dataset {self.dataset_id}"
+
+    def std(self, field):
+        # Sample standard deviation, as pandas computes it
+        m2 = self.parameters[field].get('m2')
+        if m2 is None or self.total_count < 2:
+            return None
+        return (max(m2, 0.0) / (self.total_count - 1)) ** 0.5
+
+class IngestJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    CREATE = 'create'
+    APPEND = 'append'
+    KIND_CHOICES = [
+        (CREATE, 'Create'),
+        (APPEND, 'Append'),
+    ]
+
+    # Kept after a failed parse deletes its dataset, so the error stays readable
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, related_name='jobs')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=CREATE)
+    # The CSV being appended; a create job reads the dataset's own file
+    file = models.FileField(upload_to='uploads/', blank=True)
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=QUEUED)
+    rows_processed = models.PositiveBigIntegerField(default=0)
+    # First EquipmentData id an append wrote; rows of its dataset from there
+    # on are deleted again if the append fails part-way
+    first_row_id = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last sign of life: creation, a requeue, the claim and every chunk.
+    # recover_jobs treats queued or running jobs quiet for too long as lost
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"IngestJob {self.id} ({self.state})"
+
+class UploadSession(models.Model):
+    """A resumable upload: chunks are appended to a part file on disk until
+    ``received`` reaches ``size``, then the file is handed to ingestion."""
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Bytes stored so far; the next chunk must start at this offset
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"UploadSession {self.id} ({self.received}/{self.size})"
@@ -0,0 +1,108 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks on ``(ordering field, id)``.
+
+    Unlike offset paging, fetching page N costs the same as page 1: the
+    cursor carries the last row's sort value and id, and the next page is a
+    ``WHERE (field, id) > (value, id)`` range scan. The queryset must be a
+    ``values()`` queryset; rows are returned as plain dicts.
+    """
+
+    page_size = 100
+    max_page_size = 10000
+    ordering_fields = ('id',)
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    ordering_query_param = 'ordering'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        field, descending = self.get_ordering(request)
+        self.field = field
+        self.descending = descending
+
+        # The cursor needs the sort value and id even if the client didn't ask for them
+        requested = list(queryset.query.values_select)
+        extra = [f for f in dict.fromkeys((field, 'id')) if f not in requested]
+        if extra:
+            queryset = queryset.values(*requested, *extra)
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, last_id = cursor
+            op = 'lt' if descending else 'gt'
+            if field == 'id':
+                queryset = queryset.filter(**{f'id__{op}': last_id})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': last_id})
+                )
+
+        rows = list(queryset[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.last = (rows[-1][field], rows[-1]['id']) if rows else None
+        if extra:
+            for row in rows:
+                for f in extra:
+                    del row[f]
+        return rows
+
+    def get_limit(self, request):
+        raw = request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Must be at least 1.'})
+        return min(limit, self.max_page_size)
+
+    def get_ordering(self, request):
+        raw = request.query_params.get(self.ordering_query_param, 'id')
+        descending = raw.startswith('-')
+        field = raw.lstrip('-')
+        if field not in self.ordering_fields:
+            raise ValidationError({'ordering': f"Must be one of: {', '.join(self.ordering_fields)}."})
+        return field, descending
+
+    def decode_cursor(self, request):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            value, last_id = json.loads(base64.urlsafe_b64decode(raw.encode('ascii')))
+            return value, int(last_id)
+        except (TypeError, ValueError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+    def encode_cursor(self, value, last_id):
+        raw = json.dumps([value, last_id], separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.last))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,174 @@
+import os
+import zlib
+from array import array
+
+from PIL import Image
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Standard Type 1 fonts every PDF viewer has; no embedding needed
+FONTS = {
+    'Helvetica': b'F1',
+    'Helvetica-Bold': b'F2',
+}
+
+CATALOG_ID = 1
+PAGES_ID = 2
+FIRST_FONT_ID = 3
+
+
+def _escape(text):
+    data = str(text).encode('cp1252', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class StreamingPDF:
+    """A small PDF writer that flushes every page to the output as it ends.
+
+    reportlab's canvas keeps every finished page in memory until ``save()``,
+    so memory grows with the page count. This writer compresses and writes
+    each page as soon as ``showPage()`` is called and only remembers object
+    offsets, which keeps memory flat for reports of any length. The drawing
+    methods mirror the reportlab canvas ones the report uses; reportlab's
+    font metrics are reused for alignment.
+    """
+
+    def __init__(self, output, pagesize=letter):
+        self._owns_file = isinstance(output, (str, os.PathLike))
+        self._file = open(output, 'wb') if self._owns_file else output
+        self._start = self._file.tell()
+        self.pagesize = pagesize
+        # Byte offset of each object, indexed by object number (0 unused)
+        self._offsets = array('q', [0] * (FIRST_FONT_ID + len(FONTS)))
+        self._page_ids = array('q')
+        self._ops = []
+        self._images = {}
+        self._font = ('Helvetica', 12)
+
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for index, (name, key) in enumerate(FONTS.items()):
+            self._write_object(
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /' + name.encode('ascii')
+                + b' /Encoding /WinAnsiEncoding >>',
+                number=FIRST_FONT_ID + index,
+            )
+
+    def _write(self, data):
+        self._file.write(data)
+
+    def _tell(self):
+        return self._file.tell() - self._start
+
+    def _new_object_id(self):
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def _write_object(self, body, number=None, stream=None):
+        if number is None:
+            number = self._new_object_id()
+        self._offsets[number] = self._tell()
+        self._write(f'{number} 0 obj\n'.encode('ascii') + body)
+        if stream is not None:
+            self._write(b'\nstream\n' + stream + b'\nendstream')
+        self._write(b'\nendobj\n')
+        return number
+
+    # Drawing
+
+    def setFont(self, name, size):
+        self._font = (name, size)
+
+    def _text_op(self, x, y, text):
+        name, size = self._font
+        return b'BT /%s %g Tf %.2f %.2f Td (%s) Tj ET' % (FONTS[name], size, x, y, _escape(text))
+
+    def drawString(self, x, y, text):
+        self._ops.append(self._text_op(x, y, text))
+
+    def drawRightString(self, x, y, text):
+        self.drawString(x - self.stringWidth(text), y, text)
+
+    def drawCentredString(self, x, y, text):
+        self.drawString(x - self.stringWidth(text) / 2, y, text)
+
+    def stringWidth(self, text):
+        name, size = self._font
+        return stringWidth(str(text), name, size)
+
+    def drawTextLines(self, x, y, lines, leading):
+        """Draw ``lines`` top-down from ``(x, y)`` as one text object."""
+        name, size = self._font
+        parts = [b'BT /%s %g Tf %g TL %.2f %.2f Td' % (FONTS[name], size, leading, x, y)]
+        for index, line in enumerate(lines):
+            parts.append(b'(%s) Tj' % _escape(line) if index == 0 else b'T* (%s) Tj' % _escape(line))
+        parts.append(b'ET')
+        self._ops.append(b' '.join(parts))
+
+    def line(self, x1, y1, x2, y2):
+        self._ops.append(b'%.2f %.2f m %.2f %.2f l S' % (x1, y1, x2, y2))
+
+    def drawImage(self, path, x, y, width, height):
+        """Draw the image file at ``path`` scaled into the given box.
+
+        The pixels are written out as an image object straight away; the
+        page only keeps a reference to it.
+        """
+        with Image.open(path) as image:
+            image = image.convert('RGB')
+            pixels = zlib.compress(image.tobytes())
+            image_id = self._write_object(
+                b'<< /Type /XObject /Subtype /Image /Width %d /Height %d '
+                b'/ColorSpace /DeviceRGB /BitsPerComponent 8 /Length %d /Filter /FlateDecode >>'
+                % (image.width, image.height, len(pixels)),
+                stream=pixels,
+            )
+        name = b'Im%d' % image_id
+        self._images[name] = image_id
+        self._ops.append(b'q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q' % (width, height, x, y, name))
+
+    # Pages
+
+    def showPage(self):
+        content = zlib.compress(b'\n'.join(self._ops))
+        contents_id = self._write_object(
+            b'<< /Length %d /Filter /FlateDecode >>' % len(content), stream=content
+        )
+        fonts = b' '.join(
+            b'/%s %d 0 R' % (key, FIRST_FONT_ID + index) for index, key in enumerate(FONTS.values())
+        )
+        resources = b'/Font << %s >>' % fonts
+        if self._images:
+            resources += b' /XObject << %s >>' % b' '.join(
+                b'/%s %d 0 R' % (name, image_id) for name, image_id in self._images.items()
+            )
+        width, height = self.pagesize
+        page_id = self._write_object(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %g %g] '
+            b'/Resources << %s >> /Contents %d 0 R >>'
+            % (PAGES_ID, width, height, resources, contents_id)
+        )
+        self._page_ids.append(page_id)
+        self._ops = []
+        self._images = {}
+
+    def save(self):
+        if self._ops or not self._page_ids:
+            self.showPage()
+
+        self._offsets[PAGES_ID] = self._tell()
+        self._write(b'%d 0 obj\n<< /Type /Pages /Count %d /Kids [' % (PAGES_ID, len(self._page_ids)))
+        for page_id in self._page_ids:
+            self._write(b'%d 0 R ' % page_id)
+        self._write(b'] >>\nendobj\n')
+        self._write_object(b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID, number=CATALOG_ID)
+
+        xref = self._tell()
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % len(self._offsets))
+        for offset in self._offsets[1:]:
+            self._write(b'%010d 00000 n \n' % offset)
+        self._write(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (len(self._offsets), CATALOG_ID, xref)
+        )
+        if self._owns_file:
+            self._file.close()
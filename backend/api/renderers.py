@@ -0,0 +1,97 @@
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for the MessagePack format
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: only needed for the Arrow format
+    pa = None
+
+# Low-cardinality text columns sent as {'dictionary': [...], 'codes': [...]}
+DICTIONARY_FIELDS = ('equipment_type',)
+
+
+def dictionary_encode(values):
+    index = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return {'dictionary': list(index), 'codes': codes}
+
+
+def rows_to_columns(rows, fields):
+    """Transpose ``values()`` rows into one list per field.
+
+    Every key name is sent once instead of once per row, and the fields in
+    DICTIONARY_FIELDS are dictionary-encoded.
+    """
+    columns = {}
+    for field in fields:
+        values = [row[field] for row in rows]
+        columns[field] = dictionary_encode(values) if field in DICTIONARY_FIELDS else values
+    return columns
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """Column-oriented JSON: ``{'next', 'count', 'columns': {field: [...]}}``."""
+    media_type = 'application/vnd.equipment.columns+json'
+    format = 'columns'
+    columnar = True
+
+
+class MessagePackRenderer(BaseRenderer):
+    """The columnar payload encoded as MessagePack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True)
+
+
+class ArrowStreamRenderer(BaseRenderer):
+    """The columnar payload as an Arrow IPC stream.
+
+    Dictionary-encoded columns become Arrow dictionary arrays; the next-page
+    link travels in the schema metadata under ``next``.
+    """
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        arrays = {}
+        for field, values in data['columns'].items():
+            if isinstance(values, dict):
+                arrays[field] = pa.DictionaryArray.from_arrays(
+                    pa.array(values['codes'], type=pa.int32()),
+                    pa.array(values['dictionary'], type=pa.string()),
+                )
+            else:
+                arrays[field] = pa.array(values)
+        table = pa.table(arrays)
+        table = table.replace_schema_metadata({'next': data.get('next') or ''})
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def row_renderer_classes():
+    """Renderers offered by the dataset row endpoints, skipping missing extras."""
+    renderers = [JSONRenderer, BrowsableAPIRenderer, ColumnarJSONRenderer]
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer)
+    if pa is not None:
+        renderers.append(ArrowStreamRenderer)
+    return renderers
@@ -0,0 +1,104 @@
+import glob
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .charts import CHART_KINDS, get_chart
+from .models import EquipmentData
+from .summaries import get_summary
+from .utils import generate_pdf
+
+# Bump whenever generate_pdf's output changes so cached reports are re-rendered
+REPORT_VERSION = 3
+
+# A lock file older than this is assumed to belong to a crashed renderer
+STALE_LOCK_SECONDS = 600
+
+# In-process render locks, picked by path. A fixed set, so they don't pile
+# up with every report ever rendered; two reports that share a lock just
+# render one after the other
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def report_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'reports')
+
+
+def report_path(dataset_id, revision=0):
+    name = f'report_{dataset_id}_r{revision}_v{REPORT_VERSION}.pdf'
+    return os.path.join(report_dir(), name)
+
+
+def _thread_lock(path):
+    return _locks[hash(path) % len(_locks)]
+
+
+def _acquire_file_lock(lock_path, target):
+    """Take the cross-process render lock, or return False once ``target``
+    has been produced by whoever holds it."""
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            if os.path.exists(target):
+                return False
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.05)
+
+
+def get_report(dataset):
+    """Return the path of the dataset's PDF report, rendering it if needed.
+
+    Concurrent requests for the same uncached report render it once: threads
+    of one worker queue on an in-process lock, other worker processes on a
+    lock file next to the report. The PDF is written to a temporary file and
+    moved into place, so readers never see a half-written report.
+    """
+    path = report_path(dataset.id, dataset.revision)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(report_dir(), exist_ok=True)
+    with _thread_lock(path):
+        if os.path.exists(path):
+            return path
+        lock_path = path + '.lock'
+        if not _acquire_file_lock(lock_path, path):
+            return path
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            data = EquipmentData.objects.of_dataset(dataset)
+            summary = get_summary(dataset)
+            # Same cached PNGs the chart endpoint serves
+            charts = [
+                get_chart(dataset, summary, kind, 'large', 'png') for kind in CHART_KINDS
+            ] if summary.total_count else []
+            generate_pdf(dataset, summary, data, output=tmp_path, charts=charts)
+            os.replace(tmp_path, path)
+        finally:
+            # After a failed render too, so waiting requests retry at once
+            # instead of until the lock goes stale
+            for leftover in (tmp_path, lock_path):
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+    return path
+
+
+def invalidate_reports(dataset_id):
+    """Remove every cached report of a dataset, whatever its revision or
+    template version."""
+    for path in glob.glob(os.path.join(report_dir(), f'report_{dataset_id}_*.pdf')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
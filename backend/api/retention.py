@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Dataset, DatasetSummary, EquipmentData, IngestJob
+
+
+def expired_dataset_ids(keep=None, max_age_days=None):
+    """Ids of datasets outside the retention policy.
+
+    ``keep`` defaults to RETENTION_KEEP_DATASETS (the newest N survive) and
+    ``max_age_days`` to RETENTION_MAX_AGE_DAYS; ``None`` disables either rule.
+    Datasets stuck ingesting past RETENTION_PENDING_GRACE_HOURS are always
+    included.
+    """
+    if keep is None:
+        keep = settings.RETENTION_KEEP_DATASETS
+    if max_age_days is None:
+        max_age_days = settings.RETENTION_MAX_AGE_DAYS
+
+    ids = set()
+    if keep is not None:
+        ranked = Dataset.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True)
+        ids.update(ranked[keep:])
+    if max_age_days is not None:
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        ids.update(Dataset.objects.filter(uploaded_at__lt=cutoff).values_list('id', flat=True))
+    ids.update(_stuck_datasets().values_list('id', flat=True))
+    return ids
+
+
+def _stuck_datasets():
+    cutoff = timezone.now() - timedelta(hours=settings.RETENTION_PENDING_GRACE_HOURS)
+    return Dataset.objects.exclude(status=Dataset.READY).filter(uploaded_at__lt=cutoff)
+
+
+def _remove_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass
+
+
+def delete_datasets(ids):
+    """Delete datasets and everything hanging off them, set-wise.
+
+    Rows and summaries go in one ``DELETE ... WHERE dataset_id IN (...)``
+    each, so the collector never loads EquipmentData; only the datasets
+    themselves are fetched, for the post_delete signal that drops their
+    cached reports and charts. Uploaded files are removed once the
+    transaction commits, so a rollback never leaves a dataset without its
+    file. Returns the number of datasets deleted.
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    with transaction.atomic():
+        files = [name for name in Dataset.objects.filter(id__in=ids).values_list('file', flat=True) if name]
+        EquipmentData.objects.filter(dataset_id__in=ids).delete()
+        DatasetSummary.objects.filter(dataset_id__in=ids).delete()
+        _, deleted = Dataset.objects.filter(id__in=ids).delete()
+        transaction.on_commit(lambda: _remove_files(files))
+    return deleted.get(Dataset._meta.label, 0)
+
+
+def prune_datasets(keep=None, max_age_days=None):
+    """Apply the retention policy; see expired_dataset_ids for the arguments.
+
+    Datasets still being ingested are not pruned, the ingest job prunes
+    again once it finishes, unless they have been stuck past the grace
+    period; their jobs are failed. The candidates are locked and re-read
+    inside the transaction, so concurrent uploads pruning at the same time
+    delete each dataset once. Returns the number of datasets deleted.
+    """
+    with transaction.atomic():
+        ids = expired_dataset_ids(keep, max_age_days)
+        if not ids:
+            return 0
+        deletable = list(
+            Dataset.objects.select_for_update()
+            .filter(Q(status=Dataset.READY) | Q(id__in=_stuck_datasets()), id__in=ids)
+            .values_list('id', flat=True)
+        )
+        IngestJob.objects.filter(dataset_id__in=deletable, state__in=[IngestJob.QUEUED, IngestJob.RUNNING]).update(
+            state=IngestJob.FAILED, error='Ingestion did not finish in time', finished_at=timezone.now(),
+        )
+        return delete_datasets(deletable)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Dataset, EquipmentData
+from .models import Dataset, EquipmentData, IngestJob
 
 class EquipmentDataSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,4 +9,10 @@ class EquipmentDataSerializer(serializers.ModelSerializer):
 class DatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dataset
-        fields = ['id', 'file', 'uploaded_at']
+        fields = ['id', 'file', 'uploaded_at', 'status', 'revision', 'appended_at']
+        read_only_fields = ['status', 'revision', 'appended_at']
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestJob
+        fields = ['id', 'dataset', 'kind', 'state', 'rows_processed', 'error', 'created_at', 'started_at', 'finished_at']
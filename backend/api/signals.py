@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Dataset
+from .charts import invalidate_charts
+from .reports import invalidate_reports
+
+
+@receiver(post_delete, sender=Dataset)
+def drop_cached_renders(sender, instance, **kwargs):
+    invalidate_reports(instance.id)
+    invalidate_charts(instance.id)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
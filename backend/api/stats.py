@@ -0,0 +1,96 @@
+import numpy as np
+from django.core.cache import cache
+
+from .caching import dataset_cache_key
+from .frames import NUMERIC_FIELDS, dataset_frame
+
+QUANTILES = {'p5': 0.05, 'p50': 0.5, 'p95': 0.95}
+BASIC_STATS = ('mean', 'std', 'min', 'max')
+DEFAULT_BINS = 20
+MAX_BINS = 200
+
+
+def _number(value):
+    # JSON has no NaN; std of a single row is undefined
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _histograms(frame, types, bins):
+    """Histogram every parameter overall and per type in one bincount each.
+
+    Bin edges are shared by all types, so the per-type counts line up with
+    the overall ones and with each other.
+    """
+    codes = types.cat.codes.to_numpy().astype(np.int64)
+    n_types = len(types.cat.categories)
+    histograms = {}
+    for field in NUMERIC_FIELDS:
+        values = frame[field].to_numpy()
+        edges = np.histogram_bin_edges(values, bins=bins)
+        # Same bins as np.histogram: half-open, the last one closed
+        index = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+        counts = np.bincount(codes * bins + index, minlength=n_types * bins).reshape(n_types, bins)
+        histograms[field] = {
+            'edges': edges.tolist(),
+            'counts': counts.sum(axis=0).tolist(),
+            'by_type': dict(zip(types.cat.categories.tolist(), counts.tolist())),
+        }
+    return histograms
+
+
+def compute_stats(frame, bins=DEFAULT_BINS):
+    """Distribution statistics of a dataset frame, overall and per type.
+
+    Every statistic comes from a few vectorized pandas/NumPy reductions over
+    the whole frame: one grouped aggregate, one grouped quantile and one
+    bincount per parameter, whatever the number of types.
+    """
+    fields = list(NUMERIC_FIELDS)
+    types = frame['equipment_type'].cat.remove_unused_categories()
+    values = frame[fields]
+
+    overall_basic = values.agg(list(BASIC_STATS))
+    overall_quantiles = values.quantile(list(QUANTILES.values()))
+    overall = {
+        field: {
+            **{stat: _number(overall_basic.at[stat, field]) for stat in BASIC_STATS},
+            **{name: _number(overall_quantiles.at[q, field]) for name, q in QUANTILES.items()},
+        }
+        for field in fields
+    }
+
+    grouped = values.groupby(types, observed=True, sort=True)
+    sizes = grouped.size()
+    basic = grouped.agg(list(BASIC_STATS))
+    quantiles = grouped.quantile(list(QUANTILES.values())).unstack()
+    by_type = {}
+    for eq_type in basic.index:
+        by_type[eq_type] = {
+            'count': int(sizes.at[eq_type]),
+            'parameters': {
+                field: {
+                    **{stat: _number(basic.at[eq_type, (field, stat)]) for stat in BASIC_STATS},
+                    **{name: _number(quantiles.at[eq_type, (field, q)]) for name, q in QUANTILES.items()},
+                }
+                for field in fields
+            },
+        }
+
+    return {
+        'total_count': len(frame),
+        'bins': bins,
+        'overall': overall,
+        'by_type': by_type,
+        'histograms': _histograms(frame, types, bins),
+    }
+
+
+def get_stats(dataset, bins=DEFAULT_BINS):
+    """Return the dataset's statistics, computed once per dataset and bin count."""
+    key = dataset_cache_key(dataset, 'stats', bins)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats(dataset_frame(dataset), bins)
+        cache.set(key, stats)
+    return stats
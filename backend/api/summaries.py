@@ -0,0 +1,114 @@
+from collections import Counter
+
+import pandas as pd
+from django.conf import settings
+
+from .models import DatasetSummary, EquipmentData
+
+NUMERIC_FIELDS = EquipmentData.PARAMETER_FIELDS
+
+
+class SummaryAccumulator:
+    """Collects count, mean, variance, min/max and type counts chunk by chunk.
+
+    Each ``add_frame`` call does a handful of vectorized column reductions
+    and merges them into the running totals with the parallel form of
+    Welford's update (Chan et al.), so ingesting a file never needs a second
+    pass over its rows. Started from a stored summary with
+    ``from_summary``, it extends that summary with new rows only.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.means = dict.fromkeys(NUMERIC_FIELDS, 0.0)
+        self.m2s = dict.fromkeys(NUMERIC_FIELDS, 0.0)
+        self.mins = dict.fromkeys(NUMERIC_FIELDS)
+        self.maxs = dict.fromkeys(NUMERIC_FIELDS)
+        self.type_counts = Counter()
+
+    @classmethod
+    def from_summary(cls, summary):
+        if summary.total_count and any('m2' not in summary.parameters[f] for f in NUMERIC_FIELDS):
+            # Stored before variance was tracked: rebuild it once
+            summary = build_summary(summary.dataset)
+        accumulator = cls()
+        accumulator.count = summary.total_count
+        for field in NUMERIC_FIELDS:
+            stats = summary.parameters[field]
+            accumulator.means[field] = stats['mean'] or 0.0
+            accumulator.m2s[field] = stats.get('m2') or 0.0
+            accumulator.mins[field] = stats['min']
+            accumulator.maxs[field] = stats['max']
+        accumulator.type_counts.update(summary.type_counts)
+        return accumulator
+
+    def add_frame(self, frame):
+        if not len(frame):
+            return
+        n_a, n_b = self.count, len(frame)
+        n = n_a + n_b
+        for field in NUMERIC_FIELDS:
+            col = frame[field]
+            mean_b = float(col.mean())
+            m2_b = float(((col - mean_b) ** 2).sum())
+            delta = mean_b - self.means[field]
+            self.means[field] += delta * n_b / n
+            self.m2s[field] += m2_b + delta * delta * n_a * n_b / n
+            low, high = float(col.min()), float(col.max())
+            self.mins[field] = low if self.mins[field] is None else min(self.mins[field], low)
+            self.maxs[field] = high if self.maxs[field] is None else max(self.maxs[field], high)
+        self.count = n
+        counts = frame['equipment_type'].value_counts()
+        self.type_counts.update(dict(zip(counts.index.tolist(), counts.tolist())))
+
+    def as_fields(self):
+        parameters = {
+            field: {
+                'mean': self.means[field] if self.count else None,
+                'min': self.mins[field],
+                'max': self.maxs[field],
+                'm2': self.m2s[field] if self.count else None,
+            }
+            for field in NUMERIC_FIELDS
+        }
+        return {
+            'total_count': self.count,
+            'parameters': parameters,
+            'type_counts': dict(sorted(self.type_counts.items())),
+        }
+
+    def save(self, dataset):
+        summary, _ = DatasetSummary.objects.update_or_create(dataset=dataset, defaults=self.as_fields())
+        return summary
+
+
+def build_summary(dataset, chunk_size=None):
+    """Compute and store the summary of an already ingested dataset.
+
+    Used for datasets that predate DatasetSummary or its variance tracking.
+    The rows are read in id order, ``chunk_size`` at a time
+    (``INGEST_CHUNK_SIZE`` by default), and fed through the same
+    SummaryAccumulator ingest uses, so memory stays bounded and the
+    variance comes from Welford's update rather than ``E[x^2] - mean^2``,
+    which cancels for large readings with a small spread.
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    columns = ('id', 'equipment_type', *NUMERIC_FIELDS)
+    rows = EquipmentData.objects.of_dataset(dataset).order_by('id').values_list(*columns)
+    summary = SummaryAccumulator()
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        summary.add_frame(pd.DataFrame(chunk, columns=columns))
+        last_id = chunk[-1][0]
+    return summary.save(dataset)
+
+
+def get_summary(dataset):
+    """Return the stored summary, building it on first access if missing."""
+    try:
+        return dataset.summary
+    except DatasetSummary.DoesNotExist:
+        return build_summary(dataset)
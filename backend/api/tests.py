@@ -1,3 +1,1662 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from itertools import islice
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .charts import CHART_KINDS, chart_dir, chart_path, render_chart, request_chart
+from .compare import compare_frames
+from .downsample import METHODS, downsample, lttb, minmax_decimate
+from .ingest import NUMERIC_FIELDS, build_equipment_rows, ingest_csv, normalize_frame, read_frames
+from .jobs import recover_jobs, recover_jobs_at_startup, run_ingest_job
+from .models import Dataset, DatasetSummary, EquipmentData, IngestJob, UploadSession
+from .renderers import msgpack, pa
+from . import reports
+from .reports import get_report, report_dir, report_path
+from .retention import prune_datasets
+from .stats import compute_stats
+from .summaries import SummaryAccumulator, build_summary, get_summary
+from .uploadhandlers import file_sha256
+from .utils import generate_pdf, rows_per_page
+
+
+def make_csv(rows, seed=0):
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    for i in range(rows):
+        lines.append(f'E-{seed}-{i},Type {i % 7},{i % 300}.5,{i % 40}.25,{i % 250}.75')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class MediaTestMixin:
+    """Gives every test its own MEDIA_ROOT and runs ingest jobs inline.
+
+    ``test_settings`` overrides further settings for the whole class.
+    """
+    test_settings = {}
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(**{
+            'MEDIA_ROOT': self.media_root, 'INGEST_WORKER_BACKEND': 'inline', **self.test_settings,
+        }))
+
+    def upload_dataset(self, rows, name='plant.csv'):
+        """Upload a CSV of ``rows`` generated rows; returns its dataset."""
+        response = self.client.post('/api/upload/', {'file': SimpleUploadedFile(name, make_csv(rows))})
+        return Dataset.objects.get(id=response.json()['dataset'])
+
+
+# Ingestion and background jobs
+
+
+class NormalizeFrameTests(SimpleTestCase):
+    def frame(self, data):
+        return normalize_frame(pd.DataFrame(data))
+
+    def test_canonical_and_lowercase_headers(self):
+        for headers in (
+            ('Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'),
+            ('equipment_name', 'type', 'flowrate', 'pressure', 'temperature'),
+            (' Equipment Name', 'Type ', ' flowrate ', 'Pressure', 'temperature'),
+        ):
+            with self.subTest(headers=headers):
+                frame = self.frame(dict(zip(headers, (['P-1'], ['Pump'], ['1.5'], [2], [3.25]))))
+                self.assertEqual(list(frame.columns), ['equipment_name', 'equipment_type', *NUMERIC_FIELDS])
+                self.assertEqual(frame.iloc[0].tolist(), ['P-1', 'Pump', 1.5, 2.0, 3.25])
+
+    def test_blank_and_zero_fall_through_to_the_other_alias(self):
+        frame = self.frame({
+            'Equipment Name': ['P-1', '', None],
+            'equipment_name': ['x', 'P-2', 'P-3'],
+            'Flowrate': [0, None, 4.0],
+            'flowrate': [1.0, 2.0, 9.0],
+        })
+        self.assertEqual(frame['equipment_name'].tolist(), ['P-1', 'P-2', 'P-3'])
+        self.assertEqual(frame['flowrate'].tolist(), [1.0, 2.0, 4.0])
+
+    def test_missing_and_unparseable_values(self):
+        frame = self.frame({'Equipment Name': ['P-1', None], 'Pressure': ['high', '7']})
+        self.assertEqual(frame['equipment_name'].tolist(), ['P-1', 'Unknown'])
+        self.assertEqual(frame['equipment_type'].tolist(), ['Unknown', 'Unknown'])
+        self.assertEqual(frame['pressure'].tolist(), [0.0, 7.0])
+        self.assertEqual(frame['flowrate'].tolist(), [0.0, 0.0])
+        self.assertEqual(frame['temperature'].dtype, np.float64)
+
+    def test_rows_are_built_from_the_columns(self):
+        dataset = Dataset(id=7)
+        frame = self.frame({'Type': ['Pump', 'Valve'], 'Temperature': [10, 20]})
+        rows = build_equipment_rows(dataset, frame)
+        self.assertEqual([row.dataset_id for row in rows], [7, 7])
+        self.assertEqual([row.equipment_type for row in rows], ['Pump', 'Valve'])
+        self.assertEqual([row.temperature for row in rows], [10.0, 20.0])
+        self.assertEqual([row.equipment_name for row in rows], ['Unknown', 'Unknown'])
+
+
+class ChunkedIngestTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.media_root, 'plant.csv')
+        with open(self.path, 'wb') as f:
+            f.write(make_csv(700))
+
+    def test_frames_split_at_the_chunk_size(self):
+        sizes = [len(frame) for frame in read_frames(self.path, chunk_size=300)]
+        self.assertEqual(sizes, [300, 300, 100])
+
+    def test_every_chunk_is_inserted_and_reported(self):
+        dataset = Dataset.objects.create(file='uploads/plant.csv')
+        progress = []
+        with mock.patch('api.ingest.EquipmentData.objects.bulk_create',
+                        wraps=EquipmentData.objects.bulk_create) as bulk_create:
+            rows = ingest_csv(dataset, self.path, chunk_size=300, on_chunk=progress.append)
+        self.assertEqual(rows, 700)
+        self.assertEqual(progress, [300, 600, 700])
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [300, 300, 100])
+
+        names = EquipmentData.objects.filter(dataset=dataset).order_by('id').values_list('equipment_name', flat=True)
+        self.assertEqual(list(names), [f'E-0-{i}' for i in range(700)])
+        # The summary accumulated over three chunks matches one pass over the rows
+        whole = DatasetSummary.objects.get(dataset=dataset)
+        rebuilt = build_summary(dataset, chunk_size=10_000)
+        self.assertEqual(whole.type_counts, rebuilt.type_counts)
+        for field in EquipmentData.PARAMETER_FIELDS:
+            for key in ('mean', 'min', 'max', 'm2'):
+                self.assertAlmostEqual(whole.parameters[field][key], rebuilt.parameters[field][key])
+
+    def test_headers_resolved_once_for_every_chunk(self):
+        with open(self.path, 'w') as f:
+            f.write(' equipment_name ,type,flowrate,pressure,temperature\n')
+            f.writelines(f'P-{i},Pump,{i},1,2\n' for i in range(5))
+        frames = list(read_frames(self.path, chunk_size=2))
+        self.assertEqual(len(frames), 3)
+        for frame in frames:
+            self.assertEqual(set(frame['equipment_type']), {'Pump'})
+        self.assertEqual(frames[-1]['equipment_name'].tolist(), ['P-4'])
+        self.assertEqual(frames[-1]['flowrate'].tolist(), [4.0])
+
+    def test_chunk_size_setting_drives_job_progress(self):
+        with override_settings(INGEST_CHUNK_SIZE=250), \
+                mock.patch('api.ingest.EquipmentData.objects.bulk_create',
+                           wraps=EquipmentData.objects.bulk_create) as bulk_create:
+            response = self.client.post('/api/upload/', {'file': SimpleUploadedFile('plant.csv', make_csv(700))})
+        self.assertEqual(response.json()['rows_processed'], 700)
+        self.assertEqual(bulk_create.call_count, 3)
+
+
+class IngestJobTests(MediaTestMixin, TestCase):
+    # Jobs are handed to the pool on commit, which never comes inside a TestCase
+    test_settings = {'INGEST_WORKER_BACKEND': 'thread'}
+
+    def upload(self, data):
+        with mock.patch('api.jobs.get_executor') as executor, self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/upload/', {'file': SimpleUploadedFile('plant.csv', data)})
+        executor.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+        return response
+
+    def job(self, job_id):
+        response = self.client.get(f'/api/jobs/{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_upload_is_queued_then_succeeds(self):
+        response = self.upload(make_csv(30))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response['Location'], f'/api/jobs/{job_id}/')
+        self.assertEqual(self.job(job_id)['state'], IngestJob.QUEUED)
+        dataset_id = response.json()['dataset']
+        self.assertEqual(Dataset.objects.get(id=dataset_id).status, Dataset.PENDING)
+        self.assertEqual(self.client.get(f'/api/summary/{dataset_id}/').status_code, 409)
+
+        seen = []
+
+        def ingest(dataset, path, on_chunk):
+            seen.append(self.job(job_id)['state'])
+            seen.append(Dataset.objects.get(id=dataset.id).status)
+            return ingest_csv(dataset, path, on_chunk=on_chunk)
+
+        with mock.patch('api.jobs.ingest_csv', side_effect=ingest):
+            run_ingest_job(job_id)
+        self.assertEqual(seen, [IngestJob.RUNNING, Dataset.PROCESSING])
+
+        job = self.job(job_id)
+        self.assertEqual(job['state'], IngestJob.SUCCEEDED)
+        self.assertEqual(job['rows_processed'], 30)
+        self.assertEqual(job['error'], '')
+        self.assertIsNotNone(job['started_at'])
+        self.assertIsNotNone(job['finished_at'])
+        self.assertEqual(Dataset.objects.get(id=dataset_id).status, Dataset.READY)
+        self.assertEqual(self.client.get(f'/api/summary/{dataset_id}/').status_code, 200)
+
+    def test_bad_file_fails_and_keeps_the_error(self):
+        response = self.upload(b'Equipment Name,Flowrate\n"unterminated,1\n')
+        job_id = response.json()['id']
+        run_ingest_job(job_id)
+        job = self.job(job_id)
+        self.assertEqual(job['state'], IngestJob.FAILED)
+        self.assertTrue(job['error'].startswith('Error parsing CSV'))
+        self.assertIsNone(job['dataset'])
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/jobs/999/').status_code, 404)
+
+
+class InlineExecutor:
+    """Stands in for the process pool: runs each job at once, in this thread."""
+
+    def __init__(self):
+        self.shutdown = mock.Mock()
+
+    def submit(self, fn, job_id):
+        future = Future()
+        future.set_result(run_ingest_job(job_id))
+        return future
+
+
+class BrokenPoolExecutor(InlineExecutor):
+    def submit(self, fn, job_id):
+        raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+
+
+class LostJobExecutor(InlineExecutor):
+    """Accepts the job, then loses it the way a pool with a killed worker does."""
+
+    def __init__(self, before=None):
+        super().__init__()
+        self.before = before
+
+    def submit(self, fn, job_id):
+        if self.before is not None:
+            self.before(job_id)
+        future = Future()
+        future.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly'))
+        return future
+
+
+class WorkerRecoveryTests(MediaTestMixin, TestCase):
+    test_settings = {'INGEST_WORKER_BACKEND': 'process'}
+
+    def upload(self, executors, data=None):
+        with mock.patch('api.jobs.get_executor', side_effect=executors), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/upload/', {'file': SimpleUploadedFile('plant.csv', data or make_csv(20))}
+            )
+        self.assertEqual(response.status_code, 202)
+        return IngestJob.objects.get(id=response.json()['id'])
+
+    def test_broken_pool_is_replaced(self):
+        broken, working = BrokenPoolExecutor(), InlineExecutor()
+        job = self.upload([broken, working])
+        self.assertEqual(job.state, IngestJob.SUCCEEDED)
+        broken.shutdown.assert_called_once_with(wait=False)
+        self.assertEqual(job.dataset.status, Dataset.READY)
+
+    def test_job_that_cannot_be_queued_fails(self):
+        job = self.upload([BrokenPoolExecutor(), BrokenPoolExecutor()])
+        self.assertEqual(job.state, IngestJob.FAILED)
+        self.assertIn('terminated abruptly', job.error)
+        self.assertIsNone(job.dataset_id)
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_queued_job_lost_with_the_pool_is_queued_again(self):
+        job = self.upload([LostJobExecutor(), InlineExecutor()])
+        self.assertEqual(job.state, IngestJob.SUCCEEDED)
+
+    def test_running_job_lost_with_its_worker_fails(self):
+        def start(job_id):
+            # The worker claimed the job and wrote part of it before dying
+            job = IngestJob.objects.get(id=job_id)
+            job.state = IngestJob.RUNNING
+            job.save()
+            EquipmentData.objects.create(dataset_id=job.dataset_id, equipment_name='E', equipment_type='Pump',
+                                         flowrate=1.0, pressure=1.0, temperature=1.0)
+
+        job = self.upload([LostJobExecutor(before=start), InlineExecutor()])
+        self.assertEqual(job.state, IngestJob.FAILED)
+        self.assertIn('worker stopped', job.error)
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(EquipmentData.objects.exists())
+
+    def test_stale_jobs_are_recovered(self):
+        # Accepted by a pool that never runs them
+        running = self.upload([mock.Mock()])
+        queued = self.upload([mock.Mock()], data=make_csv(20, seed=1))
+        IngestJob.objects.filter(id=running.id).update(state=IngestJob.RUNNING)
+        Dataset.objects.filter(id=running.dataset_id).update(status=Dataset.PROCESSING)
+
+        # Both still have a recent heartbeat
+        self.assertEqual(recover_jobs(), (0, 0))
+        IngestJob.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        with mock.patch('api.jobs.get_executor', return_value=InlineExecutor()), \
+                self.captureOnCommitCallbacks(execute=True):
+            out = io.StringIO()
+            call_command('recover_jobs', stdout=out)
+        self.assertIn('Requeued 1 jobs, failed 1.', out.getvalue())
+
+        running.refresh_from_db()
+        self.assertEqual(running.state, IngestJob.FAILED)
+        self.assertIsNone(running.dataset_id)
+        queued.refresh_from_db()
+        self.assertEqual(queued.state, IngestJob.SUCCEEDED)
+        self.assertEqual(list(Dataset.objects.values_list('status', flat=True)), [Dataset.READY])
+
+    def test_partial_ingest_is_removed_at_startup(self):
+        # The server stopped after a couple of chunks had committed
+        dataset = Dataset.objects.create(status=Dataset.PROCESSING)
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=dataset, equipment_name=f'E-{i}', equipment_type='Pump',
+                          flowrate=1.0, pressure=1.0, temperature=1.0)
+            for i in range(50)
+        ])
+        job = IngestJob.objects.create(
+            dataset=dataset, state=IngestJob.RUNNING, rows_processed=50,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        recover_jobs_at_startup()
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, IngestJob.FAILED)
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(EquipmentData.objects.exists())
+
+    def test_startup_recovery_skips_an_unmigrated_database(self):
+        with mock.patch('api.jobs.recover_jobs', side_effect=OperationalError('no such table')):
+            recover_jobs_at_startup()
+
+
+# Uploads
+
+
+class UploadDeduplicationTests(MediaTestMixin, TestCase):
+    def upload(self, data, name='plant.csv'):
+        return self.client.post('/api/upload/', {'file': SimpleUploadedFile(name, data)})
+
+    def test_same_bytes_return_the_existing_dataset(self):
+        data = make_csv(40)
+        first = self.upload(data)
+        self.assertEqual(first.status_code, 202)
+        dataset = Dataset.objects.get(id=first.json()['dataset'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(data).hexdigest())
+
+        with mock.patch('api.jobs.ingest_csv') as ingest:
+            again = self.upload(data, name='copy.csv')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['id'], dataset.id)
+        ingest.assert_not_called()
+        self.assertEqual(Dataset.objects.count(), 1)
+        self.assertEqual(IngestJob.objects.count(), 1)
+        self.assertEqual(EquipmentData.objects.count(), 40)
+        uploads = os.listdir(os.path.join(settings.MEDIA_ROOT, 'uploads'))
+        self.assertEqual(uploads, [os.path.basename(dataset.file.name)])
+
+    def test_different_bytes_are_ingested(self):
+        self.assertEqual(self.upload(make_csv(40)).status_code, 202)
+        self.assertEqual(self.upload(make_csv(40, seed=1)).status_code, 202)
+        self.assertEqual(Dataset.objects.filter(status=Dataset.READY).count(), 2)
+
+    def test_only_ready_datasets_are_reused(self):
+        data = make_csv(40)
+        dataset = Dataset.objects.get(id=self.upload(data).json()['dataset'])
+        for state in (Dataset.PENDING, Dataset.PROCESSING):
+            with self.subTest(state=state):
+                Dataset.objects.filter(id=dataset.id).update(status=state)
+                response = self.upload(data)
+                self.assertEqual(response.status_code, 202)
+                Dataset.objects.exclude(id=dataset.id).delete()
+
+    def test_deleted_datasets_are_not_reused(self):
+        data = make_csv(40)
+        first = self.upload(data).json()['dataset']
+        Dataset.objects.filter(id=first).delete()
+        response = self.upload(data)
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.json()['dataset'], first)
+
+
+class BatchUploadTests(MediaTestMixin, TestCase):
+    test_settings = {'INGEST_CHUNK_SIZE': 300, 'RETENTION_KEEP_DATASETS': 20}
+
+    def upload(self, files):
+        return self.client.post('/api/upload/batch/', {
+            'files': [SimpleUploadedFile(name, data) for name, data in files],
+        })
+
+    def test_every_file_is_ingested_by_its_own_job(self):
+        response = self.upload([('a.csv', make_csv(1000, seed=1)), ('b.csv', make_csv(500, seed=2))])
+        self.assertEqual(response.status_code, 202)
+        entries = response.json()
+        self.assertEqual([e['file'] for e in entries], ['a.csv', 'b.csv'])
+        for entry, rows, seed in zip(entries, (1000, 500), (1, 2)):
+            self.assertEqual(entry['job']['state'], IngestJob.SUCCEEDED)
+            self.assertEqual(entry['job']['rows_processed'], rows)
+            dataset = Dataset.objects.get(id=entry['dataset']['id'])
+            self.assertEqual(dataset.status, Dataset.READY)
+            self.assertEqual(dataset.content_hash, hashlib.sha256(make_csv(rows, seed=seed)).hexdigest())
+            self.assertEqual(dataset.summary.total_count, rows)
+
+    def test_duplicates_hand_back_the_existing_dataset(self):
+        first = self.upload([('a.csv', make_csv(100, seed=1))]).json()[0]
+        response = self.upload([
+            ('again.csv', make_csv(100, seed=1)), ('b.csv', make_csv(100, seed=2)), ('b2.csv', make_csv(100, seed=2)),
+        ])
+        self.assertEqual(response.status_code, 202)
+        again, new, repeated = response.json()
+        self.assertEqual(again['dataset']['id'], first['dataset']['id'])
+        self.assertIsNone(again['job'])
+        self.assertEqual(repeated['dataset']['id'], new['dataset']['id'])
+        self.assertEqual(Dataset.objects.count(), 2)
+        self.assertEqual(len(os.listdir(os.path.join(settings.MEDIA_ROOT, 'uploads'))), 2)
+
+        response = self.upload([('a.csv', make_csv(100, seed=1))])
+        self.assertEqual(response.status_code, 200)
+
+    def test_zip_archive(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('plant/a.csv', make_csv(100, seed=1))
+            zf.writestr('plant/b.CSV', make_csv(200, seed=2))
+            zf.writestr('plant/readme.txt', 'not data')
+        response = self.upload([('plant.zip', archive.getvalue())])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([(e['file'], e['job']['rows_processed']) for e in response.json()],
+                         [('a.csv', 100), ('b.CSV', 200)])
+
+    def test_a_bad_file_fails_on_its_own(self):
+        response = self.upload([('good.csv', make_csv(100)), ('bad.csv', b'\x00,"unterminated\n')])
+        good, bad = response.json()
+        self.assertEqual(good['job']['state'], IngestJob.SUCCEEDED)
+        self.assertEqual(bad['job']['state'], IngestJob.FAILED)
+        self.assertFalse(Dataset.objects.filter(id=bad['dataset']['id']).exists())
+
+    def test_rejects_empty_batches(self):
+        self.assertEqual(self.client.post('/api/upload/batch/').status_code, 400)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('readme.txt', 'no csv here')
+        self.assertEqual(self.upload([('plant.zip', archive.getvalue())]).status_code, 400)
+
+
+class ResumableUploadTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = make_csv(3000)
+        self.url = self.start()
+
+    def start(self):
+        response = self.client.post(
+            '/api/upload/sessions/', {'file_name': 'big.csv', 'size': len(self.data)}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def put(self, offset, chunk, compress=True):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if compress:
+            chunk = gzip.compress(chunk)
+            headers['HTTP_CONTENT_ENCODING'] = 'gzip'
+        return self.client.put(self.url, chunk, content_type='application/octet-stream', **headers)
+
+    def finalize(self, checksum=None):
+        checksum = checksum or hashlib.sha256(self.data).hexdigest()
+        return self.client.post(f'{self.url}finalize/', {'sha256': checksum}, content_type='application/json')
+
+    def test_chunks_are_assembled_and_ingested(self):
+        size = 20000
+        for offset in range(0, len(self.data), size):
+            response = self.put(offset, self.data[offset:offset + size])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['offset'], min(offset + size, len(self.data)))
+
+        response = self.finalize()
+        self.assertEqual(response.status_code, 202)
+        dataset = Dataset.objects.get(id=response.json()['dataset'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(self.data).hexdigest())
+        with dataset.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(EquipmentData.objects.filter(dataset=dataset).count(), 3000)
+        self.assertFalse(UploadSession.objects.exists())
+
+        # The same bytes again are recognised, as with a plain upload
+        self.url = self.start()
+        self.put(0, self.data)
+        self.assertEqual(self.finalize().status_code, 200)
+
+    def test_resumes_from_the_stored_offset(self):
+        self.assertEqual(self.put(0, self.data[:1000]).status_code, 200)
+        # A chunk re-sent after a lost response is accepted again
+        self.assertEqual(self.put(0, self.data[:1000], compress=False).json()['offset'], 1000)
+
+        skipped = self.put(5000, self.data[5000:6000])
+        self.assertEqual(skipped.status_code, 409)
+        self.assertEqual(skipped.json()['offset'], 1000)
+        self.assertEqual(self.client.get(self.url).json()['offset'], 1000)
+        self.assertEqual(self.finalize().status_code, 409)
+
+        self.put(1000, self.data[1000:])
+        self.assertEqual(self.finalize().status_code, 202)
+
+    def test_rejects_bad_chunks_and_checksums(self):
+        self.assertEqual(self.put(0, self.data + b'extra').status_code, 400)
+        response = self.client.put(
+            self.url, b'not gzip', content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET='0', HTTP_CONTENT_ENCODING='gzip',
+        )
+        self.assertEqual(response.status_code, 400)
+        with override_settings(UPLOAD_CHUNK_MAX_BYTES=1000):
+            self.assertEqual(self.put(0, self.data[:5000]).status_code, 413)
+
+        self.put(0, self.data)
+        self.assertEqual(self.finalize('0' * 64).status_code, 400)
+        self.assertEqual(self.finalize().status_code, 202)
+
+    def test_chunk_written_while_hashing_is_caught(self):
+        self.put(0, self.data)
+
+        def hash_then_resend(path):
+            digest = file_sha256(path)
+            # A retried chunk lands after the file was hashed, before the lock
+            self.put(0, self.data[:1000])
+            return digest
+
+        with mock.patch('api.uploads.file_sha256', side_effect=hash_then_resend):
+            response = self.finalize()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], len(self.data))
+        self.assertEqual(self.finalize().status_code, 202)
+
+
+# Appends
+
+
+class AppendTests(MediaTestMixin, TestCase):
+    test_settings = {'INGEST_CHUNK_SIZE': 700}
+
+    def setUp(self):
+        super().setUp()
+        self.dataset = self.upload_dataset(2000, name='base.csv')
+
+    def append(self, csv):
+        return self.client.post(
+            f'/api/datasets/{self.dataset.id}/append/', {'file': SimpleUploadedFile('more.csv', csv)}
+        )
+
+    def test_summary_is_extended_from_the_new_rows(self):
+        response = self.append(make_csv(1500, seed=1))
+        self.assertEqual(response.status_code, 202)
+        job = IngestJob.objects.get(id=response.json()['id'])
+        self.assertEqual((job.kind, job.state, job.rows_processed), (IngestJob.APPEND, IngestJob.SUCCEEDED, 1500))
+        self.assertFalse(job.file)
+
+        incremental = DatasetSummary.objects.get(dataset=self.dataset)
+        self.assertEqual(incremental.total_count, 3500)
+        self.assertEqual(EquipmentData.objects.filter(dataset=self.dataset).count(), 3500)
+
+        rows = list(EquipmentData.objects.filter(dataset=self.dataset).values_list('flowrate', flat=True))
+        mean = sum(rows) / len(rows)
+        variance = sum((x - mean) ** 2 for x in rows) / (len(rows) - 1)
+        self.assertAlmostEqual(incremental.parameters['flowrate']['mean'], mean)
+        self.assertAlmostEqual(incremental.std('flowrate'), variance ** 0.5)
+
+        self.dataset.refresh_from_db()
+        expected = build_summary(self.dataset)
+        self.assertEqual(incremental.type_counts, expected.type_counts)
+        for field, stats in expected.parameters.items():
+            for stat in ('mean', 'min', 'max'):
+                self.assertAlmostEqual(incremental.parameters[field][stat], stats[stat])
+            self.assertAlmostEqual(incremental.parameters[field]['m2'] / stats['m2'], 1.0)
+
+    def test_append_does_not_scan_existing_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.append(make_csv(100, seed=1))
+        row_reads = [q['sql'] for q in ctx.captured_queries
+                     if q['sql'].startswith('SELECT') and 'api_equipmentdata' in q['sql']]
+        self.assertEqual(row_reads, [])
+
+    def test_revision_changes_the_etag(self):
+        before = self.client.get(f'/api/summary/{self.dataset.id}/')
+        self.append(make_csv(10, seed=1))
+        after = self.client.get(f'/api/summary/{self.dataset.id}/', HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['total_count'], 2010)
+        self.assertEqual(after.json()['revision'], 1)
+
+    def test_failed_append_leaves_the_dataset_alone(self):
+        response = self.append(make_csv(10, seed=1) + b'\x00,"unterminated\n')
+        job = IngestJob.objects.get(id=response.json()['id'])
+        self.assertEqual(job.state, IngestJob.FAILED)
+        self.dataset.refresh_from_db()
+        self.assertEqual(self.dataset.revision, 0)
+        self.assertEqual(EquipmentData.objects.filter(dataset=self.dataset).count(), 2000)
+
+    def test_failed_append_removes_the_chunks_it_committed(self):
+        def failing_frames(file_path, chunk_size=None):
+            yield from islice(read_frames(file_path, chunk_size), 2)
+            raise ValueError('disk full')
+
+        with mock.patch('api.ingest.read_frames', failing_frames):
+            response = self.append(make_csv(2000, seed=1))
+        job = IngestJob.objects.get(id=response.json()['id'])
+        self.assertEqual((job.state, job.rows_processed), (IngestJob.FAILED, 1400))
+        self.assertIsNotNone(job.first_row_id)
+        self.assertEqual(EquipmentData.objects.filter(dataset=self.dataset).count(), 2000)
+        self.assertEqual(DatasetSummary.objects.get(dataset=self.dataset).total_count, 2000)
+        self.dataset.refresh_from_db()
+        self.assertEqual(self.dataset.revision, 1)
+
+    def test_rows_of_an_unfinished_append_stay_hidden(self):
+        cache.clear()
+        seen = []
+
+        def observed_frames(file_path, chunk_size=None):
+            frames = read_frames(file_path, chunk_size)
+            yield next(frames)
+            # One chunk is committed; readers still get the old revision
+            stats = self.client.get(f'/api/datasets/{self.dataset.id}/stats/').json()
+            rows = self.client.get(f'/api/datasets/{self.dataset.id}/query/', {'limit': 5000}).json()
+            seen.append((stats['total_count'], len(rows['results'])))
+            yield from frames
+
+        with mock.patch('api.ingest.read_frames', observed_frames):
+            self.append(make_csv(1500, seed=1))
+        self.assertEqual(seen, [(2000, 2000)])
+        stats = self.client.get(f'/api/datasets/{self.dataset.id}/stats/').json()
+        self.assertEqual(stats['total_count'], 3500)
+        # The bound is gone once the append commits
+        self.dataset.refresh_from_db()
+        self.assertIsNone(self.dataset.last_row_id)
+
+    def test_append_lost_with_its_worker_is_rolled_back(self):
+        # The worker wrote one chunk, then died without failing the job
+        rows = EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=self.dataset, equipment_name=f'X-{i}', equipment_type='Pump',
+                          flowrate=1.0, pressure=1.0, temperature=1.0)
+            for i in range(5)
+        ])
+        Dataset.objects.filter(id=self.dataset.id).update(last_row_id=rows[0].id - 1)
+        self.dataset.refresh_from_db()
+        lost = IngestJob.objects.create(
+            dataset=self.dataset, kind=IngestJob.APPEND, state=IngestJob.RUNNING, first_row_id=rows[0].id,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(EquipmentData.objects.of_dataset(self.dataset).count(), 2000)
+
+        self.assertEqual(self.append(make_csv(10, seed=1)).status_code, 202)
+        lost.refresh_from_db()
+        self.assertEqual(lost.state, IngestJob.FAILED)
+        self.assertFalse(EquipmentData.objects.filter(equipment_name__startswith='X-').exists())
+        self.assertEqual(EquipmentData.objects.filter(dataset=self.dataset).count(), 2010)
+        self.assertEqual(DatasetSummary.objects.get(dataset=self.dataset).total_count, 2010)
+
+    def test_one_append_at_a_time(self):
+        running = IngestJob.objects.create(dataset=self.dataset, kind=IngestJob.APPEND, state=IngestJob.RUNNING)
+        self.assertEqual(self.append(make_csv(10, seed=1)).status_code, 409)
+
+        queued = IngestJob.objects.create(
+            dataset=self.dataset, kind=IngestJob.APPEND, file=SimpleUploadedFile('more.csv', make_csv(10, seed=1))
+        )
+        run_ingest_job(queued.id)
+        queued.refresh_from_db()
+        self.assertEqual(queued.state, IngestJob.FAILED)
+        self.assertFalse(queued.file)
+        self.assertEqual(EquipmentData.objects.filter(dataset=self.dataset).count(), 2000)
+
+        IngestJob.objects.filter(id=running.id).update(state=IngestJob.SUCCEEDED)
+        self.assertEqual(self.append(make_csv(10, seed=1)).status_code, 202)
+
+    def test_rejects_datasets_being_ingested(self):
+        Dataset.objects.filter(id=self.dataset.id).update(status=Dataset.PROCESSING)
+        self.assertEqual(self.append(make_csv(10)).status_code, 409)
+        self.assertEqual(self.client.post('/api/datasets/0/append/').status_code, 404)
+
+
+# Database access and retention
+
+
+@skipUnless(connection.vendor == 'sqlite', 'exercises the SQLite locking configuration')
+class ConcurrentAccessTests(MediaTestMixin, TransactionTestCase):
+    """Uploads and reads from several threads at once, each on its own connection."""
+
+    test_settings = {'INGEST_CHUNK_SIZE': 500, 'RETENTION_KEEP_DATASETS': 20}
+
+    def run_threads(self, targets):
+        errors = []
+
+        def run(target):
+            try:
+                target()
+            except Exception as e:  # reported on the main thread
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(t,)) for t in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=120)
+        self.assertEqual(errors, [])
+
+    def test_connections_are_configured(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+    def test_simultaneous_uploads_and_reads(self):
+        first = Client().post('/api/upload/', {'file': SimpleUploadedFile('seed.csv', make_csv(2000))})
+        self.assertEqual(first.status_code, 202)
+        seeded = first.json()['dataset']
+
+        uploads, reads = [], []
+        uploading = threading.Event()
+        uploading.set()
+
+        def upload(n):
+            def target():
+                csv = SimpleUploadedFile(f'upload_{n}.csv', make_csv(3000, seed=n + 1))
+                uploads.append(Client().post('/api/upload/', {'file': csv}))
+            return target
+
+        def read():
+            client = Client()
+            while uploading.is_set():
+                reads.append(client.get('/api/history/').status_code)
+                reads.append(client.get(f'/api/summary/{seeded}/').status_code)
+
+        readers = [read] * 3
+        writers = [upload(n) for n in range(4)]
+
+        def watch_writers():
+            self.run_threads(writers)
+            uploading.clear()
+
+        self.run_threads(readers + [watch_writers])
+
+        self.assertEqual([r.status_code for r in uploads], [202] * 4)
+        jobs = IngestJob.objects.filter(id__in=[r.json()['id'] for r in uploads])
+        self.assertEqual(set(jobs.values_list('state', flat=True)), {IngestJob.SUCCEEDED})
+        self.assertEqual(sorted(jobs.values_list('rows_processed', flat=True)), [3000] * 4)
+        self.assertTrue(reads)
+        self.assertEqual(set(reads), {200})
+
+    def test_reads_do_not_wait_for_a_writer(self):
+        dataset = Dataset.objects.create(file='uploads/held.csv')
+        DatasetSummary.objects.create(dataset=dataset, total_count=0)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold_write_lock():
+            with transaction.atomic():
+                EquipmentData.objects.create(
+                    dataset=dataset, equipment_name='E', equipment_type='Pump',
+                    flowrate=1.0, pressure=1.0, temperature=1.0,
+                )
+                holding.set()
+                release.wait(timeout=10)
+
+        writer = threading.Thread(target=lambda: (hold_write_lock(), connections.close_all()))
+        writer.start()
+        try:
+            self.assertTrue(holding.wait(timeout=10))
+            start = time.monotonic()
+            response = Client().get('/api/history/')
+            # The uncommitted row is invisible to the reader, not waited for
+            seen = EquipmentData.objects.filter(dataset=dataset).count()
+            elapsed = time.monotonic() - start
+        finally:
+            release.set()
+            writer.join()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seen, 0)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(EquipmentData.objects.filter(dataset=dataset).count(), 1)
+
+
+class RetentionTests(MediaTestMixin, TestCase):
+    test_settings = {'RETENTION_KEEP_DATASETS': 3}
+
+    def make_dataset(self, age_days=0, status=Dataset.READY):
+        dataset = Dataset.objects.create(status=status)
+        dataset.file.save('data.csv', ContentFile(b'x'))
+        Dataset.objects.filter(id=dataset.id).update(
+            uploaded_at=timezone.now() - timedelta(days=age_days)
+        )
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=dataset, equipment_name=f'E-{i}', equipment_type='Pump',
+                          flowrate=1.0, pressure=2.0, temperature=3.0)
+            for i in range(50)
+        ])
+        DatasetSummary.objects.create(dataset=dataset, total_count=50)
+        return dataset
+
+    def test_keeps_newest_datasets_and_removes_files(self):
+        datasets = [self.make_dataset(age_days=10 - i) for i in range(5)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(prune_datasets(), 2)
+
+        self.assertEqual(
+            list(Dataset.objects.order_by('id').values_list('id', flat=True)),
+            [d.id for d in datasets[2:]],
+        )
+        self.assertFalse(EquipmentData.objects.filter(dataset_id__in=[d.id for d in datasets[:2]]).exists())
+        self.assertFalse(DatasetSummary.objects.filter(dataset_id__in=[d.id for d in datasets[:2]]).exists())
+        for dataset in datasets[:2]:
+            self.assertFalse(dataset.file.storage.exists(dataset.file.name))
+        self.assertTrue(datasets[2].file.storage.exists(datasets[2].file.name))
+
+    def test_deletes_rows_without_loading_them(self):
+        for i in range(5):
+            self.make_dataset(age_days=10 - i)
+        with CaptureQueriesContext(connection) as ctx:
+            prune_datasets()
+        row_selects = [q['sql'] for q in ctx.captured_queries
+                       if q['sql'].startswith('SELECT') and 'api_equipmentdata' in q['sql']]
+        self.assertEqual(row_selects, [])
+
+    def test_age_limit(self):
+        old = self.make_dataset(age_days=40)
+        recent = self.make_dataset(age_days=1)
+        self.assertEqual(prune_datasets(max_age_days=30), 1)
+        self.assertFalse(Dataset.objects.filter(id=old.id).exists())
+        self.assertTrue(Dataset.objects.filter(id=recent.id).exists())
+
+    def test_datasets_being_ingested_are_kept(self):
+        ingesting = self.make_dataset(age_days=0.5, status=Dataset.PROCESSING)
+        for i in range(3):
+            self.make_dataset(age_days=0.3 - i / 10)
+        self.assertEqual(prune_datasets(), 0)
+        self.assertTrue(Dataset.objects.filter(id=ingesting.id).exists())
+
+    def test_stuck_datasets_expire_after_the_grace_period(self):
+        stuck = self.make_dataset(age_days=2, status=Dataset.PENDING)
+        job = IngestJob.objects.create(dataset=stuck)
+        with override_settings(RETENTION_PENDING_GRACE_HOURS=72):
+            self.assertEqual(prune_datasets(), 0)
+        # Stuck datasets go even when the count rule would keep them
+        self.assertEqual(prune_datasets(), 1)
+        self.assertFalse(Dataset.objects.filter(id=stuck.id).exists())
+        job.refresh_from_db()
+        self.assertEqual(job.state, IngestJob.FAILED)
+
+
+# Summaries, statistics and plot data
+
+
+class SummaryBackfillTests(TestCase):
+    def make_dataset(self, values):
+        dataset = Dataset.objects.create(file='uploads/plant.csv')
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=dataset, equipment_name=f'E-{i}', equipment_type=['Pump', 'Mixer'][i % 2],
+                          flowrate=value, pressure=float(i), temperature=-value)
+            for i, value in enumerate(values)
+        ])
+        return dataset
+
+    def test_variance_of_large_readings_with_a_small_spread(self):
+        values = [1e9 + (i % 7) * 1e-3 for i in range(1000)]
+        summary = build_summary(self.make_dataset(values), chunk_size=300)
+        mean = sum(values) / len(values)
+        expected = (sum((v - mean) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+        self.assertAlmostEqual(summary.std('flowrate') / expected, 1.0, places=6)
+        self.assertAlmostEqual(summary.std('temperature') / expected, 1.0, places=6)
+        self.assertEqual(summary.total_count, 1000)
+        self.assertEqual(summary.type_counts, {'Mixer': 500, 'Pump': 500})
+        self.assertEqual(summary.parameters['pressure']['max'], 999.0)
+
+    def test_missing_summary_is_built_on_first_read(self):
+        dataset = self.make_dataset([float(i) for i in range(10)])
+        dataset.status = Dataset.READY
+        dataset.save(update_fields=['status'])
+        response = self.client.get(f'/api/summary/{dataset.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_count'], 10)
+        self.assertEqual(response.json()['averages']['flowrate'], 4.5)
+        self.assertTrue(DatasetSummary.objects.filter(dataset=dataset).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(f'/api/summary/{dataset.id}/').status_code, 200)
+        self.assertFalse([q for q in queries if 'api_equipmentdata' in q['sql']])
+
+    def test_backfill_command(self):
+        datasets = [self.make_dataset([float(i)] * 3) for i in range(3)]
+        Dataset.objects.update(status=Dataset.READY)
+        build_summary(datasets[0])
+        DatasetSummary.objects.filter(dataset=datasets[0]).update(total_count=99)
+
+        out = io.StringIO()
+        call_command('backfill_summaries', stdout=out)
+        self.assertIn('Built 2 summaries.', out.getvalue())
+        self.assertEqual(DatasetSummary.objects.get(dataset=datasets[0]).total_count, 99)
+        self.assertEqual(DatasetSummary.objects.get(dataset=datasets[2]).parameters['flowrate']['mean'], 2.0)
+
+        call_command('backfill_summaries', '--all', stdout=out)
+        self.assertEqual(DatasetSummary.objects.get(dataset=datasets[0]).total_count, 3)
+
+    def test_summary_stored_without_variance_is_rebuilt(self):
+        dataset = self.make_dataset([1.0, 2.0, 3.0, 4.0])
+        summary = build_summary(dataset)
+        for stats in summary.parameters.values():
+            del stats['m2']
+        summary.save()
+        self.assertIsNone(DatasetSummary.objects.get(dataset=dataset).std('flowrate'))
+
+        accumulator = SummaryAccumulator.from_summary(DatasetSummary.objects.get(dataset=dataset))
+        self.assertAlmostEqual(accumulator.m2s['flowrate'], 5.0)
+        self.assertAlmostEqual(DatasetSummary.objects.get(dataset=dataset).std('flowrate'), (5.0 / 3) ** 0.5)
+
+
+class StatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(file='uploads/plant.csv')
+        rows = [('Pump', float(i), 5.0, float(i % 10)) for i in range(101)] + [('Reactor', 1000.0, 5.0, 42.0)]
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=cls.dataset, equipment_name=f'E-{i}', equipment_type=eq_type,
+                          flowrate=flow, pressure=pressure, temperature=temperature)
+            for i, (eq_type, flow, pressure, temperature) in enumerate(rows)
+        ])
+        DatasetSummary.objects.create(dataset=cls.dataset, total_count=len(rows))
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, **params):
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/stats/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_percentiles_overall_and_per_type(self):
+        data = self.stats()
+        pump = data['by_type']['Pump']
+        self.assertEqual(pump['count'], 101)
+        self.assertEqual(
+            [pump['parameters']['flowrate'][p] for p in ('p5', 'p50', 'p95', 'min', 'max')],
+            [5.0, 50.0, 95.0, 0.0, 100.0],
+        )
+        flows = [float(i) for i in range(101)] + [1000.0]
+        self.assertAlmostEqual(data['overall']['flowrate']['p50'], 50.5)
+        self.assertAlmostEqual(data['overall']['flowrate']['mean'], sum(flows) / len(flows))
+        # One row: no spread to speak of
+        self.assertIsNone(data['by_type']['Reactor']['parameters']['flowrate']['std'])
+        self.assertEqual(data['by_type']['Reactor']['parameters']['temperature']['p95'], 42.0)
+
+    def test_histograms_share_edges_across_types(self):
+        histogram = self.stats(bins=10)['histograms']['flowrate']
+        self.assertEqual(len(histogram['edges']), 11)
+        self.assertEqual((histogram['edges'][0], histogram['edges'][-1]), (0.0, 1000.0))
+        self.assertEqual(histogram['counts'], [sum(c) for c in zip(*histogram['by_type'].values())])
+        # Same bins as np.histogram: half-open, so 100.0 opens the second one
+        expected, _ = np.histogram(np.arange(101.0), bins=histogram['edges'])
+        self.assertEqual(histogram['by_type']['Pump'], expected.tolist())
+        self.assertEqual(histogram['by_type']['Pump'][:2], [100, 1])
+        # The top edge falls in the last bin, not past it
+        self.assertEqual(histogram['by_type']['Reactor'], [0] * 9 + [1])
+
+    def test_constant_column(self):
+        histogram = self.stats(bins=4)['histograms']['pressure']
+        self.assertEqual(sum(histogram['counts']), 102)
+        self.assertEqual(len(histogram['edges']), 5)
+        self.assertLessEqual(histogram['edges'][0], 5.0)
+        self.assertGreaterEqual(histogram['edges'][-1], 5.0)
+
+    def test_cached_per_revision_and_bin_count(self):
+        with mock.patch('api.stats.compute_stats', wraps=compute_stats) as compute:
+            self.stats()
+            self.stats()
+            self.stats(bins=5)
+            self.assertEqual(compute.call_count, 2)
+            Dataset.objects.filter(id=self.dataset.id).update(revision=1)
+            self.stats()
+            self.assertEqual(compute.call_count, 3)
+
+    def test_rejects_bad_bins(self):
+        for bins in ('0', '201', 'many'):
+            response = self.client.get(f'/api/datasets/{self.dataset.id}/stats/', {'bins': bins})
+            self.assertEqual(response.status_code, 400)
+
+
+class DownsampleTests(SimpleTestCase):
+    def series(self, n=10000):
+        rng = np.random.default_rng(7)
+        x = np.arange(n, dtype=np.float64)
+        y = np.sin(x / 300) + rng.normal(0, 0.1, n)
+        # Spikes a plot must never lose
+        y[1234], y[8765] = 50.0, -50.0
+        return x, y
+
+    def test_lttb_keeps_width_points_and_both_ends(self):
+        x, y = self.series()
+        for width in (3, 10, 800):
+            with self.subTest(width=width):
+                keep = lttb(x, y, width)
+                self.assertEqual(len(keep), width)
+                self.assertEqual((keep[0], keep[-1]), (0, len(x) - 1))
+                self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(1234, lttb(x, y, 100))
+        self.assertEqual(lttb(x[:50], y[:50], 100).tolist(), list(range(50)))
+
+    def test_minmax_keeps_both_ends_and_every_bucket_extreme(self):
+        x, y = self.series()
+        width = 100
+        keep = minmax_decimate(x, y, width)
+        self.assertLessEqual(len(keep), 2 * width)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertEqual((keep[0], keep[-1]), (0, len(x) - 1))
+        self.assertIn(1234, keep)
+        self.assertIn(8765, keep)
+        edges = np.linspace(0, len(y), width).astype(int)
+        for start, end in zip(edges[:-1], edges[1:]):
+            kept = y[keep[(keep >= start) & (keep < end)]]
+            self.assertEqual((kept.min(), kept.max()), (y[start:end].min(), y[start:end].max()))
+        self.assertEqual(minmax_decimate(x[:150], y[:150], width).tolist(), list(range(150)))
+
+    def test_unsorted_x_is_sorted_first(self):
+        x, y = self.series()
+        order = np.random.default_rng(1).permutation(len(x))
+        for method in METHODS:
+            with self.subTest(method=method):
+                kept_x, kept_y = downsample(x[order], y[order], 50, method)
+                self.assertTrue(np.all(np.diff(kept_x) > 0))
+                self.assertEqual((kept_x[0], kept_x[-1]), (0.0, 9999.0))
+                self.assertTrue(np.array_equal(kept_y, y[kept_x.astype(int)]))
+
+
+class PlotDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(file='uploads/plant.csv')
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=cls.dataset, equipment_name=f'E-{i}', equipment_type='Pump',
+                          flowrate=float(i % 97), pressure=float(i), temperature=float(-i))
+            for i in range(3000)
+        ])
+        DatasetSummary.objects.create(dataset=cls.dataset, total_count=3000)
+        cls.url = f'/api/datasets/{cls.dataset.id}/plot/'
+
+    def test_points_are_bounded_by_the_width(self):
+        cache.clear()
+        for method, limit in (('lttb', 50), ('minmax', 100)):
+            with self.subTest(method=method):
+                data = self.client.get(self.url, {'width': 50, 'method': method, 'x': 'pressure'}).json()
+                self.assertLessEqual(data['points'], limit)
+                self.assertEqual(data['points'], len(data['data']['x']))
+                self.assertEqual(data['data']['x'][0], 0.0)
+                self.assertEqual(data['data']['x'][-1], 2999.0)
+                self.assertEqual(max(data['data']['y']), 96.0)
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'x': 'colour'}, {'y': 'index'}, {'method': 'mean'}, {'width': 5}, {'width': 'wide'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class CompareTests(TestCase):
+    def make_dataset(self, rows):
+        dataset = Dataset.objects.create(file='uploads/plant.csv')
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=dataset, equipment_name=name, equipment_type=eq_type,
+                          flowrate=flow, pressure=pressure, temperature=temperature)
+            for name, eq_type, flow, pressure, temperature in rows
+        ])
+        return dataset
+
+    def setUp(self):
+        cache.clear()
+        self.base = self.make_dataset([
+            ('A', 'Pump', 1.0, 1.0, 1.0),
+            ('B', 'Pump', 2.0, 2.0, 2.0),
+            ('C', 'Mixer', 3.0, 3.0, 3.0),
+            ('D', 'Mixer', 4.0, 4.0, 4.0),
+        ])
+        self.other = self.make_dataset([
+            ('A', 'Pump', 1.0, 1.0, 1.0),
+            ('B', 'Pump', 7.0, 2.0, 2.0),
+            ('C', 'Reactor', 3.0, 3.0, 3.0),
+            ('E', 'Mixer', 5.0, 5.0, 5.0),
+            ('E', 'Mixer', 6.0, 6.0, 6.0),
+        ])
+        self.url = f'/api/compare/{self.base.id}/{self.other.id}/'
+
+    def test_joins_on_equipment_name(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['counts'], {
+            'base_rows': 4, 'other_rows': 5, 'matched': 3, 'changed': 2, 'unchanged': 1, 'retyped': 1,
+            'added': 1, 'removed': 1, 'duplicate_names': {'base': 0, 'other': 1},
+        })
+        self.assertEqual(data['added'], [{'equipment_name': 'E', 'equipment_type': 'Mixer'}])
+        self.assertEqual(data['removed'], [{'equipment_name': 'D', 'equipment_type': 'Mixer'}])
+
+    def test_changes_carry_deltas_ranked_by_drift(self):
+        changed, retyped = self.client.get(self.url).json()['changes']
+        self.assertEqual(changed['equipment_name'], 'B')
+        self.assertEqual(changed['flowrate'], {'base': 2.0, 'other': 7.0, 'delta': 5.0})
+        self.assertEqual(changed['pressure']['delta'], 0.0)
+        self.assertGreater(changed['drift'], 0)
+        # A changed type alone counts as a change
+        self.assertEqual(retyped['equipment_name'], 'C')
+        self.assertEqual((retyped['base_equipment_type'], retyped['equipment_type']), ('Mixer', 'Reactor'))
+        self.assertEqual(retyped['drift'], 0.0)
+
+    def test_type_shifts(self):
+        shifts = self.client.get(self.url).json()['type_shifts']
+        self.assertEqual(shifts['Mixer']['count'], {'base': 2, 'other': 2})
+        self.assertEqual(shifts['Mixer']['means']['flowrate'], {'base': 3.5, 'other': 5.5, 'delta': 2.0})
+        self.assertEqual(shifts['Reactor']['means']['pressure'], {'base': None, 'other': 3.0, 'delta': None})
+
+    def test_cached_and_revalidated(self):
+        with mock.patch('api.compare.compare_frames', wraps=compare_frames) as diff:
+            first = self.client.get(self.url)
+            limited = self.client.get(self.url, {'limit': 1})
+        self.assertEqual(diff.call_count, 1)
+        self.assertEqual(len(limited.json()['changes']), 1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        Dataset.objects.filter(id=self.other.id).update(revision=1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get(f'/api/compare/{self.base.id}/0/').status_code, 404)
+        Dataset.objects.filter(id=self.other.id).update(status=Dataset.PROCESSING)
+        self.assertEqual(self.client.get(self.url).status_code, 409)
+
+
+# Row endpoints and conditional requests
+
+
+class DatasetQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(file='uploads/plant.csv')
+        types = ['Reactor', 'Pump', 'Heat Exchanger', 'Compressor']
+        EquipmentData.objects.bulk_create([
+            EquipmentData(
+                dataset=cls.dataset,
+                equipment_name=f'{types[i % 4][0]}-{i}',
+                equipment_type=types[i % 4],
+                flowrate=float(i),
+                pressure=float(i % 50),
+                temperature=float(i % 250),
+            )
+            for i in range(2000)
+        ])
+
+    def query(self, **params):
+        return self.client.get(f'/api/datasets/{self.dataset.id}/query/', {'limit': 10000, **params})
+
+    def test_filters_by_type_and_range(self):
+        response = self.query(type='Reactor', temperature_min=180)
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['results']
+        expected = EquipmentData.objects.filter(
+            dataset=self.dataset, equipment_type='Reactor', temperature__gte=180
+        ).count()
+        self.assertEqual(len(rows), expected)
+        self.assertTrue(rows)
+        self.assertTrue(all(r['equipment_type'] == 'Reactor' and r['temperature'] >= 180 for r in rows))
+
+    def test_filters_by_several_types(self):
+        rows = self.query(type='Pump,Compressor').json()['results']
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual({r['equipment_type'] for r in rows}, {'Pump', 'Compressor'})
+
+    def test_filters_by_name_prefix(self):
+        rows = self.query(name='R-19').json()['results']
+        names = sorted(r['equipment_name'] for r in rows)
+        self.assertEqual(names, sorted(n for n in (f'R-{i}' for i in range(0, 2000, 4)) if n.startswith('R-19')))
+
+    def test_range_bounds_are_inclusive(self):
+        rows = self.query(flowrate_min=10, flowrate_max=12).json()['results']
+        self.assertEqual([r['flowrate'] for r in rows], [10.0, 11.0, 12.0])
+
+    def test_rejects_bad_numbers(self):
+        self.assertEqual(self.query(pressure_min='high').status_code, 400)
+        self.assertEqual(self.query(pressure_min=5, pressure_max=1).status_code, 400)
+        for value in ('nan', 'NaN', 'inf', '-inf', 'Infinity'):
+            with self.subTest(value=value):
+                response = self.query(flowrate_min=value)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('flowrate_min', response.json())
+
+    def test_pages_through_filtered_rows(self):
+        first = self.query(type='Reactor', limit=100).json()
+        second = self.client.get(first['next']).json()
+        ids = [r['id'] for r in first['results'] + second['results']]
+        self.assertEqual(len(ids), 200)
+        self.assertEqual(ids, sorted(set(ids)))
+
+
+class DatasetRowsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(file='uploads/plant.csv')
+        EquipmentData.objects.bulk_create([
+            EquipmentData(
+                dataset=cls.dataset,
+                equipment_name=f'E-{i}',
+                equipment_type=['Reactor', 'Pump', 'Mixer'][i % 3],
+                flowrate=float(i % 10),
+                pressure=float(i),
+                temperature=float(i),
+            )
+            for i in range(250)
+        ])
+        cls.url = f'/api/datasets/{cls.dataset.id}/rows/'
+
+    def pages(self, **params):
+        response = self.client.get(self.url, params)
+        rows = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            rows += response.json()['results']
+            if not response.json()['next']:
+                return rows
+            response = self.client.get(response.json()['next'])
+
+    def test_rows_are_compressed_when_accepted(self):
+        for url in (self.url, f'/api/datasets/{self.dataset.id}/query/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(gzip.decompress(response.content), self.client.get(url).content)
+
+    def test_pages_cover_every_row_once(self):
+        rows = self.pages(limit=60)
+        ids = [r['id'] for r in rows]
+        self.assertEqual(len(ids), 250)
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_orders_by_field_with_ties_broken_by_id(self):
+        rows = self.pages(limit=40, ordering='-flowrate')
+        keys = [(r['flowrate'], r['id']) for r in rows]
+        self.assertEqual(len(keys), 250)
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_selected_fields_only(self):
+        # The cursor's sort value and id are fetched without being returned
+        rows = self.pages(limit=100, fields='equipment_type,pressure', ordering='flowrate')
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(set(rows[0]), {'equipment_type', 'pressure'})
+        rows = self.pages(limit=100, fields='equipment_type,flowrate', ordering='id')
+        self.assertEqual(set(rows[0]), {'equipment_type', 'flowrate'})
+
+    def test_rejects_bad_parameters(self):
+        for params in (
+            {'ordering': 'equipment_colour'},
+            {'fields': 'id,colour'},
+            {'cursor': 'not-a-cursor'},
+            {'limit': 'many'},
+            {'limit': 0},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        self.assertEqual(self.client.get('/api/datasets/0/rows/').status_code, 404)
+
+    def test_columnar_json(self):
+        data = self.client.get(self.url, {'format': 'columns', 'limit': 5}).json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['columns']['pressure'], [0.0, 1.0, 2.0, 3.0, 4.0])
+        types = data['columns']['equipment_type']
+        self.assertEqual([types['dictionary'][c] for c in types['codes']],
+                         ['Reactor', 'Pump', 'Mixer', 'Reactor', 'Pump'])
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        response = self.client.get(self.url, {'format': 'msgpack', 'limit': 100})
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['count'], 100)
+        self.assertEqual(data['columns']['id'][:2], list(
+            EquipmentData.objects.filter(dataset=self.dataset).order_by('id').values_list('id', flat=True)[:2]
+        ))
+        self.assertTrue(data['next'])
+        # Errors stay JSON whatever format was asked for
+        error = self.client.get(self.url, {'format': 'msgpack', 'limit': 'many'})
+        self.assertEqual(error.status_code, 400)
+        self.assertIn('limit', error.json())
+
+    @skipUnless(pa, 'pyarrow is not installed')
+    def test_arrow(self):
+        response = self.client.get(self.url, {'format': 'arrow', 'fields': 'equipment_type,pressure'})
+        table = pa.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.num_rows, 100)
+        self.assertEqual(table.column_names, ['equipment_type', 'pressure'])
+        self.assertTrue(pa.types.is_dictionary(table.schema.field('equipment_type').type))
+        self.assertEqual(table.column('equipment_type').to_pylist()[:3], ['Reactor', 'Pump', 'Mixer'])
+        self.assertTrue(table.schema.metadata[b'next'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'query plans are checked with SQLite EXPLAIN QUERY PLAN')
+class DatasetQueryPlanTests(TestCase):
+    """The query endpoint's SQL must be answered from the composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(file='uploads/plant.csv')
+        EquipmentData.objects.bulk_create([
+            EquipmentData(
+                dataset=cls.dataset,
+                equipment_name=f'E-{i}',
+                equipment_type=['Reactor', 'Pump'][i % 2],
+                flowrate=float(i),
+                pressure=float(i),
+                temperature=float(i),
+            )
+            for i in range(500)
+        ])
+
+    def plan(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url.format(id=self.dataset.id), params)
+        self.assertEqual(response.status_code, 200)
+        sql = next(q['sql'] for q in ctx.captured_queries if 'FROM "api_equipmentdata"' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, plan, index):
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index}\b')
+        self.assertNotIn('SCAN api_equipmentdata', plan)
+
+    def test_type_filter_uses_type_index(self):
+        plan = self.plan('/api/datasets/{id}/query/', type='Reactor')
+        self.assertUsesIndex(plan, 'equipdata_dataset_type_idx')
+        # Index entries are in rowid order within a type: no sort for id pages
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_name_prefix_uses_name_index(self):
+        plan = self.plan('/api/datasets/{id}/query/', name='E-1')
+        self.assertUsesIndex(plan, 'equipdata_dataset_name_idx')
+
+    def test_parameter_ranges_use_parameter_indexes(self):
+        for field, index in (
+            ('flowrate', 'equipdata_dataset_flow_idx'),
+            ('pressure', 'equipdata_dataset_press_idx'),
+            ('temperature', 'equipdata_dataset_temp_idx'),
+        ):
+            with self.subTest(field=field):
+                plan = self.plan('/api/datasets/{id}/query/', **{f'{field}_min': 180, 'ordering': field})
+                self.assertUsesIndex(plan, index)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_unfiltered_rows_page_in_id_order(self):
+        plan = self.plan('/api/datasets/{id}/rows/')
+        self.assertIn('api_equipmentdata_dataset_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ConditionalGetTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.dataset = self.upload_dataset(50)
+
+    def test_unchanged_resources_answer_304(self):
+        for url in (f'/api/summary/{self.dataset.id}/', f'/api/pdf/{self.dataset.id}/', '/api/history/'):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+                if first.has_header('Last-Modified'):
+                    self.assertEqual(
+                        self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+                    )
+        # The history list changes on appends and deletes, which no timestamp tracks
+        self.assertFalse(self.client.get('/api/history/').has_header('Last-Modified'))
+
+    def test_other_responses_are_not_recompressed(self):
+        summary = self.client.get(f'/api/summary/{self.dataset.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(summary.has_header('Content-Encoding'))
+        self.assertFalse(summary['ETag'].startswith('W/'))
+        pdf = self.client.get(f'/api/pdf/{self.dataset.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(pdf.has_header('Content-Encoding'))
+        self.assertEqual(int(pdf['Content-Length']), len(b''.join(pdf.streaming_content)))
+
+    def test_revalidation_is_answered_from_one_query(self):
+        url = f'/api/summary/{self.dataset.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_append_changes_validators(self):
+        urls = (f'/api/summary/{self.dataset.id}/', f'/api/pdf/{self.dataset.id}/', '/api/history/')
+        before = {url: self.client.get(url) for url in urls}
+        # Last-Modified has one-second resolution
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=5)):
+            self.client.post(
+                f'/api/datasets/{self.dataset.id}/append/',
+                {'file': SimpleUploadedFile('more.csv', make_csv(5, seed=1))},
+            )
+        for url, response in before.items():
+            with self.subTest(url=url):
+                after = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(after.status_code, 200)
+                self.assertNotEqual(after['ETag'], response['ETag'])
+                if response.has_header('Last-Modified'):
+                    self.assertEqual(
+                        self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200
+                    )
+
+    def test_delete_changes_validators(self):
+        summary_url = f'/api/summary/{self.dataset.id}/'
+        etag = self.client.get(summary_url)['ETag']
+        history = self.client.get('/api/history/')['ETag']
+        self.dataset.delete()
+        self.assertEqual(self.client.get(summary_url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        response = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=history)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], history)
+
+    def test_no_validators_while_ingesting(self):
+        self.dataset.status = Dataset.PENDING
+        self.dataset.save(update_fields=['status'])
+        response = self.client.get(f'/api/summary/{self.dataset.id}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+
+# Reports and charts
+
+
+class PDFReportTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.dataset = self.upload_dataset(120)
+
+    def read_pdf(self, data):
+        """Check the cross-reference table and return the objects by number."""
+        self.assertTrue(data.startswith(b'%PDF-1.4'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+        xref = int(data[data.rindex(b'startxref'):].split()[1])
+        lines = data[xref:].split(b'\n')
+        self.assertEqual(lines[0], b'xref')
+        size = int(lines[1].split()[1])
+        self.assertIn(b'/Size %d ' % size, data[xref:])
+        objects = {}
+        for number in range(1, size):
+            offset = int(lines[2 + number][:10])
+            self.assertTrue(data.startswith(b'%d 0 obj\n' % number, offset), f'object {number} at {offset}')
+            objects[number] = data[offset:data.index(b'\nendobj\n', offset)]
+        return objects
+
+    def page_text(self, objects):
+        text = []
+        for body in objects.values():
+            if b'/Filter /FlateDecode' in body and b'/Subtype /Image' not in body:
+                stream = body[body.index(b'stream\n') + 7:body.rindex(b'\nendstream')]
+                text.append(zlib.decompress(stream))
+        return b'\n'.join(text)
+
+    def test_rows_are_paginated(self):
+        per_page = rows_per_page()
+        rows = 2 * per_page + 5
+        dataset = Dataset.objects.create(file='uploads/long.csv')
+        EquipmentData.objects.bulk_create([
+            EquipmentData(dataset=dataset, equipment_name=f'E-{i}', equipment_type='Pump (main)',
+                          flowrate=float(i), pressure=1.0, temperature=2.0)
+            for i in range(rows)
+        ])
+        summary = build_summary(dataset)
+        objects = self.read_pdf(generate_pdf(dataset, summary, dataset.data.all()).getvalue())
+
+        pages = [body for body in objects.values() if b'/Type /Page ' in body]
+        self.assertEqual(len(pages), 4)
+        self.assertIn(b'/Count 4 ', objects[2])
+        self.assertIn(b'/Pages 2 0 R', objects[1])
+        text = self.page_text(objects)
+        self.assertIn(b'(Page 4 of 4) Tj', text)
+        self.assertIn(b'(E-%d) Tj' % (rows - 1), text)
+        # Parentheses in cell text are escaped
+        self.assertIn(b'Pump \\(main\\)', text)
+
+    def test_report_embeds_the_charts(self):
+        response = self.client.get(f'/api/pdf/{self.dataset.id}/')
+        self.assertEqual(response.status_code, 200)
+        objects = self.read_pdf(b''.join(response.streaming_content))
+        images = [body for body in objects.values() if b'/Subtype /Image' in body]
+        self.assertEqual(len(images), len(CHART_KINDS))
+        for image in images:
+            width, height = (int(v) for v in re.search(rb'/Width (\d+) /Height (\d+)', image).groups())
+            stream = image[image.index(b'stream\n') + 7:]
+            self.assertEqual(len(zlib.decompress(stream[:stream.rindex(b'\nendstream')])), width * height * 3)
+        chart_page = next(body for body in objects.values() if b'/Type /Page ' in body and b'/XObject' in body)
+        self.assertEqual(len(re.findall(rb'/Im\d+ \d+ 0 R', chart_page)), 2)
+        pages = 1 + math.ceil(len(CHART_KINDS) / 2) + math.ceil(120 / rows_per_page())
+        self.assertIn(b'/Count %d ' % pages, objects[2])
+
+
+class ReportCacheTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.dataset = self.upload_dataset(50)
+
+    def fetch(self):
+        response = self.client.get(f'/api/pdf/{self.dataset.id}/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def fetch_text(self):
+        data = self.fetch()
+        streams = re.findall(rb'/Length \d+ /Filter /FlateDecode >>\nstream\n(.*?)\nendstream', data, re.S)
+        return b'\n'.join(zlib.decompress(stream) for stream in streams)
+
+    def test_rendered_once_then_served_from_disk(self):
+        with mock.patch('api.reports.generate_pdf', wraps=generate_pdf) as render:
+            first = self.fetch()
+            second = self.fetch()
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertTrue(os.path.exists(report_path(self.dataset.id)))
+
+    def test_append_and_delete_drop_the_cached_report(self):
+        self.fetch()
+        self.client.post(
+            f'/api/datasets/{self.dataset.id}/append/', {'file': SimpleUploadedFile('more.csv', make_csv(10, seed=1))}
+        )
+        self.assertFalse(os.path.exists(report_path(self.dataset.id)))
+        self.assertIn(b'Total Equipment Count: 60', self.fetch_text())
+        self.assertTrue(os.path.exists(report_path(self.dataset.id, revision=1)))
+
+        self.dataset.delete()
+        self.assertEqual(os.listdir(report_dir()), [])
+
+    def test_concurrent_requests_render_once(self):
+        summary = get_summary(self.dataset)
+        self.dataset.summary = summary
+        rendering = threading.Event()
+
+        def slow_render(dataset, summary, data, output, charts):
+            rendering.set()
+            time.sleep(0.2)
+            with open(output, 'wb') as f:
+                f.write(b'%PDF-1.4 report')
+
+        paths = []
+        with mock.patch('api.reports.generate_pdf', side_effect=slow_render) as render, \
+                mock.patch('api.reports.get_chart', return_value='chart.png'):
+            threads = [threading.Thread(target=lambda: paths.append(get_report(self.dataset))) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(paths, [report_path(self.dataset.id)] * 4)
+        self.assertEqual(os.listdir(report_dir()), [os.path.basename(paths[0])])
+
+    def test_failed_render_leaves_nothing_behind(self):
+        def broken_render(dataset, summary, data, output, charts):
+            with open(output, 'wb') as f:
+                f.write(b'%PDF-1.4 half')
+            raise RuntimeError('out of memory')
+
+        with mock.patch('api.reports.generate_pdf', side_effect=broken_render):
+            with self.assertRaises(RuntimeError):
+                get_report(self.dataset)
+        # No lock is left for the next request to wait on until it goes stale
+        self.assertEqual(os.listdir(report_dir()), [])
+        self.fetch()
+
+    def test_render_locks_do_not_grow_with_reports(self):
+        def render(dataset, summary, data, output, charts):
+            with open(output, 'wb') as f:
+                f.write(b'%PDF-1.4 report')
+
+        locks = list(reports._locks)
+        with mock.patch('api.reports.generate_pdf', side_effect=render), \
+                mock.patch('api.reports.get_chart', return_value='chart.png'):
+            for revision in range(200):
+                self.dataset.revision = revision
+                get_report(self.dataset)
+        self.assertEqual(reports._locks, locks)
+
+
+class ChartTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.dataset = self.upload_dataset(100)
+        self.url = f'/api/charts/{self.dataset.id}/types.png'
+
+    def test_rendered_once_then_served_from_disk(self):
+        with mock.patch('api.charts.render_chart', wraps=render_chart) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            svg = self.client.get(f'/api/charts/{self.dataset.id}/parameters.svg', {'size': 'thumb'})
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(first['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(first.streaming_content), b''.join(second.streaming_content))
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertTrue(os.path.exists(chart_path(self.dataset.id, 0, 'types', 'medium', 'png')))
+
+    def test_slow_render_answers_202(self):
+        release = threading.Event()
+
+        def slow_render(*args):
+            release.wait(timeout=10)
+            return render_chart(*args)
+
+        with mock.patch('api.charts.render_chart', side_effect=slow_render), \
+                override_settings(CHART_RENDER_TIMEOUT=0.05):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response['Retry-After'], '1')
+            # Not cacheable: the next request must not be answered with 304
+            self.assertFalse(response.has_header('ETag'))
+            release.set()
+            request_chart(self.dataset, self.dataset.summary, 'types').result(timeout=10)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_etag_is_the_datasets_until_an_append(self):
+        # The first request renders; validators apply once the file is on disk
+        self.assertFalse(self.client.get(self.url).has_header('ETag'))
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(etag, self.client.get(f'/api/summary/{self.dataset.id}/')['ETag'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post(
+            f'/api/datasets/{self.dataset.id}/append/', {'file': SimpleUploadedFile('more.csv', make_csv(10, seed=1))}
+        )
+        self.assertEqual(os.listdir(chart_dir()), [])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+        self.assertTrue(os.path.exists(chart_path(self.dataset.id, 1, 'types', 'medium', 'png')))
+
+    def test_rejects_unknown_charts(self):
+        self.assertEqual(self.client.get(f'/api/charts/{self.dataset.id}/pie.png').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/charts/{self.dataset.id}/types.gif').status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'size': 'huge'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/charts/0/types.png').status_code, 404)
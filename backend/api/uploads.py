@@ -0,0 +1,157 @@
+import os
+import tempfile
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+from .uploadhandlers import file_sha256
+
+READ_SIZE = 64 * 1024
+# Spooled to disk past this size while a chunk body is being read
+SPOOL_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or finalize request the session can't accept."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def part_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'partial')
+
+
+def part_path(session_id):
+    return os.path.join(part_dir(), f'upload_{session_id}.part')
+
+
+def start_upload(file_name, size):
+    """Open a session for a ``size``-byte file, with an empty part file."""
+    expire_upload_sessions()
+    session = UploadSession.objects.create(file_name=os.path.basename(file_name), size=size)
+    os.makedirs(part_dir(), exist_ok=True)
+    open(part_path(session.id), 'wb').close()
+    return session
+
+
+def read_chunk(stream, encoding=''):
+    """Read a chunk body into a temporary file, inflating it if gzipped.
+
+    The body is read before any lock is taken, so a slow client never holds
+    up other sessions. Returns the file rewound to its start.
+    """
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding not in ('identity', 'gzip'):
+        raise UploadError(f'Unsupported Content-Encoding: {encoding}', status=415)
+    limit = settings.UPLOAD_CHUNK_MAX_BYTES
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+
+    chunk = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    written = 0
+    try:
+        while stream is not None:
+            block = stream.read(READ_SIZE)
+            if not block:
+                break
+            if inflater is not None:
+                # Bounded so a small compressed body can't inflate without limit
+                block = inflater.decompress(block, limit - written + 1)
+                if inflater.unconsumed_tail:
+                    raise UploadError(f'Chunk exceeds {limit} bytes', status=413)
+            written += len(block)
+            if written > limit:
+                raise UploadError(f'Chunk exceeds {limit} bytes', status=413)
+            chunk.write(block)
+        if inflater is not None and not inflater.eof:
+            raise UploadError('Truncated gzip chunk')
+    except zlib.error as e:
+        chunk.close()
+        raise UploadError(f'Invalid gzip chunk: {e}')
+    except UploadError:
+        chunk.close()
+        raise
+    chunk.seek(0)
+    return chunk
+
+
+def write_chunk(session_id, offset, chunk):
+    """Store ``chunk`` at ``offset`` of the session's part file.
+
+    Chunks go in order: the offset must be where the stored bytes end. A
+    chunk re-sent after a lost response (its offset already stored) is
+    written again harmlessly. Any other offset is refused with the offset
+    to resume from. Returns the updated session.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session_id)
+        if offset > session.received:
+            raise UploadError('Chunk out of order', status=409, offset=session.received)
+        chunk.seek(0, os.SEEK_END)
+        end = offset + chunk.tell()
+        chunk.seek(0)
+        if end > session.size:
+            raise UploadError(f'Chunk ends past the declared size of {session.size} bytes')
+        with open(part_path(session.id), 'r+b') as part:
+            part.seek(offset)
+            for block in iter(lambda: chunk.read(READ_SIZE), b''):
+                part.write(block)
+        session.received = max(session.received, end)
+        session.save(update_fields=['received', 'updated_at'])
+    return session
+
+
+def finish_upload(session_id, checksum):
+    """Check the assembled file and move it into upload storage.
+
+    ``checksum`` is the SHA-256 the client computed; it becomes the
+    dataset's content hash. The file is hashed before the write lock is
+    taken; the session is then checked again under the lock, and a chunk
+    written in between sends the client back to finalize again. Returns
+    the storage name of the file.
+    """
+    session = UploadSession.objects.get(id=session_id)
+    if session.received != session.size:
+        raise UploadError('Upload incomplete', status=409, offset=session.received)
+    path = part_path(session.id)
+    if file_sha256(path) != checksum.lower():
+        raise UploadError('Checksum mismatch')
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(id=session_id)
+        if locked.updated_at != session.updated_at:
+            raise UploadError('Upload changed while it was being checked', status=409, offset=locked.received)
+        name = default_storage.get_available_name(f'uploads/{session.file_name}')
+        os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+        os.replace(path, default_storage.path(name))
+        session.delete()
+    return name
+
+
+def abort_upload(session_id):
+    UploadSession.objects.filter(id=session_id).delete()
+    _remove_part(session_id)
+
+
+def _remove_part(session_id):
+    try:
+        os.remove(part_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def expire_upload_sessions(max_age_hours=None):
+    """Drop sessions untouched for longer than UPLOAD_SESSION_MAX_AGE_HOURS."""
+    if max_age_hours is None:
+        max_age_hours = settings.UPLOAD_SESSION_MAX_AGE_HOURS
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    expired = list(UploadSession.objects.filter(updated_at__lt=cutoff).values_list('id', flat=True))
+    for session_id in expired:
+        abort_upload(session_id)
+    return len(expired)
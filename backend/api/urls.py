@@ -1,9 +1,21 @@
 from django.urls import path
-from .views import UploadView, HistoryView, SummaryView, PDFView
+from .views import UploadView, UploadSessionsView, UploadSessionView, UploadSessionFinalizeView, BatchUploadView, HistoryView, SummaryView, PDFView, JobView, AppendView, DatasetRowsView, ChartView, StatsView, PlotDataView, DatasetQueryView, CompareView
 
 urlpatterns = [
     path('upload/', UploadView.as_view(), name='upload'),
+    path('upload/batch/', BatchUploadView.as_view(), name='upload-batch'),
+    path('upload/sessions/', UploadSessionsView.as_view(), name='upload-sessions'),
+    path('upload/sessions/<int:session_id>/', UploadSessionView.as_view(), name='upload-session'),
+    path('upload/sessions/<int:session_id>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-session-finalize'),
+    path('jobs/<int:job_id>/', JobView.as_view(), name='job'),
     path('history/', HistoryView.as_view(), name='history'),
     path('summary/<int:dataset_id>/', SummaryView.as_view(), name='summary'),
+    path('datasets/<int:dataset_id>/append/', AppendView.as_view(), name='dataset-append'),
+    path('datasets/<int:dataset_id>/rows/', DatasetRowsView.as_view(), name='dataset-rows'),
+    path('datasets/<int:dataset_id>/query/', DatasetQueryView.as_view(), name='dataset-query'),
+    path('datasets/<int:dataset_id>/stats/', StatsView.as_view(), name='dataset-stats'),
+    path('datasets/<int:dataset_id>/plot/', PlotDataView.as_view(), name='dataset-plot'),
+    path('compare/<int:base_id>/<int:other_id>/', CompareView.as_view(), name='compare'),
     path('pdf/<int:dataset_id>/', PDFView.as_view(), name='pdf'),
+    path('charts/<int:dataset_id>/<slug:kind>.<slug:fmt>', ChartView.as_view(), name='chart'),
 ]
@@ -1,42 +1,157 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import math
 from io import BytesIO
-from django.http import HttpResponse
 
-def generate_pdf(dataset, equipment_data):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
+from reportlab.lib.pagesizes import letter
+
+from .pdfwriter import StreamingPDF
+
+# Table layout: (header, x position, max characters)
+TABLE_COLUMNS = [
+    ("Equipment Name", 50, 28),
+    ("Type", 210, 22),
+    ("Flowrate", 350, 12),
+    ("Pressure", 430, 12),
+    ("Temperature", 510, 12),
+]
+ROW_HEIGHT = 13
+TABLE_TOP_MARGIN = 60
+TABLE_BOTTOM_MARGIN = 50
+# Types listed individually in the summary block; the rest are grouped
+MAX_LISTED_TYPES = 15
+# Charts are 4:3 images stacked on their own page
+CHART_WIDTH = 432
+CHART_HEIGHT = 324
+CHART_GAP = 20
+
+
+def rows_per_page(height=letter[1]):
+    # Header row plus its gap take two row heights
+    usable = height - TABLE_TOP_MARGIN - TABLE_BOTTOM_MARGIN - 2 * ROW_HEIGHT
+    return int(usable // ROW_HEIGHT)
+
+
+def _cell(value, limit):
+    text = f"{value:.2f}" if isinstance(value, float) else str(value)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _draw_footer(p, page, total_pages, width):
+    p.setFont("Helvetica", 9)
+    p.drawCentredString(width / 2, 25, f"Page {page} of {total_pages}")
+
+
+def _draw_summary(p, dataset, summary, width, height):
     p.setFont("Helvetica-Bold", 16)
-    p.drawString(100, height - 50, f"Analysis Report: {dataset.file.name}")
-    
+    p.drawString(50, height - 50, f"Analysis Report: {dataset.file.name}")
+
     p.setFont("Helvetica", 12)
-    p.drawString(100, height - 80, f"Uploaded At: {dataset.uploaded_at}")
-    
-    # Summary
+    p.drawString(50, height - 80, f"Uploaded At: {dataset.uploaded_at}")
+
     y = height - 120
-    p.drawString(100, y, f"Total Equipment Count: {equipment_data.count()}")
-    y -= 20
-    
-    # Simple table-like listing
-    y -= 40
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(100, y, "Equipment Name")
-    p.drawString(300, y, "Type")
-    p.drawString(450, y, "Flowrate")
-    
-    p.setFont("Helvetica", 10)
-    y -= 20
-    for item in equipment_data[:20]: # Limit to 20 for one page demo
-        if y < 50:
-             p.showPage()
-             y = height - 50
-        p.drawString(100, y, str(item.equipment_name))
-        p.drawString(300, y, str(item.equipment_type))
-        p.drawString(450, y, str(item.flowrate))
-        y -= 15
-        
+    p.drawString(50, y, f"Total Equipment Count: {summary.total_count}")
+    y -= 30
+
+    p.setFont("Helvetica-Bold", 11)
+    for label, x in (("Parameter", 50), ("Mean", 210), ("Min", 330), ("Max", 450)):
+        p.drawString(x, y, label)
+    p.setFont("Helvetica", 11)
+    for field, stats in summary.parameters.items():
+        y -= 18
+        p.drawString(50, y, field.capitalize())
+        for key, x in (("mean", 210), ("min", 330), ("max", 450)):
+            value = stats[key]
+            p.drawString(x, y, f"{value:.2f}" if value is not None else "-")
+    y -= 36
+
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(50, y, "Type Distribution")
+    p.setFont("Helvetica", 11)
+    ranked = sorted(summary.type_counts.items(), key=lambda item: -item[1])
+    listed, rest = ranked[:MAX_LISTED_TYPES], ranked[MAX_LISTED_TYPES:]
+    if rest:
+        listed.append((f"{len(rest)} other types", sum(count for _, count in rest)))
+    for eq_type, count in listed:
+        y -= 16
+        p.drawString(60, y, _cell(eq_type, 40))
+        p.drawRightString(330, y, str(count))
+    return y
+
+
+def _draw_charts(p, charts, width, height):
+    y = height - TABLE_TOP_MARGIN
+    for path in charts:
+        y -= CHART_HEIGHT
+        p.drawImage(path, (width - CHART_WIDTH) / 2, y, CHART_WIDTH, CHART_HEIGHT)
+        y -= CHART_GAP
+
+
+def _draw_table_header(p, y):
+    p.setFont("Helvetica-Bold", 10)
+    for header, x, _ in TABLE_COLUMNS:
+        p.drawString(x, y, header)
+    p.line(50, y - 4, 580, y - 4)
+
+
+def _draw_table_page(p, rows, top):
+    # One text object per column keeps the per-row drawing cost low
+    p.setFont("Helvetica", 9)
+    for index, (_, x, limit) in enumerate(TABLE_COLUMNS):
+        p.drawTextLines(x, top, [_cell(row[index], limit) for row in rows], ROW_HEIGHT)
+
+
+def generate_pdf(dataset, summary, equipment_data, output=None, chunk_size=2000, charts=()):
+    """Render the full report: summary page, charts, then every row as a table.
+
+    Rows are streamed from the database with ``iterator(chunk_size=...)``
+    and drawn one page at a time, and StreamingPDF writes each page out as
+    soon as it is finished, so memory stays flat however many rows there
+    are. Table pages repeat the header, and every page is numbered
+    "Page N of M". ``charts`` are image paths, placed two to a page after
+    the summary.
+    Renders into ``output`` (a path or file object) when given, else a
+    BytesIO that is returned.
+    """
+    buffer = BytesIO() if output is None else output
+    p = StreamingPDF(buffer, pagesize=letter)
+    width, height = letter
+
+    per_page = rows_per_page(height)
+    chart_pages = math.ceil(len(charts) / 2)
+    total_pages = 1 + chart_pages + math.ceil(summary.total_count / per_page)
+
+    _draw_summary(p, dataset, summary, width, height)
+    _draw_footer(p, 1, total_pages, width)
+
+    page = 1
+    for start in range(0, len(charts), 2):
+        p.showPage()
+        page += 1
+        _draw_charts(p, charts[start:start + 2], width, height)
+        _draw_footer(p, page, total_pages, width)
+
+    rows = equipment_data.order_by('id').values_list(
+        'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature'
+    ).iterator(chunk_size=chunk_size)
+
+    page_rows = []
+    header_y = height - TABLE_TOP_MARGIN
+    for row in rows:
+        page_rows.append(row)
+        if len(page_rows) == per_page:
+            p.showPage()
+            page += 1
+            _draw_table_header(p, header_y)
+            _draw_table_page(p, page_rows, header_y - 2 * ROW_HEIGHT)
+            _draw_footer(p, page, total_pages, width)
+            page_rows = []
+    if page_rows:
+        p.showPage()
+        page += 1
+        _draw_table_header(p, header_y)
+        _draw_table_page(p, page_rows, header_y - 2 * ROW_HEIGHT)
+        _draw_footer(p, page, total_pages, width)
+
     p.save()
-    buffer.seek(0)
+    if output is None:
+        buffer.seek(0)
     return buffer
@@ -2,140 +2,551 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
-from django.db.models import Avg, Count
-from .models import Dataset, EquipmentData
-from .serializers import DatasetSerializer, EquipmentDataSerializer
-import pandas as pd
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+from .caching import (
+    chart_etag, chart_last_modified, compare_etag, compare_last_modified,
+    dataset_etag, dataset_last_modified, history_etag,
+)
+from .models import Dataset, EquipmentData, IngestJob, UploadSession
+from .serializers import DatasetSerializer, IngestJobSerializer
+from .compare import DEFAULT_LIMIT as COMPARE_DEFAULT_LIMIT, MAX_LIMIT as COMPARE_MAX_LIMIT, get_comparison
+from .downsample import DEFAULT_WIDTH, MAX_WIDTH, METHODS, MIN_WIDTH, X_AXES, get_plot_series
+from .filters import filter_equipment
+from .jobs import recover_jobs, submit_ingest
+from .pagination import KeysetPagination
+from .renderers import row_renderer_classes, rows_to_columns
+from .retention import prune_datasets
+from .stats import DEFAULT_BINS, MAX_BINS, get_stats
+from .summaries import get_summary
+from .uploadhandlers import HashingUploadHandler, file_sha256
+from .uploads import UploadError, abort_upload, finish_upload, read_chunk, start_upload, write_chunk
 import os
+import zipfile
+
+def existing_dataset(content_hash):
+    # Same bytes already ingested? That dataset is handed back untouched
+    if not content_hash:
+        return None
+    return Dataset.objects.filter(
+        content_hash=content_hash, status=Dataset.READY
+    ).order_by('-uploaded_at').first()
+
+def ingest_response(dataset):
+    """Queue a freshly stored dataset for parsing; answer 202 with its job."""
+    # Jobs whose worker died are failed or requeued before this one queues
+    recover_jobs()
+    # HISTORY MANAGEMENT: the new dataset counts towards the last 5
+    prune_datasets()
+
+    # PARSE CSV in the background; the client polls the job
+    job = IngestJob.objects.create(dataset=dataset)
+    submit_ingest(job)
+    job.refresh_from_db()
+    return Response(
+        IngestJobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('job', args=[job.id])},
+    )
 
 class UploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Hash the upload as it streams in, before any parser reads the body
+        self.hasher = HashingUploadHandler(request)
+        request.upload_handlers.insert(0, self.hasher)
+        return super().initialize_request(request, *args, **kwargs)
+
     def post(self, request, *args, **kwargs):
         file_serializer = DatasetSerializer(data=request.data)
         if file_serializer.is_valid():
-            # HISTORY MANAGEMENT: Keep only last 5 (delete older ones BEFORE saving new one to ensure we have space? Or logic: keep 5 total?)
-            # Prompt: "Store last 5 uploaded datasets".
-            # If we save this one, we have N+1. We want to keep 5 descending.
-            # So if we have 5, delete the oldest one (index 4 in descending).
-            
-            datasets = Dataset.objects.order_by('-uploaded_at')
-            if datasets.count() >= 5:
-                # We need to delete the oldest ones so that after adding 1 we have 5?
-                # Or just keep 5 total.
-                # If we have 5, and add 1, we get 6.
-                # The prompt says "Store last 5". I'll assume we keep the 5 MOST RECENT.
-                # So if count >= 5, delete everything from the 5th onwards (because 0-4 are top 5).
-                # But we haven't saved the new one yet. So delete from 4th onwards.
-                for d in datasets[4:]:
-                   d.delete()
-
-            dataset = file_serializer.save()
-            
-            # PARSE CSV
-            try:
-                file_path = dataset.file.path
-                # Read CSV
-                df = pd.read_csv(file_path)
-                # Clean headers
-                df.columns = [c.strip() for c in df.columns]
-
-                equipment_list = []
-                for _, row in df.iterrows():
-                    # Helper to safely get float
-                    def get_float(val):
-                        try:
-                            f = float(val)
-                            return 0.0 if pd.isna(f) else f
-                        except (ValueError, TypeError):
-                            return 0.0
-
-                    eq_name = row.get('Equipment Name') or row.get('equipment_name') or 'Unknown'
-                    eq_type = row.get('Type') or row.get('type') or 'Unknown'
-                    
-                    flow = get_float(row.get('Flowrate') or row.get('flowrate'))
-                    press = get_float(row.get('Pressure') or row.get('pressure'))
-                    temp = get_float(row.get('Temperature') or row.get('temperature'))
-                    
-                    equipment_list.append(EquipmentData(
-                        dataset=dataset,
-                        equipment_name=eq_name,
-                        equipment_type=eq_type,
-                        flowrate=flow,
-                        pressure=press,
-                        temperature=temp
-                    ))
-                
-                EquipmentData.objects.bulk_create(equipment_list)
-                
-                # Double check history limit (if multiple requests came in)
-                datasets_check = Dataset.objects.order_by('-uploaded_at')
-                if datasets_check.count() > 5:
-                    for d in datasets_check[5:]:
-                        d.delete()
-
-                return Response(file_serializer.data, status=status.HTTP_201_CREATED)
-            except Exception as e:
-                dataset.delete()
-                return Response({'error': f'Error parsing CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+            content_hash = self.hasher.digests.get('file', [''])[0]
+            existing = existing_dataset(content_hash)
+            if existing is not None:
+                return Response(DatasetSerializer(existing).data, status=status.HTTP_200_OK)
+
+            dataset = file_serializer.save(status=Dataset.PENDING, content_hash=content_hash)
+            return ingest_response(dataset)
         else:
             return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def upload_error_response(error):
+    body = {'error': str(error)}
+    if error.offset is not None:
+        body['offset'] = error.offset
+    return Response(body, status=error.status)
+
+def upload_session_data(session):
+    return {
+        'id': session.id,
+        'file_name': session.file_name,
+        'size': session.size,
+        'offset': session.received,
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+    }
+
+class UploadSessionsView(APIView):
+    """Start a resumable upload.
+
+    Protocol: POST ``{file_name, size}`` here; PUT each chunk to the session
+    URL with its byte position in ``Upload-Offset`` (gzip ``Content-Encoding``
+    allowed), in order; GET the session to learn where to resume after a
+    dropped connection; then POST ``{sha256}`` to its ``finalize/`` URL to
+    have the assembled file ingested like a normal upload.
+    """
+
+    def post(self, request):
+        file_name = str(request.data.get('file_name', '')).strip()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = -1
+        if not file_name or size < 1:
+            return Response({'error': 'file_name and a positive size are required'}, status=400)
+        session = start_upload(file_name, size)
+        return Response(
+            upload_session_data(session),
+            status=status.HTTP_201_CREATED,
+            headers={'Location': reverse('upload-session', args=[session.id])},
+        )
+
+class UploadSessionView(APIView):
+    def get(self, request, session_id):
+        try:
+            session = UploadSession.objects.get(id=session_id)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+        return Response(upload_session_data(session))
+
+    def put(self, request, session_id):
+        try:
+            offset = int(request.META.get('HTTP_UPLOAD_OFFSET', ''))
+        except ValueError:
+            offset = -1
+        if offset < 0:
+            return Response({'error': 'Upload-Offset header is required'}, status=400)
+        if not UploadSession.objects.filter(id=session_id).exists():
+            return Response({'error': 'Upload not found'}, status=404)
+        try:
+            with read_chunk(request.stream, request.META.get('HTTP_CONTENT_ENCODING')) as chunk:
+                session = write_chunk(session_id, offset, chunk)
+        except UploadError as e:
+            return upload_error_response(e)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+        return Response(upload_session_data(session))
+
+    def delete(self, request, session_id):
+        abort_upload(session_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class UploadSessionFinalizeView(APIView):
+    def post(self, request, session_id):
+        checksum = str(request.data.get('sha256', '')).strip()
+        if not checksum:
+            return Response({'error': 'sha256 is required'}, status=400)
+        try:
+            name = finish_upload(session_id, checksum)
+        except UploadError as e:
+            return upload_error_response(e)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+
+        content_hash = checksum.lower()
+        existing = existing_dataset(content_hash)
+        if existing is not None:
+            default_storage.delete(name)
+            return Response(DatasetSerializer(existing).data, status=status.HTTP_200_OK)
+        dataset = Dataset.objects.create(file=name, status=Dataset.PENDING, content_hash=content_hash)
+        return ingest_response(dataset)
+
+class BatchUploadView(APIView):
+    """Upload several CSVs, or one ZIP of CSVs, in one request.
+
+    Every file goes the way of a single upload: it is hashed, a file whose
+    bytes are already ingested (or appear earlier in the batch) hands back
+    that dataset, and every new file gets its own dataset and background
+    ingest job. Answers 202 with one entry per file, or 200 when every file
+    was a duplicate.
+    """
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        uploads = request.FILES.getlist('files') + request.FILES.getlist('file')
+        if not uploads:
+            return Response({'error': 'No files uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Store every CSV first (plain files, no DB rows yet)
+        stored = []
+        try:
+            if len(uploads) == 1 and zipfile.is_zipfile(uploads[0]):
+                with zipfile.ZipFile(uploads[0]) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith('.csv'):
+                            continue
+                        with archive.open(info) as member:
+                            name = os.path.basename(info.filename)
+                            stored.append(default_storage.save(f'uploads/{name}', File(member, name=name)))
+            else:
+                for upload in uploads:
+                    stored.append(default_storage.save(f'uploads/{upload.name}', upload))
+        except zipfile.BadZipFile as e:
+            return Response({'error': f'Invalid ZIP archive: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not stored:
+            return Response({'error': 'No CSV files found in upload'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = []
+        queued = {}
+        for name in stored:
+            content_hash = file_sha256(default_storage.path(name))
+            if content_hash in queued:
+                default_storage.delete(name)
+                entries.append((name, *queued[content_hash]))
+                continue
+            existing = existing_dataset(content_hash)
+            if existing is not None:
+                default_storage.delete(name)
+                entries.append((name, existing, None))
+                continue
+            dataset = Dataset.objects.create(file=name, status=Dataset.PENDING, content_hash=content_hash)
+            queued[content_hash] = (dataset, IngestJob.objects.create(dataset=dataset))
+            entries.append((name, *queued[content_hash]))
+
+        recover_jobs()
+        # HISTORY MANAGEMENT: applied once for the whole batch
+        prune_datasets()
+        # PARSE each CSV in the background, spread over the worker pool
+        for _, job in queued.values():
+            submit_ingest(job)
+
+        jobs = IngestJob.objects.in_bulk([job.id for _, job in queued.values()])
+        results = []
+        for name, dataset, job in entries:
+            results.append({
+                'file': os.path.basename(name),
+                'dataset': DatasetSerializer(dataset).data,
+                'job': IngestJobSerializer(jobs[job.id]).data if job is not None else None,
+            })
+        return Response(results, status=status.HTTP_202_ACCEPTED if queued else status.HTTP_200_OK)
+
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=history_etag),
+], name='get')
 class HistoryView(APIView):
     def get(self, request):
         datasets = Dataset.objects.order_by('-uploaded_at')[:5]
         serializer = DatasetSerializer(datasets, many=True)
         return Response(serializer.data)
 
+class AppendView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, dataset_id):
+        try:
+            dataset = Dataset.objects.get(id=dataset_id)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=404)
+        if dataset.status != Dataset.READY:
+            return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+        # An append whose worker died no longer counts as running
+        recover_jobs()
+        if dataset.jobs.filter(kind=IngestJob.APPEND, state__in=[IngestJob.QUEUED, IngestJob.RUNNING]).exists():
+            return Response({'error': 'Another append to this dataset is still running'}, status=409)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The rows are added in the background, like a new upload; the stored
+        # summary is extended from the new rows alone
+        job = IngestJob.objects.create(dataset=dataset, kind=IngestJob.APPEND, file=upload)
+        submit_ingest(job)
+        job.refresh_from_db()
+        return Response(
+            IngestJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('job', args=[job.id])},
+        )
+
+class JobView(APIView):
+    def get(self, request, job_id):
+        try:
+            job = IngestJob.objects.get(id=job_id)
+        except IngestJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=404)
+        return Response(IngestJobSerializer(job).data)
+
+# Ready datasets only change through appends, which bump their revision and
+# with it the ETag: clients revalidate and get 304 until then
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified),
+], name='get')
 class SummaryView(APIView):
     def get(self, request, dataset_id):
         try:
             dataset = Dataset.objects.get(id=dataset_id)
-            data = EquipmentData.objects.filter(dataset=dataset)
-            
-            if not data.exists():
+            if dataset.status != Dataset.READY:
+                return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+
+            summary = get_summary(dataset)
+            if not summary.total_count:
                  return Response({'error': 'No data found for this dataset'}, status=404)
 
-            total_count = data.count()
-            # Averages
-            avg_flow = data.aggregate(Avg('flowrate'))['flowrate__avg']
-            avg_press = data.aggregate(Avg('pressure'))['pressure__avg']
-            avg_temp = data.aggregate(Avg('temperature'))['temperature__avg']
-            
-            # Type Distribution
-            type_dist = list(data.values('equipment_type').annotate(count=Count('equipment_type')))
-            
-            # Serialize data for table
-            table_data = EquipmentDataSerializer(data, many=True).data
-            
+            # Rows are paged separately through DatasetRowsView
             return Response({
                 'dataset_id': dataset.id,
                 'file_name': os.path.basename(dataset.file.name),
                 'uploaded_at': dataset.uploaded_at,
-                'total_count': total_count,
+                'revision': dataset.revision,
+                'total_count': summary.total_count,
                 'averages': {
-                    'flowrate': round(avg_flow, 2) if avg_flow else 0,
-                    'pressure': round(avg_press, 2) if avg_press else 0,
-                    'temperature': round(avg_temp, 2) if avg_temp else 0
+                    field: round(stats['mean'], 2) if stats['mean'] else 0
+                    for field, stats in summary.parameters.items()
+                },
+                'std': {field: summary.std(field) for field in summary.parameters},
+                'ranges': {
+                    field: {'min': stats['min'], 'max': stats['max']}
+                    for field, stats in summary.parameters.items()
                 },
-                'type_distribution': type_dist,
-                'data': table_data
+                'type_distribution': [
+                    {'equipment_type': eq_type, 'count': count}
+                    for eq_type, count in summary.type_counts.items()
+                ],
             })
         except Dataset.DoesNotExist:
             return Response({'error': 'Dataset not found'}, status=404)
 
-from django.http import HttpResponse
-from .utils import generate_pdf
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified),
+], name='get')
+class StatsView(APIView):
+    def get(self, request, dataset_id):
+        try:
+            bins = int(request.query_params.get('bins', DEFAULT_BINS))
+        except ValueError:
+            bins = 0
+        if not 1 <= bins <= MAX_BINS:
+            return Response({'error': f'bins must be an integer between 1 and {MAX_BINS}'}, status=400)
+
+        try:
+            dataset = Dataset.objects.get(id=dataset_id)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=404)
+        if dataset.status != Dataset.READY:
+            return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+        if not get_summary(dataset).total_count:
+            return Response({'error': 'No data found for this dataset'}, status=404)
+
+        return Response({'dataset_id': dataset.id, **get_stats(dataset, bins)})
+
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified),
+], name='get')
+class PlotDataView(APIView):
+    def get(self, request, dataset_id):
+        params = request.query_params
+        x_field = params.get('x', 'index')
+        y_field = params.get('y', 'flowrate')
+        method = params.get('method', 'lttb')
+        if x_field not in X_AXES:
+            return Response({'error': f"x must be one of: {', '.join(X_AXES)}"}, status=400)
+        if y_field not in EquipmentData.PARAMETER_FIELDS:
+            return Response({'error': f"y must be one of: {', '.join(EquipmentData.PARAMETER_FIELDS)}"}, status=400)
+        if method not in METHODS:
+            return Response({'error': f"method must be one of: {', '.join(METHODS)}"}, status=400)
+        try:
+            width = int(params.get('width', DEFAULT_WIDTH))
+        except ValueError:
+            width = 0
+        if not MIN_WIDTH <= width <= MAX_WIDTH:
+            return Response({'error': f'width must be an integer between {MIN_WIDTH} and {MAX_WIDTH}'}, status=400)
+
+        try:
+            dataset = Dataset.objects.get(id=dataset_id)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=404)
+        if dataset.status != Dataset.READY:
+            return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+        total_count = get_summary(dataset).total_count
+        if not total_count:
+            return Response({'error': 'No data found for this dataset'}, status=404)
+
+        # Never more than 2 * width points, however many rows the dataset has
+        series = get_plot_series(dataset, x_field, y_field, width, method)
+        return Response({
+            'dataset_id': dataset.id,
+            'total_count': total_count,
+            'x': x_field,
+            'y': y_field,
+            'method': method,
+            'width': width,
+            'points': len(series['y']),
+            'data': series,
+        })
+
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=compare_etag, last_modified_func=compare_last_modified),
+], name='get')
+class CompareView(APIView):
+    def get(self, request, base_id, other_id):
+        try:
+            limit = int(request.query_params.get('limit', COMPARE_DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= COMPARE_MAX_LIMIT:
+            return Response({'error': f'limit must be an integer between 1 and {COMPARE_MAX_LIMIT}'}, status=400)
+
+        datasets = Dataset.objects.in_bulk([base_id, other_id])
+        if base_id not in datasets or other_id not in datasets:
+            return Response({'error': 'Dataset not found'}, status=404)
+        base, other = datasets[base_id], datasets[other_id]
+        for dataset in (base, other):
+            if dataset.status != Dataset.READY:
+                return Response({'error': f'Dataset {dataset.id} is still being ingested', 'status': dataset.status}, status=409)
+
+        # Joined and diffed once per pair, then served from the cache
+        result = get_comparison(base, other)
+        return Response({
+            'base': base.id,
+            'other': other.id,
+            **result,
+            'changes': result['changes'][:limit],
+            'added': result['added'][:limit],
+            'removed': result['removed'][:limit],
+        })
+
+# Only the row payloads are compressed: summaries keep their strong ETags,
+# and PDFs and charts are compressed already and keep their Content-Length
+@method_decorator(gzip_page, name='dispatch')
+class DatasetRowsView(APIView):
+    pagination_class = KeysetPagination
+    renderer_classes = row_renderer_classes()
+    row_fields = ('id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+
+    def get_fields(self, request):
+        raw = request.query_params.get('fields')
+        if not raw:
+            return list(self.row_fields)
+        fields = [f.strip() for f in raw.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in self.row_fields]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}."})
+        return fields
+
+    def get_queryset(self, request, dataset):
+        return EquipmentData.objects.of_dataset(dataset)
+
+    def get(self, request, dataset_id):
+        try:
+            dataset = Dataset.objects.get(id=dataset_id)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=404)
+        if dataset.status != Dataset.READY:
+            return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+
+        fields = self.get_fields(request)
+        rows = self.get_queryset(request, dataset).values(*fields)
+        paginator = self.pagination_class()
+        paginator.ordering_fields = self.row_fields
+        page = paginator.paginate_queryset(rows, request, view=self)
+
+        # Columnar formats (columns JSON, MessagePack, Arrow) send one array per field
+        if getattr(request.accepted_renderer, 'columnar', False):
+            return Response({
+                'next': paginator.get_next_link(),
+                'count': len(page),
+                'columns': rows_to_columns(page, fields),
+            })
+        return paginator.get_paginated_response(page)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors are always reported as JSON, even when a binary format was asked for
+        renderer = getattr(request, 'accepted_renderer', None)
+        if response.status_code >= 400 and getattr(renderer, 'render_style', 'text') == 'binary':
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+class DatasetQueryView(DatasetRowsView):
+    """The rows endpoint narrowed by type, name prefix and parameter ranges."""
 
+    def get_queryset(self, request, dataset):
+        return filter_equipment(super().get_queryset(request, dataset), request.query_params)
+
+from concurrent.futures import TimeoutError as RenderTimeout
+from django.http import FileResponse
+from .charts import CHART_FORMATS, CHART_KINDS, CHART_SIZES, request_chart
+from .reports import get_report
+
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified),
+], name='get')
 class PDFView(APIView):
     def get(self, request, dataset_id):
         try:
             dataset = Dataset.objects.get(id=dataset_id)
-            data = EquipmentData.objects.filter(dataset=dataset)
-            pdf_buffer = generate_pdf(dataset, data)
-            
-            response = HttpResponse(pdf_buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="report_{dataset.id}.pdf"'
-            return response
+            if dataset.status != Dataset.READY:
+                return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+
+            # Rendered once per dataset and report version, then streamed from disk
+            report = get_report(dataset)
+            return FileResponse(
+                open(report, 'rb'),
+                as_attachment=True,
+                filename=f'report_{dataset.id}.pdf',
+                content_type='application/pdf',
+            )
         except Dataset.DoesNotExist:
              return Response({'error': 'Dataset not found'}, status=404)
+
+
+@method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=chart_etag, last_modified_func=chart_last_modified),
+], name='get')
+class ChartView(APIView):
+    def get(self, request, dataset_id, kind, fmt):
+        if kind not in CHART_KINDS:
+            return Response({'error': f"Unknown chart, expected one of: {', '.join(CHART_KINDS)}"}, status=404)
+        if fmt not in CHART_FORMATS:
+            return Response({'error': f"Unknown format, expected one of: {', '.join(CHART_FORMATS)}"}, status=404)
+        size = request.query_params.get('size', 'medium')
+        if size not in CHART_SIZES:
+            return Response({'error': f"Unknown size, expected one of: {', '.join(CHART_SIZES)}"}, status=400)
+
+        try:
+            dataset = Dataset.objects.get(id=dataset_id)
+        except Dataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=404)
+        if dataset.status != Dataset.READY:
+            return Response({'error': 'Dataset is still being ingested', 'status': dataset.status}, status=409)
+
+        summary = get_summary(dataset)
+        if not summary.total_count:
+            return Response({'error': 'No data found for this dataset'}, status=404)
+
+        # Rendered on the chart pool and cached per dataset, size and format;
+        # a slow render is answered with 202 rather than holding the request
+        future = request_chart(dataset, summary, kind, size, fmt)
+        try:
+            path = future.result(timeout=settings.CHART_RENDER_TIMEOUT)
+        except RenderTimeout:
+            response = Response({'status': 'rendering'}, status=status.HTTP_202_ACCEPTED)
+            response['Retry-After'] = '1'
+            return response
+        return FileResponse(open(path, 'rb'), content_type=CHART_FORMATS[fmt])
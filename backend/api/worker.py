@@ -0,0 +1,19 @@
+# Entry points handed to the ingestion process pool. Spawned workers unpickle
+# these before Django is configured, so nothing here may import models at
+# module level.
+
+
+def init():
+    import django
+    django.setup()
+
+
+def run_ingest_job(job_id):
+    from django.db import close_old_connections
+    from .jobs import run_ingest_job
+    # Pool workers outlive requests, so they recycle their own connections
+    close_old_connections()
+    try:
+        return run_ingest_job(job_id)
+    finally:
+        close_old_connections()
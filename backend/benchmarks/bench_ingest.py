@@ -0,0 +1,91 @@
+"""Rows/sec of the CSV -> EquipmentData conversion stage, old loop vs. new.
+
+Run from the backend directory:
+
+    python benchmarks/bench_ingest.py --rows 200000
+
+Only the conversion is timed (no database writes), so the numbers isolate
+the per-row Python work that used to dominate upload time.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_visualizer.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.ingest import build_equipment_rows, normalize_frame  # noqa: E402
+from api.models import Dataset, EquipmentData  # noqa: E402
+from datagen import make_frame  # noqa: E402
+
+
+def legacy_convert(dataset, df):
+    """The per-row loop UploadView used before the vectorized stage."""
+    df.columns = [c.strip() for c in df.columns]
+    equipment_list = []
+    for _, row in df.iterrows():
+        def get_float(val):
+            try:
+                f = float(val)
+                return 0.0 if pd.isna(f) else f
+            except (ValueError, TypeError):
+                return 0.0
+
+        eq_name = row.get('Equipment Name') or row.get('equipment_name') or 'Unknown'
+        eq_type = row.get('Type') or row.get('type') or 'Unknown'
+        flow = get_float(row.get('Flowrate') or row.get('flowrate'))
+        press = get_float(row.get('Pressure') or row.get('pressure'))
+        temp = get_float(row.get('Temperature') or row.get('temperature'))
+        equipment_list.append(EquipmentData(
+            dataset=dataset,
+            equipment_name=eq_name,
+            equipment_type=eq_type,
+            flowrate=flow,
+            pressure=press,
+            temperature=temp,
+        ))
+    return equipment_list
+
+
+def vectorized_convert(dataset, df):
+    return build_equipment_rows(dataset, normalize_frame(df))
+
+
+def timed(fn, dataset, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        fn(dataset, frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    dataset = Dataset(id=1)
+    df = make_frame(args.rows, args.seed)
+    results = [
+        ('iterrows (before)', timed(legacy_convert, dataset, df, args.repeat)),
+        ('vectorized (after)', timed(vectorized_convert, dataset, df, args.repeat)),
+    ]
+    print(f'{args.rows} rows, best of {args.repeat}')
+    for label, seconds in results:
+        print(f'  {label:<20} {seconds:8.3f} s  {args.rows / seconds:12,.0f} rows/s')
+    print(f'  speedup              {results[0][1] / results[1][1]:8.1f} x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Pages/sec and memory of the full-dataset PDF report.
+
+Run from the backend directory:
+
+    python benchmarks/bench_pdf.py --rows 100000 500000
+
+Each size is loaded into a throwaway test database, then rendered with
+generate_pdf into a temporary file. Peak RSS is sampled after every size,
+so a flat column means memory does not grow with the row count.
+"""
+import argparse
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_visualizer.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from api.ingest import build_equipment_rows, normalize_frame  # noqa: E402
+from api.models import Dataset, EquipmentData  # noqa: E402
+from api.summaries import SummaryAccumulator  # noqa: E402
+from api.utils import generate_pdf, rows_per_page  # noqa: E402
+from datagen import iter_blocks  # noqa: E402
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_dataset(rows, seed=0):
+    dataset = Dataset.objects.create(file=f'bench_{rows}.csv')
+    summary = SummaryAccumulator()
+    for block in iter_blocks(rows, seed):
+        frame = normalize_frame(block)
+        EquipmentData.objects.bulk_create(build_equipment_rows(dataset, frame))
+        summary.add_frame(frame)
+    return dataset, summary.save(dataset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    out_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'rows':>10} {'pages':>7} {'seconds':>8} {'pages/s':>9} {'size MB':>8} {'peak RSS MB':>12}")
+        for rows in sorted(args.rows):
+            dataset, summary = load_dataset(rows, args.seed)
+            path = os.path.join(out_dir, f'report_{rows}.pdf')
+            start = time.perf_counter()
+            generate_pdf(dataset, summary, EquipmentData.objects.filter(dataset=dataset), output=path)
+            seconds = time.perf_counter() - start
+            pages = 1 + math.ceil(rows / rows_per_page())
+            size = os.path.getsize(path) / 1e6
+            print(f"{rows:>10} {pages:>7} {seconds:>8.2f} {pages / seconds:>9.1f} {size:>8.1f} "
+                  f"{peak_rss_mb():>12.0f}")
+            dataset.delete()
+            os.remove(path)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
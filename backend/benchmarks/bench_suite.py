@@ -0,0 +1,299 @@
+"""End-to-end benchmark suite: upload/ingest, summary latency, PDF, memory.
+
+Run from the backend directory:
+
+    python benchmarks/bench_suite.py --rows 1000 100000 1000000 -o results.json
+    python benchmarks/bench_suite.py --rows 1000 100000 --compare results.json
+
+Everything runs in-process against the Django test client and a throwaway
+test database, with ingestion inline so its cost lands in the request
+being timed. Each size gets a CSV from datagen (same seed, so the same
+bytes on every run). The CSV is sent through the resumable upload
+endpoints in chunks, the way the clients send it. Then the suite times:
+
+- upload: the chunk PUTs, and the finalize call that hashes and ingests
+- summary: cold and warm SummaryView latency, plus 304 revalidations
+- pdf: the first report render (rendered and streamed) and a cached fetch
+
+Peak RSS is sampled during every stage. Results are written as JSON with
+the commit they were measured at; ``--compare`` prints the change of every
+timing against an earlier results file.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_visualizer.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from api.models import Dataset  # noqa: E402
+from api.uploadhandlers import file_sha256  # noqa: E402
+from datagen import write_csv  # noqa: E402
+
+RESULTS_VERSION = 1
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        # No procfs: the process-wide peak is the best there is
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemorySampler:
+    """Peak resident memory over a block, sampled every ``interval`` seconds."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+@contextmanager
+def stage(results, name):
+    """Time a block and record its peak RSS under ``results[name]``."""
+    entry = results.setdefault(name, {})
+    with MemorySampler() as memory:
+        start = time.perf_counter()
+        yield entry
+        entry['seconds'] = round(time.perf_counter() - start, 4)
+    entry['peak_rss_mb'] = round(memory.peak, 1)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def check(response, expected):
+    if response.status_code != expected:
+        path = response.request['PATH_INFO']
+        raise RuntimeError(f'{path}: HTTP {response.status_code} {response.content[:200]!r}')
+    return response
+
+
+def upload(client, path, results):
+    size = os.path.getsize(path)
+    session = check(client.post(
+        '/api/upload/sessions/', {'file_name': os.path.basename(path), 'size': size},
+        content_type='application/json',
+    ), 201).json()
+    url = f"/api/upload/sessions/{session['id']}/"
+
+    with stage(results, 'upload') as entry:
+        with open(path, 'rb') as f:
+            offset = 0
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                check(client.put(
+                    url, chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+                ), 200)
+                offset += len(chunk)
+    entry['mb_per_second'] = round(size / 2**20 / entry['seconds'], 1)
+
+    checksum = file_sha256(path)
+    with stage(results, 'ingest') as entry:
+        job = check(client.post(
+            f'{url}finalize/', {'sha256': checksum}, content_type='application/json',
+        ), 202).json()
+    if job['state'] != 'succeeded':
+        raise RuntimeError(f"Ingest failed: {job['error']}")
+    entry['rows_per_second'] = round(job['rows_processed'] / entry['seconds'])
+    return job['dataset']
+
+
+def summary_latency(client, dataset_id, repeat, results):
+    url = f'/api/summary/{dataset_id}/'
+    with stage(results, 'summary') as entry:
+        start = time.perf_counter()
+        first = check(client.get(url), 200)
+        entry['cold_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        warm, revalidated = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            check(client.get(url), 200)
+            warm.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            check(client.get(url, HTTP_IF_NONE_MATCH=first['ETag']), 304)
+            revalidated.append((time.perf_counter() - start) * 1000)
+        entry['warm_p50_ms'] = round(statistics.median(warm), 2)
+        entry['warm_p95_ms'] = round(percentile(warm, 0.95), 2)
+        entry['not_modified_p50_ms'] = round(statistics.median(revalidated), 2)
+
+
+def pdf_render(client, dataset_id, results):
+    url = f'/api/pdf/{dataset_id}/'
+    with stage(results, 'pdf') as entry:
+        response = check(client.get(url), 200)
+        entry['bytes'] = sum(len(part) for part in response.streaming_content)
+    start = time.perf_counter()
+    response = check(client.get(url), 200)
+    b''.join(response.streaming_content)
+    entry['cached_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def run_size(rows, seed, repeat, pdf_max_rows, work_dir):
+    path = os.path.join(work_dir, f'equipment_{rows}.csv')
+    result = {'rows': rows, 'csv_bytes': write_csv(path, rows, seed)}
+    client = Client()
+    dataset_id = upload(client, path, result)
+    os.remove(path)
+    summary_latency(client, dataset_id, repeat, result)
+    if rows <= pdf_max_rows:
+        pdf_render(client, dataset_id, result)
+    Dataset.objects.filter(id=dataset_id).delete()
+    return result
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True,
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def environment(database):
+    commit, dirty = git_revision()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'database': database,
+    }
+
+
+# Timings where lower is better, per stage; everything else is informational
+COMPARED = {
+    'upload': ('seconds',),
+    'ingest': ('seconds', 'peak_rss_mb'),
+    'summary': ('cold_ms', 'warm_p50_ms', 'warm_p95_ms', 'not_modified_p50_ms'),
+    'pdf': ('seconds', 'cached_ms', 'peak_rss_mb'),
+}
+
+
+def compare(baseline, current):
+    """Print every compared metric of ``current`` next to ``baseline``."""
+    before = {r['rows']: r for r in baseline['results']}
+    print(f"\nvs {baseline['environment'].get('commit') or 'baseline'}:")
+    for result in current['results']:
+        old = before.get(result['rows'])
+        if old is None:
+            continue
+        for name, metrics in COMPARED.items():
+            for metric in metrics:
+                a = old.get(name, {}).get(metric)
+                b = result.get(name, {}).get(metric)
+                if a is None or b is None:
+                    continue
+                change = (b - a) / a * 100 if a else 0.0
+                print(f"  {result['rows']:>10} {name + '.' + metric:<30} {a:>12} -> {b:<12} {change:+7.1f}%")
+
+
+def print_results(results):
+    print(f"{'rows':>10} {'MB':>7} {'upload s':>9} {'ingest s':>9} {'rows/s':>10} "
+          f"{'summary ms':>11} {'304 ms':>7} {'pdf s':>7} {'peak MB':>8}")
+    for r in results:
+        peak = max(entry.get('peak_rss_mb', 0) for entry in r.values() if isinstance(entry, dict))
+        pdf = r.get('pdf', {}).get('seconds')
+        print(f"{r['rows']:>10} {r['csv_bytes'] / 1e6:>7.1f} {r['upload']['seconds']:>9.2f} "
+              f"{r['ingest']['seconds']:>9.2f} {r['ingest']['rows_per_second']:>10,} "
+              f"{r['summary']['warm_p50_ms']:>11.2f} {r['summary']['not_modified_p50_ms']:>7.2f} "
+              f"{pdf if pdf is not None else '-':>7} {peak:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=50, help='summary requests per size')
+    parser.add_argument('--pdf-max-rows', type=int, default=1_000_000,
+                        help='skip the PDF stage above this many rows')
+    parser.add_argument('-o', '--output', help='write the results here as JSON')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    work_dir = tempfile.mkdtemp()
+    try:
+        with override_settings(
+            MEDIA_ROOT=os.path.join(work_dir, 'media'),
+            INGEST_WORKER_BACKEND='inline',
+            RETENTION_KEEP_DATASETS=1000,
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            results = [
+                run_size(rows, args.seed, args.repeat, args.pdf_max_rows, work_dir)
+                for rows in sorted(args.rows)
+            ]
+        database = connection.vendor
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    report = {
+        'version': RESULTS_VERSION,
+        'environment': environment(database),
+        'settings': {'seed': args.seed, 'repeat': args.repeat, 'ingest_chunk_size': settings.INGEST_CHUNK_SIZE},
+        'results': results,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
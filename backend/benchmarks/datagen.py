@@ -0,0 +1,108 @@
+"""Deterministic synthetic equipment CSVs, from a few rows to tens of millions.
+
+Run from the backend directory:
+
+    python benchmarks/datagen.py --rows 1000000 -o equipment_1m.csv
+
+Rows are produced in fixed blocks, each from its own seeded generator, so a
+given seed always yields the same file and a smaller file is a prefix of a
+larger one. Writing streams block by block; memory doesn't grow with the
+row count. The type mix and value ranges follow the sample data, and a
+small share of values is dirty the way plant exports are: blanks, "n/a",
+padded numbers, decimal commas, unknown types.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+HEADER = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+BLOCK_ROWS = 50_000
+
+# type: (share of rows, name prefix, (flow lo, hi), (pressure lo, hi), (temperature lo, hi))
+PROFILES = {
+    'Centrifugal Pump': (0.26, 'Pump', (80, 160), (10, 20), (30, 60)),
+    'Control Valve': (0.18, 'Valve', (40, 120), (5, 15), (20, 50)),
+    'Heat Exchanger': (0.16, 'HX', (150, 350), (5, 12), (80, 160)),
+    'Reactor': (0.12, 'Rec', (0, 0), (20, 35), (150, 220)),
+    'Storage Tank': (0.12, 'Tank', (0, 0), (1, 3), (15, 35)),
+    'Compressor': (0.09, 'Comp', (300, 600), (60, 120), (50, 110)),
+    'Mixer': (0.07, 'Mix', (20, 80), (2, 6), (25, 70)),
+}
+TYPES = list(PROFILES)
+NUMERIC = ('Flowrate', 'Pressure', 'Temperature')
+DIRTY_NUMBERS = np.array(['', 'n/a', 'NaN', '-', 'ERR'], dtype=object)
+
+
+def make_block(block, seed=0, dirty=0.01):
+    """Rows ``block * BLOCK_ROWS`` onwards, as the CSV would hold them."""
+    rng = np.random.default_rng([seed, block])
+    n = BLOCK_ROWS
+    shares = np.array([PROFILES[t][0] for t in TYPES])
+    kinds = rng.choice(len(TYPES), size=n, p=shares / shares.sum())
+
+    first = block * BLOCK_ROWS
+    prefixes = np.array([PROFILES[t][1] for t in TYPES], dtype=object)
+    numbers = pd.Series(np.arange(first, first + n)).map('{:08d}'.format).to_numpy(dtype=object)
+    names = prefixes[kinds] + '-' + numbers
+    types = np.array(TYPES, dtype=object)[kinds]
+
+    columns = {'Equipment Name': names, 'Type': types}
+    for position, field in enumerate(NUMERIC):
+        low = np.array([PROFILES[t][2 + position][0] for t in TYPES], dtype=np.float64)[kinds]
+        high = np.array([PROFILES[t][2 + position][1] for t in TYPES], dtype=np.float64)[kinds]
+        columns[field] = (low + (high - low) * rng.random(n)).round(2)
+    frame = pd.DataFrame(columns)
+
+    if dirty:
+        for field in NUMERIC:
+            values = frame[field].astype(object)
+            broken = rng.random(n) < dirty
+            values[broken] = rng.choice(DIRTY_NUMBERS, size=int(broken.sum()))
+            # Padded readings, and decimal commas from European locales
+            padded = rng.random(n) < dirty / 2
+            values[padded] = [f' {v} ' for v in frame[field].to_numpy()[padded]]
+            localized = rng.random(n) < dirty / 4
+            values[localized] = [f'{v:.2f}'.replace('.', ',') for v in frame[field].to_numpy()[localized]]
+            frame[field] = values
+        unknown = rng.random(n) < dirty / 2
+        strays = np.array(['', 'unknown', 'PUMP'], dtype=object)
+        frame.loc[unknown, 'Type'] = rng.choice(strays, size=int(unknown.sum()))
+    return frame
+
+
+def iter_blocks(rows, seed=0, dirty=0.01):
+    """Yield the first ``rows`` rows a block at a time; the last may be short."""
+    for block in range(-(-rows // BLOCK_ROWS)):
+        frame = make_block(block, seed, dirty)
+        yield frame.iloc[:rows - block * BLOCK_ROWS]
+
+
+def make_frame(rows, seed=0, dirty=0.01):
+    """The first ``rows`` rows as one DataFrame."""
+    return pd.concat(list(iter_blocks(rows, seed, dirty)), ignore_index=True)
+
+
+def write_csv(path, rows, seed=0, dirty=0.01):
+    """Write ``rows`` rows to ``path`` block by block; returns the file size."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(','.join(HEADER) + '\n')
+        for frame in iter_blocks(rows, seed, dirty):
+            frame.to_csv(f, header=False, index=False)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dirty', type=float, default=0.01, help='share of dirty values (default 0.01)')
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+    size = write_csv(args.output, args.rows, args.seed, args.dirty)
+    print(f'{args.rows} rows, {size / 1e6:.1f} MB -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
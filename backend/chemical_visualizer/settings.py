@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -54,11 +56,59 @@ MIDDLEWARE = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Let browser clients revalidate with ETags and send resumable upload chunks
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match', 'if-modified-since', 'upload-offset', 'content-encoding')
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
 
 import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rows read and bulk inserted per step when ingesting an uploaded CSV.
+# Bounds worker memory regardless of file size.
+INGEST_CHUNK_SIZE = 50000
+
+# Uploads are parsed off the request by a local worker pool.
+# 'process' (default), 'thread', or 'inline' to parse within the request.
+INGEST_WORKER_BACKEND = 'process'
+INGEST_WORKERS = os.cpu_count() or 2
+# A queued or running job with no heartbeat for this long has lost its
+# worker (a crash or a restart): running ones are failed and rolled back,
+# queued ones queued again. See api.jobs.recover_jobs.
+INGEST_JOB_STALE_MINUTES = 10
+
+# Resumable uploads (upload/sessions/): clients are asked to send chunks of
+# UPLOAD_CHUNK_SIZE bytes; a chunk may not inflate to more than
+# UPLOAD_CHUNK_MAX_BYTES once decompressed. Sessions untouched for
+# UPLOAD_SESSION_MAX_AGE_HOURS are discarded with their partial file.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 64 * 1024 * 1024
+UPLOAD_SESSION_MAX_AGE_HOURS = 24
+
+# History retention: the newest N datasets are kept, and datasets older than
+# the age limit (days) are dropped too. None disables a rule. The age rule is
+# applied on upload and by `manage.py prune_datasets`.
+RETENTION_KEEP_DATASETS = 5
+RETENTION_MAX_AGE_DAYS = None
+# Datasets still pending or processing this many hours after upload are
+# stuck, and expire whatever the rules above say
+RETENTION_PENDING_GRACE_HOURS = 24
+
+# Computed per-dataset results (statistics and the like) are cached here.
+# The local-memory cache is per process; point this at Redis or memcached to
+# share results between server workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 3600,
+    }
+}
+
+# Charts are drawn by a small thread pool. A request waits this many seconds
+# for a chart being rendered before answering 202 and asking to retry.
+CHART_WORKERS = 1
+CHART_RENDER_TIMEOUT = 5
+
 ROOT_URLCONF = 'chemical_visualizer.urls'
 
 TEMPLATES = [
@@ -86,9 +136,32 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests instead of reconnecting
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Writers take the write lock when their transaction begins and
+            # queue behind each other, instead of failing with "database is
+            # locked" when a read transaction tries to upgrade mid-way
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # A file, not the shared-cache in-memory default: the concurrency
+        # tests need WAL and real locking between threads
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Applied to every new SQLite connection (see api/signals.py). WAL lets
+# readers keep going while a writer, e.g. an ingest chunk, commits; the busy
+# timeout (ms) is how long a queued writer waits for the lock.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_visualizer.settings')
 
 application = get_wsgi_application()
+
+# Ingest jobs left queued or running by the previous server process have no
+# worker any more: fail or requeue them (see api.jobs.recover_jobs)
+from api.jobs import recover_jobs_at_startup  # noqa: E402
+
+recover_jobs_at_startup()
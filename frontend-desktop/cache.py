@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'chemical-visualizer')
+
+
+class ResponseCache:
+    """On-disk store of JSON responses and their ETags, keyed by URL.
+
+    Behaves like the ``url -> (etag, data)`` dict JsonRequest revalidates
+    against, so summaries (which also carry everything the charts are drawn
+    from) survive restarts and stay readable while the server is down.
+    Each entry is one small JSON file; once they add up to more than
+    ``max_bytes`` the least recently used ones are removed. Workers write
+    from their own threads, hence the lock.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        # file name -> size, least recently used first; file mtimes carry
+        # the order across restarts
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        self._index = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._total = sum(self._index.values())
+
+    def _name(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json'
+
+    def get(self, url, default=None):
+        name = self._name(url)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name not in self._index:
+                return default
+            try:
+                with open(path, encoding='utf-8') as f:
+                    entry = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                self._forget(name)
+                return default
+            self._index.move_to_end(name)
+        return entry['etag'], entry['data']
+
+    def __setitem__(self, url, value):
+        etag, data = value
+        name = self._name(url)
+        path = os.path.join(self.directory, name)
+        payload = json.dumps({'url': url, 'etag': etag, 'data': data}).encode('utf-8')
+        with self._lock:
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            self._total += len(payload) - self._index.pop(name, 0)
+            self._index[name] = len(payload)
+            self._evict(keep=name)
+
+    def pop(self, url, default=None):
+        entry = self.get(url, default)
+        with self._lock:
+            self._forget(self._name(url))
+        return entry
+
+    def _forget(self, name):
+        self._total -= self._index.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep):
+        for name in list(self._index):
+            if self._total <= self.max_bytes:
+                break
+            if name != keep:
+                self._forget(name)
@@ -1,13 +1,21 @@
 import sys
-import requests
-import pandas as pd
+import time
+
+# Taken before the heavier imports below so --profile-startup can time them
+_started = time.perf_counter()
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QLineEdit, QPushButton, QFileDialog, QTableWidget, 
-                             QTableWidgetItem, QTabWidget, QMessageBox, QDialog, QFormLayout)
-from PyQt5.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+                             QTableWidgetItem, QTabWidget, QMessageBox, QDialog, QFormLayout,
+                             QProgressBar, QTableView, QComboBox, QSplitter)
+from PyQt5.QtCore import Qt, QTimer, QThreadPool
+_qt_imported = time.perf_counter()
+# matplotlib and NumPy are imported when the visualization tab is first
+# opened, and requests by the first worker task, all off the startup path
+from cache import ResponseCache
+from profiling import StartupProfile
+from workers import MAX_WORKERS, DownloadRequest, JsonRequest, ResumableUpload
+_client_imported = time.perf_counter()
 
 API_URL = "http://127.0.0.1:8000/api/"
 
@@ -38,11 +46,29 @@ class LoginDialog(QDialog):
             QMessageBox.warning(self, "Error", "Invalid credentials! Please use 'Admin' / 'Admin'")
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
+        self.profile = profile or StartupProfile(enabled=False)
         self.setWindowTitle("Chemical Equipment Parameter Visualizer")
         self.setGeometry(100, 100, 1000, 700)
         
+        # url -> (etag, json) for conditional GETs, kept on disk between runs
+        self.http_cache = ResponseCache()
+        
+        # All requests run on the pool; the UI thread only handles results
+        self.pool = QThreadPool.globalInstance()
+        self.pool.setMaxThreadCount(MAX_WORKERS)
+        self.history_task = None
+        self.dataset_task = None
+        self.upload_task = None
+        self.job_task = None
+        self.pdf_task = None
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        
         # Tabs
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
@@ -52,12 +78,16 @@ class MainWindow(QMainWindow):
         self.setup_dashboard_tab()
         self.tabs.addTab(self.dashboard_tab, "Dashboard")
         
-        # Data View Tab
+        # Data View Tab, built on first use
         self.data_tab = QWidget()
-        self.setup_data_tab()
+        self.data_tab_ready = False
         self.tabs.addTab(self.data_tab, "Data Visualization")
+        self.tabs.currentChanged.connect(self.tab_changed)
         
         self.current_dataset = None
+        
+        # Once the event loop runs, i.e. after the window is up
+        QTimer.singleShot(0, self.load_history)
 
     def setup_dashboard_tab(self):
         layout = QVBoxLayout()
@@ -72,8 +102,8 @@ class MainWindow(QMainWindow):
         # History Section
         layout.addWidget(QLabel("Recent Uploads (Last 5)"))
         self.history_table = QTableWidget()
-        self.history_table.setColumnCount(3)
-        self.history_table.setHorizontalHeaderLabels(["ID", "Uploaded At", "Action"])
+        self.history_table.setColumnCount(4)
+        self.history_table.setHorizontalHeaderLabels(["ID", "Uploaded At", "Status", "Action"])
         self.history_table.horizontalHeader().setStretchLastSection(True)
         layout.addWidget(self.history_table)
         
@@ -82,9 +112,22 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.btn_refresh)
         
         self.dashboard_tab.setLayout(layout)
-        self.load_history()
+
+    def tab_changed(self, index):
+        if self.tabs.widget(index) is self.data_tab:
+            self.ensure_data_tab()
+
+    def ensure_data_tab(self):
+        if not self.data_tab_ready:
+            self.data_tab_ready = True
+            with self.profile.stage('build visualization tab'):
+                self.setup_data_tab()
 
     def setup_data_tab(self):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from table_model import EquipmentTableModel
+
         layout = QVBoxLayout()
         
         self.data_label = QLabel("No Dataset Selected")
@@ -118,7 +161,37 @@ class MainWindow(QMainWindow):
         # Matplotlib Figure
         self.figure = Figure(figsize=(5, 4), dpi=100)
         self.canvas = FigureCanvas(self.figure)
-        layout.addWidget(self.canvas)
+        
+        # Rows are paged in from the server as the table scrolls; sorting and
+        # filtering are done server-side
+        filter_layout = QHBoxLayout()
+        self.filter_name = QLineEdit()
+        self.filter_name.setPlaceholderText("Filter by name prefix")
+        self.filter_name.returnPressed.connect(self.apply_row_filters)
+        self.filter_type = QComboBox()
+        self.filter_type.addItem("All types", "")
+        self.filter_type.activated.connect(self.apply_row_filters)
+        filter_layout.addWidget(self.filter_name)
+        filter_layout.addWidget(self.filter_type)
+        
+        self.table_model = EquipmentTableModel(API_URL, self.pool, self)
+        self.table_model.error.connect(lambda error: self.statusBar().showMessage(f"Could not load rows: {error}", 5000))
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+        
+        table_panel = QWidget()
+        table_layout = QVBoxLayout(table_panel)
+        table_layout.setContentsMargins(0, 0, 0, 0)
+        table_layout.addLayout(filter_layout)
+        table_layout.addWidget(self.table_view)
+        
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.canvas)
+        splitter.addWidget(table_panel)
+        layout.addWidget(splitter)
 
         self.btn_pdf = QPushButton("Download PDF Report")
         self.btn_pdf.clicked.connect(self.download_pdf)
@@ -126,69 +199,220 @@ class MainWindow(QMainWindow):
         
         self.data_tab.setLayout(layout)
 
+    def run_task(self, task, finished, failed, progress=None):
+        # Results of a cancelled task may already be queued; drop them here
+        task.signals.finished.connect(lambda result: None if task.cancelled else finished(result))
+        task.signals.failed.connect(lambda error: None if task.cancelled else failed(error))
+        if progress is not None:
+            task.signals.progress.connect(progress)
+        self.pool.start(task)
+        return task
+
+    def show_progress(self, done, total):
+        if total:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(int(done * 100 / total))
+        else:
+            # Unknown size: busy indicator
+            self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+
+    def hide_progress(self):
+        self.progress_bar.hide()
+
+    def closeEvent(self, event):
+        for task in (self.history_task, self.dataset_task, self.upload_task, self.job_task, self.pdf_task):
+            if task is not None:
+                task.cancel()
+        # Give cancelled tasks a moment to stop before their signals go away
+        self.pool.clear()
+        self.pool.waitForDone(1000)
+        super().closeEvent(event)
+
     def download_pdf(self):
         if not self.current_dataset:
             return
         
-        try:
-            url = f"{API_URL}pdf/{self.current_dataset['dataset_id']}/"
-            response = requests.get(url, stream=True)
-            if response.status_code == 200:
-                fname, _ = QFileDialog.getSaveFileName(self, 'Save PDF', f"report_{self.current_dataset['dataset_id']}.pdf", "PDF Files (*.pdf)")
-                if fname:
-                    with open(fname, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    QMessageBox.information(self, "Success", "PDF Saved Successfully!")
+        dataset_id = self.current_dataset['dataset_id']
+        fname, _ = QFileDialog.getSaveFileName(self, 'Save PDF', f"report_{dataset_id}.pdf", "PDF Files (*.pdf)")
+        if not fname:
+            return
+        self.btn_pdf.setEnabled(False)
+        self.btn_pdf.setText("Downloading PDF Report...")
+        self.pdf_task = self.run_task(
+            DownloadRequest(f"{API_URL}pdf/{dataset_id}/", fname),
+            self.pdf_downloaded, self.pdf_failed, self.show_progress,
+        )
+
+    def reset_pdf_button(self):
+        self.hide_progress()
+        self.btn_pdf.setEnabled(True)
+        self.btn_pdf.setText("Download PDF Report")
+
+    def pdf_downloaded(self, status):
+        self.reset_pdf_button()
+        if status == 200:
+            QMessageBox.information(self, "Success", "PDF Saved Successfully!")
+        else:
+            QMessageBox.warning(self, "Error", "Could not generate PDF")
+
+    def pdf_failed(self, error):
+        self.reset_pdf_button()
+        QMessageBox.critical(self, "Error", error)
+
+    def load_cached(self, url, show, on_error):
+        """Show the cached copy of ``url`` at once, then revalidate it.
+
+        ``show`` runs again only if the server has something newer; if the
+        server can't be reached, the cached copy is all there is.
+        """
+        cached = self.http_cache.get(url)
+        if cached is not None:
+            show((200, cached[1]))
+
+        def revalidated(result):
+            status, data = result
+            if cached is not None and status == 200 and data == cached[1]:
+                return
+            if status == 404:
+                self.http_cache.pop(url)
+            show(result)
+
+        def failed(error):
+            if cached is not None:
+                self.statusBar().showMessage("Server unreachable, showing cached data", 5000)
             else:
-                QMessageBox.warning(self, "Error", "Could not generate PDF")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+                on_error(error)
+
+        return self.run_task(JsonRequest(url, self.http_cache), revalidated, failed)
 
     def load_history(self):
-        try:
-            response = requests.get(f"{API_URL}history/")
-            if response.status_code == 200:
-                data = response.json()
-                self.history_table.setRowCount(len(data))
-                for i, row in enumerate(data):
-                    self.history_table.setItem(i, 0, QTableWidgetItem(str(row['id'])))
-                    self.history_table.setItem(i, 1, QTableWidgetItem(str(row['uploaded_at'])))
-                    
-                    btn_view = QPushButton("View")
-                    btn_view.clicked.connect(lambda checked, r=row['id']: self.load_dataset(r))
-                    self.history_table.setCellWidget(i, 2, btn_view)
-        except Exception as e:
-            print(f"Error loading history: {e}")
+        if self.history_task is not None:
+            self.history_task.cancel()
+        self.history_task = self.load_cached(
+            f"{API_URL}history/",
+            self.show_history, lambda error: print(f"Error loading history: {error}"),
+        )
+
+    def show_history(self, result):
+        status, data = result
+        if status != 200:
+            return
+        self.history_table.setRowCount(len(data))
+        for i, row in enumerate(data):
+            self.history_table.setItem(i, 0, QTableWidgetItem(str(row['id'])))
+            self.history_table.setItem(i, 1, QTableWidgetItem(str(row['uploaded_at'])))
+            self.history_table.setItem(i, 2, QTableWidgetItem(str(row['status'])))
+            
+            btn_view = QPushButton("View")
+            btn_view.setEnabled(row['status'] == 'ready')
+            btn_view.clicked.connect(lambda checked, r=row['id']: self.load_dataset(r))
+            self.history_table.setCellWidget(i, 3, btn_view)
 
     def upload_file(self):
         fname, _ = QFileDialog.getOpenFileName(self, 'Open CSV', 'c:\\', "CSV Files (*.csv)")
         if fname:
-            try:
-                files = {'file': open(fname, 'rb')}
-                response = requests.post(f"{API_URL}upload/", files=files)
-                if response.status_code == 201:
-                    data = response.json()
-                    QMessageBox.information(self, "Success", "File uploaded successfully!")
-                    self.load_history()
-                    self.load_dataset(data['id'])
-                else:
-                    QMessageBox.warning(self, "Error", "Upload failed")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+            self.btn_upload.setEnabled(False)
+            self.btn_upload.setText("Uploading...")
+            self.upload_task = self.run_task(
+                ResumableUpload(API_URL, fname),
+                self.upload_finished, self.upload_failed, self.upload_progress,
+            )
+
+    def upload_progress(self, sent, total):
+        self.btn_upload.setText(f"Uploading... ({int(sent * 100 / total)}%)")
+        self.show_progress(sent, total)
+
+    def reset_upload_button(self):
+        self.hide_progress()
+        self.btn_upload.setEnabled(True)
+        self.btn_upload.setText("Upload New CSV Dataset")
+
+    def upload_finished(self, result):
+        status, data = result
+        if status == 200:
+            # Identical file was uploaded before; the server returns that dataset
+            self.reset_upload_button()
+            QMessageBox.information(self, "Success", "File already uploaded, opening existing dataset.")
+            self.load_dataset(data['id'])
+        elif status == 202:
+            self.hide_progress()
+            self.btn_upload.setText("Processing Upload...")
+            self.load_history()
+            self.poll_job(data['id'])
+        else:
+            self.reset_upload_button()
+            QMessageBox.warning(self, "Error", "Upload failed")
+
+    def upload_failed(self, error):
+        self.reset_upload_button()
+        QMessageBox.critical(self, "Error", error)
+
+    def poll_job(self, job_id):
+        # The server parses uploads in the background; check back until done
+        self.job_task = self.run_task(
+            JsonRequest(f"{API_URL}jobs/{job_id}/"),
+            lambda result: self.job_polled(job_id, result),
+            lambda error: self.job_finished({'state': 'failed', 'error': error}),
+        )
+
+    def job_polled(self, job_id, result):
+        status, job = result
+        if job is None:
+            job = {'state': 'failed', 'error': f"HTTP {status}"}
+        if job['state'] in ('queued', 'running'):
+            self.btn_upload.setText(f"Processing Upload... ({job['rows_processed']} rows)")
+            QTimer.singleShot(1000, lambda: self.poll_job(job_id))
+            return
+        self.job_finished(job)
+
+    def job_finished(self, job):
+        self.reset_upload_button()
+        self.load_history()
+        if job['state'] == 'succeeded':
+            QMessageBox.information(self, "Success", "File uploaded successfully!")
+            self.load_dataset(job['dataset'])
+        else:
+            QMessageBox.warning(self, "Error", f"Upload failed: {job['error']}")
 
     def load_dataset(self, dataset_id):
-        try:
-            response = requests.get(f"{API_URL}summary/{dataset_id}/")
-            if response.status_code == 200:
-                data = response.json()
-                self.current_dataset = data
-                self.update_data_view(data)
-                self.tabs.setCurrentIndex(1)
-            else:
-                QMessageBox.warning(self, "Error", "Could not load dataset details")
-        except Exception as e:
-            print(f"Error loading dataset: {e}")
+        # Only the latest click counts: a dataset still loading is abandoned
+        if self.dataset_task is not None:
+            self.dataset_task.cancel()
+        self.dataset_task = self.load_cached(
+            f"{API_URL}summary/{dataset_id}/",
+            self.dataset_loaded, lambda error: print(f"Error loading dataset: {error}"),
+        )
+
+    def dataset_loaded(self, result):
+        status, data = result
+        if status == 200:
+            self.ensure_data_tab()
+            previous = self.current_dataset
+            self.current_dataset = data
+            self.update_data_view(data)
+            if previous is None or (previous['dataset_id'], previous.get('revision')) != (data['dataset_id'], data.get('revision')):
+                self.load_rows(data)
+            self.tabs.setCurrentIndex(1)
+        else:
+            QMessageBox.warning(self, "Error", "Could not load dataset details")
+
+    def load_rows(self, data):
+        self.filter_name.clear()
+        self.filter_type.clear()
+        self.filter_type.addItem("All types", "")
+        for entry in data['type_distribution']:
+            self.filter_type.addItem(entry['equipment_type'], entry['equipment_type'])
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_model.load(data['dataset_id'], ordering='id', filters={})
+
+    def apply_row_filters(self):
+        if self.current_dataset is None:
+            return
+        self.table_model.load(self.current_dataset['dataset_id'], filters={
+            'name': self.filter_name.text().strip(),
+            'type': self.filter_type.currentData(),
+        })
 
     def update_data_view(self, data):
         self.data_label.setText(f"Dataset: {data['file_name']}")
@@ -219,7 +443,14 @@ class MainWindow(QMainWindow):
         self.canvas.draw()
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    profile = StartupProfile('--profile-startup' in sys.argv, started=_started)
+    if profile.enabled:
+        sys.argv.remove('--profile-startup')
+    profile.record('import PyQt5', _qt_imported - _started)
+    profile.record('import client modules', _client_imported - _qt_imported)
+    
+    with profile.stage('create QApplication'):
+        app = QApplication(sys.argv)
     
     # Modern B&W QSS Style
     app.setStyle('Fusion')
@@ -317,7 +548,11 @@ if __name__ == "__main__":
     app.setStyleSheet(qss)
     
     login = LoginDialog()
-    if login.exec_() == QDialog.Accepted:
-        window = MainWindow()
+    with profile.paused():
+        accepted = login.exec_() == QDialog.Accepted
+    if accepted:
+        with profile.stage('build main window'):
+            window = MainWindow(profile)
+        profile.watch_first_paint(window)
         window.show()
         sys.exit(app.exec_())
@@ -0,0 +1,78 @@
+import sys
+import time
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+
+class StartupProfile(QObject):
+    """Wall-clock breakdown of startup, printed by ``--profile-startup``.
+
+    Stages are timed with ``stage()``; time spent waiting on the user (the
+    login dialog) is left out with ``paused()``. The report is printed once
+    the main window has painted for the first time. Stages timed after that,
+    like the visualization tab's deferred imports, are printed as they
+    finish. When disabled every method is a no-op.
+    """
+
+    def __init__(self, enabled, started=None):
+        super().__init__()
+        self.enabled = enabled
+        self.started = started if started is not None else time.perf_counter()
+        self.stages = []
+        self.paused_for = 0.0
+        self.reported = False
+
+    def elapsed(self):
+        return time.perf_counter() - self.started - self.paused_for
+
+    def record(self, label, seconds):
+        if not self.enabled:
+            return
+        self.stages.append((label, seconds))
+        if self.reported:
+            self._print(label, seconds)
+
+    @contextmanager
+    def stage(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(label, time.perf_counter() - start)
+
+    @contextmanager
+    def paused(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.paused_for += time.perf_counter() - start
+
+    def watch_first_paint(self, widget):
+        if self.enabled:
+            self._shown_at = self.elapsed()
+            widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.reported:
+            obj.removeEventFilter(self)
+            # Report once this paint has finished
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def _print(self, label, seconds):
+        print(f'  {label:<34} {seconds * 1000:8.1f} ms', file=sys.stderr)
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        total = self.elapsed()
+        print('Startup profile:', file=sys.stderr)
+        for label, seconds in self.stages:
+            self._print(label, seconds)
+        self._print('show -> first paint', total - self._shown_at)
+        self._print('total to first paint', total)
+        if self.paused_for:
+            self._print('(login dialog, excluded)', self.paused_for)
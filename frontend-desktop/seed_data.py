@@ -0,0 +1,83 @@
+import requests
+import os
+import sys
+import time
+
+from uploads import upload_resumable
+
+API_URL = "http://127.0.0.1:8000/api/"
+# The sample file in the repository root
+FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "sample_equipment_data.csv")
+
+def seed():
+    if not os.path.exists(FILE_PATH):
+        print(f"File {FILE_PATH} not found.")
+        return
+
+    print(f"Uploading {FILE_PATH}...")
+    try:
+        with requests.Session() as session:
+            # The desktop app's upload client, so both speak the same protocol
+            response = upload_resumable(
+                session, API_URL, FILE_PATH, progress=lambda done, total: print(f"  {done}/{total} bytes"),
+            )
+            if response.status_code == 200:
+                print("Sample data was already uploaded.")
+                print("Response:", response.json())
+            elif response.status_code == 202:
+                job = response.json()
+                # Parsing happens in the background; wait for the job to finish
+                while job['state'] in ('queued', 'running'):
+                    time.sleep(1)
+                    job = session.get(f"{API_URL}jobs/{job['id']}/").json()
+                if job['state'] == 'succeeded':
+                    print("Successfully uploaded sample data!")
+                    print("Response:", job)
+                else:
+                    print(f"Failed to ingest. Error: {job['error']}")
+            else:
+                print(f"Failed to upload. Status: {response.status_code}")
+                print(response.text)
+    except Exception as e:
+        print(f"Error: {e}")
+
+def seed_batch(paths):
+    # Several CSVs (or one ZIP) go up in a single request and are parsed in the background
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f"File(s) not found: {', '.join(missing)}")
+        return
+
+    print(f"Uploading {len(paths)} file(s) as one batch...")
+    handles = [open(p, 'rb') for p in paths]
+    try:
+        files = [('files', (os.path.basename(p), f)) for p, f in zip(paths, handles)]
+        response = requests.post(f"{API_URL}upload/batch/", files=files)
+        if response.status_code in (200, 202):
+            # One entry per file; each new file is parsed by its own job
+            for entry in response.json():
+                job = entry['job']
+                if job is None:
+                    print(f"{entry['file']}: already uploaded as dataset {entry['dataset']['id']}")
+                    continue
+                while job['state'] in ('queued', 'running'):
+                    time.sleep(1)
+                    job = requests.get(f"{API_URL}jobs/{job['id']}/").json()
+                if job['state'] == 'succeeded':
+                    print(f"{entry['file']}: {job['rows_processed']} rows in dataset {job['dataset']}")
+                else:
+                    print(f"{entry['file']}: failed to ingest. Error: {job['error']}")
+        else:
+            print(f"Failed to upload. Status: {response.status_code}")
+            print(response.text)
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        for f in handles:
+            f.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        seed_batch(sys.argv[1:])
+    else:
+        seed()
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from workers import JsonRequest
+
+COLUMNS = ('equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+HEADERS = ('Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature')
+NUMERIC_COLUMNS = ('flowrate', 'pressure', 'temperature')
+PAGE_SIZE = 1000
+# Pages held in memory at once; older ones are dropped and re-fetched from
+# their cursor if scrolled back to, so memory stays flat however far the
+# user scrolls
+MAX_PAGES = 40
+
+
+class RowPage:
+    """One page of rows as NumPy columns.
+
+    Numbers are float64 arrays, names a fixed-width string array, and types
+    int32 codes into the page's own dictionary, as the server sends them.
+    """
+
+    def __init__(self, columns):
+        self.names = np.array(columns['equipment_name'], dtype=str)
+        types = columns['equipment_type']
+        self.type_codes = np.asarray(types['codes'], dtype=np.int32)
+        self.type_names = types['dictionary']
+        self.numbers = {
+            field: np.asarray(columns[field], dtype=np.float64) for field in NUMERIC_COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.names)
+
+    def value(self, row, field):
+        if field == 'equipment_name':
+            return self.names[row]
+        if field == 'equipment_type':
+            return self.type_names[self.type_codes[row]]
+        return f'{self.numbers[field][row]:.2f}'
+
+
+class EquipmentTableModel(QAbstractTableModel):
+    """Rows of one dataset, fetched a page at a time as the view scrolls.
+
+    The view asks for more through canFetchMore/fetchMore once it nears the
+    last loaded row; each page comes from the keyset-paginated query
+    endpoint in columnar JSON, on the worker pool. Sorting and filtering
+    are done by the server: changing either starts over from the first
+    page.
+    """
+
+    error = pyqtSignal(str)
+
+    def __init__(self, api_url, pool, parent=None):
+        super().__init__(parent)
+        self.api_url = api_url
+        self.pool = pool
+        self.dataset_id = None
+        self.ordering = 'id'
+        self.filters = {}
+        self._tasks = {}
+        self._reset_state()
+
+    def _reset_state(self):
+        # Cursor of every page start discovered so far; None for the first
+        self._cursors = [None]
+        self._pages = OrderedDict()
+        self._failed = set()
+        self._rows = 0
+        self._complete = False
+
+    def load(self, dataset_id, ordering=None, filters=None):
+        self.dataset_id = dataset_id
+        if ordering is not None:
+            self.ordering = ordering
+        if filters is not None:
+            self.filters = {key: value for key, value in filters.items() if value}
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks = {}
+        self.beginResetModel()
+        self._reset_state()
+        self.endResetModel()
+        self._request_page(0)
+
+    def clear(self):
+        self.dataset_id = None
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks = {}
+        self.beginResetModel()
+        self._reset_state()
+        self._complete = True
+        self.endResetModel()
+
+    def page_url(self, page):
+        params = {'format': 'columns', 'limit': PAGE_SIZE, 'ordering': self.ordering, **self.filters}
+        if self._cursors[page] is not None:
+            params['cursor'] = self._cursors[page]
+        return f"{self.api_url}datasets/{self.dataset_id}/query/?{urlencode(params)}"
+
+    def _request_page(self, page):
+        if self.dataset_id is None or page in self._tasks or page in self._failed:
+            return
+        task = JsonRequest(self.page_url(page))
+        task.signals.finished.connect(lambda result: self._page_loaded(task, page, result))
+        task.signals.failed.connect(lambda message: self._page_failed(task, page, message))
+        self._tasks[page] = task
+        self.pool.start(task)
+
+    def _page_failed(self, task, page, message):
+        if self._tasks.get(page) is not task:
+            return
+        del self._tasks[page]
+        self._failed.add(page)
+        self.error.emit(message)
+
+    def _page_loaded(self, task, page, result):
+        if self._tasks.get(page) is not task:
+            return  # from before the last reload
+        del self._tasks[page]
+        status, data = result
+        if status != 200:
+            self._failed.add(page)
+            self.error.emit(f"Could not load rows (HTTP {status})")
+            return
+
+        rows = RowPage(data['columns'])
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > MAX_PAGES:
+            self._pages.popitem(last=False)
+
+        if page == len(self._cursors) - 1:
+            # The frontier page: its rows are new to the view
+            if data['next']:
+                self._cursors.append(parse_qs(urlparse(data['next']).query)['cursor'][0])
+            else:
+                self._complete = True
+            if len(rows):
+                first = page * PAGE_SIZE
+                self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+                self._rows = first + len(rows)
+                self.endInsertRows()
+        else:
+            # A page that was dropped and fetched again
+            first = page * PAGE_SIZE
+            self.dataChanged.emit(
+                self.index(first, 0), self.index(first + len(rows) - 1, len(COLUMNS) - 1)
+            )
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        frontier = len(self._cursors) - 1
+        if parent.isValid() or self.dataset_id is None or self._complete:
+            return False
+        return frontier not in self._failed
+
+    def fetchMore(self, parent=QModelIndex()):
+        self._request_page(len(self._cursors) - 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field = COLUMNS[index.column()]
+        if role == Qt.TextAlignmentRole:
+            if field in NUMERIC_COLUMNS:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return None
+        if role != Qt.DisplayRole:
+            return None
+        page, row = divmod(index.row(), PAGE_SIZE)
+        rows = self._pages.get(page)
+        if rows is None:
+            self._request_page(page)
+            return '…'
+        self._pages.move_to_end(page)
+        return rows.value(row, field)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0:
+            ordering = 'id'
+        else:
+            ordering = COLUMNS[column]
+            if order == Qt.DescendingOrder:
+                ordering = f'-{ordering}'
+        if ordering != self.ordering and self.dataset_id is not None:
+            self.load(self.dataset_id, ordering=ordering)
+        else:
+            self.ordering = ordering
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import os
+import time
+
+# Client side of the server's resumable upload sessions. Kept free of Qt so
+# seed_data.py, next to it, can use it without the desktop app.
+
+# (connect, read) seconds; finalize ingests small files before answering
+TIMEOUT = (5, 120)
+# Further attempts at one upload chunk before the upload gives up
+RETRIES = 5
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def upload_resumable(session, api_url, path, progress=None, check_cancelled=None, wait=time.sleep):
+    """Send ``path`` through an upload session; returns the last response.
+
+    The file is read one chunk at a time, gzip-compressed and PUT at its
+    offset. A chunk that fails is retried on its own, with backoff; when
+    the server reports a different offset the upload carries on from
+    there. The SHA-256 is computed along the way and checked by the server
+    on finalize, which answers like a plain upload. If the session can't
+    be started, that refusal is returned instead.
+
+    ``progress(done, total)`` is called after every chunk,
+    ``check_cancelled()`` before every request (it should raise to stop),
+    and ``wait(seconds)`` sleeps between retries.
+    """
+    size = os.path.getsize(path)
+    response = session.post(
+        f"{api_url}upload/sessions/",
+        json={'file_name': os.path.basename(path), 'size': size},
+        timeout=TIMEOUT,
+    )
+    if response.status_code != 201:
+        return response
+    upload = response.json()
+    url = f"{api_url}upload/sessions/{upload['id']}/"
+
+    digest = hashlib.sha256()
+    hashed = 0
+    offset = 0
+    with open(path, 'rb') as f:
+        while offset < size:
+            if check_cancelled is not None:
+                check_cancelled()
+            f.seek(offset)
+            chunk = f.read(upload['chunk_size'])
+            if offset == hashed:
+                digest.update(chunk)
+                hashed += len(chunk)
+            offset = send_chunk(session, url, offset, chunk, check_cancelled, wait)
+            if progress is not None:
+                progress(offset, size)
+        # Only if the server ever skipped us ahead of what was read
+        f.seek(hashed)
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    return session.post(f"{url}finalize/", json={'sha256': digest.hexdigest()}, timeout=TIMEOUT)
+
+
+def send_chunk(session, url, offset, chunk, check_cancelled=None, wait=time.sleep):
+    """PUT one chunk, retrying it alone; returns the server's new offset."""
+    body = gzip.compress(chunk)
+    headers = {
+        'Upload-Offset': str(offset),
+        'Content-Encoding': 'gzip',
+        'Content-Type': 'application/octet-stream',
+    }
+    for attempt in range(RETRIES + 1):
+        if check_cancelled is not None:
+            check_cancelled()
+        try:
+            response = session.put(url, data=body, headers=headers, timeout=TIMEOUT)
+        except OSError as e:  # requests' connection errors included
+            error = str(e)
+        else:
+            if response.status_code in (200, 409):
+                # 409: the server holds a different amount; resume from it
+                return response.json()['offset']
+            error = (response_json(response) or {}).get('error') or f"HTTP {response.status_code}"
+            if response.status_code < 500:
+                break
+        if attempt < RETRIES:
+            wait(min(2 ** attempt, 30))
+    raise RuntimeError(f"Upload failed at byte {offset}: {error}")
+
+
+def response_json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
@@ -0,0 +1,171 @@
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from uploads import response_json, upload_resumable
+
+# Network I/O runs on the Qt thread pool, never in the UI thread. Every task
+# goes through one keep-alive session, so requests reuse pooled connections
+# instead of opening a new one each time.
+
+MAX_WORKERS = 4
+CHUNK_SIZE = 64 * 1024
+# (connect, read) seconds; reports can take a while to render on first use
+TIMEOUT = (5, 120)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported here, on the first worker thread, to keep it off startup
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+class Cancelled(Exception):
+    pass
+
+
+class TaskSignals(QObject):
+    # QRunnable isn't a QObject, so its signals live here. They are emitted
+    # from the worker thread and delivered in the UI thread.
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(object, object)  # bytes done, total (0 if unknown)
+
+
+class ApiTask(QRunnable):
+    """One request run on the thread pool; subclasses implement ``work``.
+
+    A cancelled task stops at its next chunk boundary and emits nothing,
+    so a stale response never reaches the UI.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def report(self, done, total):
+        if not self.cancelled:
+            self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            result = self.work(get_session())
+        except Cancelled:
+            return
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(result)
+
+    def work(self, session):
+        raise NotImplementedError
+
+
+class JsonRequest(ApiTask):
+    """GET a JSON endpoint; finishes with ``(status, data)``.
+
+    With a ``cache`` dict (url -> (etag, data)) the request revalidates the
+    stored copy, and a 304 answers with it.
+    """
+
+    def __init__(self, url, cache=None):
+        super().__init__()
+        self.url = url
+        self.cache = cache
+
+    def work(self, session):
+        cached = self.cache.get(self.url) if self.cache is not None else None
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = session.get(self.url, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304 and cached:
+            return 200, cached[1]
+        if response.status_code != 200:
+            return response.status_code, None
+        data = response.json()
+        if self.cache is not None and 'ETag' in response.headers:
+            self.cache[self.url] = (response.headers['ETag'], data)
+        return 200, data
+
+
+class ResumableUpload(ApiTask):
+    """Send a file through the server's resumable upload sessions.
+
+    See uploads.upload_resumable for the protocol; here it reports its
+    progress and stops at the next chunk (or retry) once cancelled.
+    Finishes with ``(status, data)`` of the finalize call, which answers
+    like a plain upload.
+    """
+
+    def __init__(self, api_url, path):
+        super().__init__()
+        self.api_url = api_url
+        self.path = path
+
+    def work(self, session):
+        response = upload_resumable(
+            session, self.api_url, self.path,
+            progress=self.report, check_cancelled=self.check_cancelled, wait=self._cancelled.wait,
+        )
+        return response.status_code, response_json(response)
+
+
+class DownloadRequest(ApiTask):
+    """Stream a GET response into ``path``; finishes with the HTTP status.
+
+    The body is written to a ``.part`` file that only replaces ``path`` once
+    complete, so a failed or cancelled download leaves nothing behind.
+    """
+
+    def __init__(self, url, path):
+        super().__init__()
+        self.url = url
+        self.path = path
+
+    def work(self, session):
+        with session.get(self.url, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code != 200:
+                return response.status_code
+            total = int(response.headers.get('Content-Length') or 0)
+            tmp_path = self.path + '.part'
+            done = 0
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        self.check_cancelled()
+                        f.write(chunk)
+                        done += len(chunk)
+                        self.report(done, total)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return response.status_code
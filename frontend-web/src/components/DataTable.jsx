@@ -0,0 +1,86 @@
+import React, { useState, useEffect, useCallback } from 'react';
+import api from '../services/api';
+
+const COLUMNS = [
+    { field: 'equipment_name', label: 'Name' },
+    { field: 'equipment_type', label: 'Type' },
+    { field: 'flowrate', label: 'Flowrate' },
+    { field: 'pressure', label: 'Pressure' },
+    { field: 'temperature', label: 'Temperature' },
+];
+
+const PAGE_SIZE = 100;
+
+// Rows are fetched a page at a time from the keyset-paginated rows endpoint;
+// sorting is done by the server.
+const DataTable = ({ datasetId }) => {
+    const [rows, setRows] = useState([]);
+    const [next, setNext] = useState(null);
+    const [ordering, setOrdering] = useState('id');
+    const [loading, setLoading] = useState(false);
+
+    const fetchPage = useCallback(async (url, params) => {
+        setLoading(true);
+        try {
+            const res = await api.get(url, { params });
+            setRows(prev => (params ? res.data.results : [...prev, ...res.data.results]));
+            setNext(res.data.next);
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoading(false);
+        }
+    }, []);
+
+    useEffect(() => {
+        fetchPage(`datasets/${datasetId}/rows/`, {
+            limit: PAGE_SIZE,
+            ordering,
+            fields: COLUMNS.map(c => c.field).join(','),
+        });
+    }, [datasetId, ordering, fetchPage]);
+
+    // Load the next page when the user scrolls near the bottom
+    const handleScroll = (e) => {
+        const el = e.currentTarget;
+        if (next && !loading && el.scrollTop + el.clientHeight >= el.scrollHeight - 200) {
+            fetchPage(next);
+        }
+    };
+
+    const toggleSort = (field) => {
+        setOrdering(prev => (prev === field ? `-${field}` : field));
+    };
+
+    const sortMark = (field) => {
+        if (ordering === field) return ' ▲';
+        if (ordering === `-${field}`) return ' ▼';
+        return '';
+    };
+
+    return (
+        <div style={{ maxHeight: '500px', overflowY: 'auto' }} onScroll={handleScroll}>
+            <table>
+                <thead>
+                    <tr>
+                        {COLUMNS.map(c => (
+                            <th key={c.field} onClick={() => toggleSort(c.field)} style={{ cursor: 'pointer' }}>
+                                {c.label}{sortMark(c.field)}
+                            </th>
+                        ))}
+                    </tr>
+                </thead>
+                <tbody>
+                    {rows.map((item, idx) => (
+                        <tr key={idx}>
+                            {COLUMNS.map(c => <td key={c.field}>{item[c.field]}</td>)}
+                        </tr>
+                    ))}
+                </tbody>
+            </table>
+            {loading && <p>Loading rows...</p>}
+        </div>
+    );
+};
+
+export default DataTable;
@@ -9,6 +9,16 @@ const Dashboard = () => {
     const [error, setError] = useState(null);
     const navigate = useNavigate();
 
+    // Uploads are parsed in the background; poll the job until it settles
+    const waitForJob = async (jobId) => {
+        for (;;) {
+            const res = await api.get(`jobs/${jobId}/`);
+            if (res.data.state === 'succeeded') return res.data;
+            if (res.data.state === 'failed') throw new Error(res.data.error);
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    };
+
     const fetchHistory = async () => {
         try {
             const res = await api.get('history/');
@@ -35,8 +45,12 @@ const Dashboard = () => {
             const res = await api.post('upload/', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
+            // 200 means this exact file was already ingested
+            const datasetId = res.status === 200
+                ? res.data.id
+                : (await waitForJob(res.data.id)).dataset;
             // Navigate to summary of new dataset
-            navigate(`/summary/${res.data.id}`);
+            navigate(`/summary/${datasetId}`);
         } catch (err) {
             setError('Upload failed. Check format.');
             console.error(err);
@@ -72,6 +86,7 @@ const Dashboard = () => {
                             <tr>
                                 <th>ID</th>
                                 <th>Uploaded At</th>
+                                <th>Status</th>
                                 <th>Actions</th>
                             </tr>
                         </thead>
@@ -80,9 +95,11 @@ const Dashboard = () => {
                                 <tr key={item.id}>
                                     <td>{item.id}</td>
                                     <td>{new Date(item.uploaded_at).toLocaleString()}</td>
+                                    <td>{item.status}</td>
                                     <td>
                                         <button
                                             className="secondary"
+                                            disabled={item.status !== 'ready'}
                                             onClick={() => navigate(`/summary/${item.id}`)}
                                         >
                                             View Report
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import api from '../services/api';
+import DataTable from '../components/DataTable';
 import { Chart as ChartJS, CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend, ArcElement } from 'chart.js';
 import { Bar, Pie } from 'react-chartjs-2';
 
@@ -84,30 +85,7 @@ const Summary = () => {
 
             <div className="card">
                 <h3>Raw Data</h3>
-                <div style={{ maxHeight: '500px', overflowY: 'auto' }}>
-                    <table>
-                        <thead>
-                            <tr>
-                                <th>Name</th>
-                                <th>Type</th>
-                                <th>Flowrate</th>
-                                <th>Pressure</th>
-                                <th>Temperature</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {data.data.map((item, idx) => (
-                                <tr key={idx}>
-                                    <td>{item.equipment_name}</td>
-                                    <td>{item.equipment_type}</td>
-                                    <td>{item.flowrate}</td>
-                                    <td>{item.pressure}</td>
-                                    <td>{item.temperature}</td>
-                                </tr>
-                            ))}
-                        </tbody>
-                    </table>
-                </div>
+                <DataTable datasetId={id} />
             </div>
         </div>
     );
@@ -2,6 +2,39 @@ import axios from 'axios';
 
 const api = axios.create({
     baseURL: 'http://localhost:8000/api/',
+    // 304 is a normal answer to a revalidation, not an error
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Conditional GETs: remember each response's ETag and send it back as
+// If-None-Match; on 304 the previously received body is reused.
+const etagCache = new Map();
+
+const cacheKey = (config) => api.getUri(config);
+
+api.interceptors.request.use((config) => {
+    if ((config.method || 'get').toLowerCase() === 'get') {
+        const cached = etagCache.get(cacheKey(config));
+        if (cached) {
+            config.headers['If-None-Match'] = cached.etag;
+        }
+    }
+    return config;
+});
+
+api.interceptors.response.use((response) => {
+    const key = cacheKey(response.config);
+    if (response.status === 304) {
+        const cached = etagCache.get(key);
+        if (cached) {
+            return { ...response, status: 200, data: cached.data };
+        }
+    }
+    const etag = response.headers['etag'];
+    if (etag && response.config.responseType !== 'blob') {
+        etagCache.set(key, { etag, data: response.data });
+    }
+    return response;
 });
 
 // Add interceptor for auth if needed later